@@ -3,294 +3,184 @@ Sistema de Risco Fuzzy - Flask Web App
 Usando scikit-fuzzy para lógica fuzzy real (Python 3.11)
 """
 
-from flask import Flask, render_template_string, request, jsonify
-import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
+from flask import Flask, render_template_string, request, jsonify, Response, abort, stream_with_context, send_file, g
 from datetime import datetime
 import warnings
+import hmac
 import os
-import base64
-from io import BytesIO
-import matplotlib
-import matplotlib.pyplot as plt
+import json
+import threading
+import io
+import shutil
+import tempfile
+import time
+from functools import partial
+from itertools import islice
 
 # Importar o módulo de geração de gráficos
-from generate_fuzzy_plots import generate_membership_plots, generate_dynamic_plots
+from generate_fuzzy_plots import (generate_dynamic_plot, generate_membership_plots, membership_plot_file, plot_hash,
+                                  DYNAMIC_PLOTS, STATIC_PLOTS, PLOT_FORMATS)
+from sistema_risco import SistemaRiscoFuzzy, DIRETORIO_CACHE, ETAPAS, observar_modelo
+from cache_lru import CacheLRU
+from renderizador_graficos import FilaCheia, RenderizadorGraficos
+import metricas
+from historico import criar_historico, projetar
+from avaliacao_lote import TAMANHO_BLOCO, avaliar_csv, escrever_csv, escrever_ndjson
 
 warnings.filterwarnings('ignore')
 
-# Configurar matplotlib para usar português
-matplotlib.rcParams['font.family'] = 'DejaVu Sans'
-plt.rcParams.update({'font.size': 12})
-
 app = Flask(__name__)
 
-class SistemaRiscoFuzzy:
-    def __init__(self):
-        """Inicializa o sistema fuzzy"""
-        self.setup_fuzzy_system()
-        self.historico_avaliacoes = []  # Renomeado para evitar conflito com a variável fuzzy
-        # Gerar gráficos estáticos das funções de pertinência
-        self.plots = generate_membership_plots(self)
-
-    def setup_fuzzy_system(self):
-        """Configura o sistema fuzzy com scikit-fuzzy"""
-        print("🔧 Configurando Sistema Fuzzy com scikit-fuzzy...")
-
-        # === VARIÁVEIS DE ENTRADA ===
-        self.renda = ctrl.Antecedent(np.arange(0, 15001, 1), 'renda')
-        self.historico = ctrl.Antecedent(np.arange(0, 11, 1), 'historico_credito')
-        self.idade = ctrl.Antecedent(np.arange(18, 81, 1), 'idade')
-        self.tempo_emprego = ctrl.Antecedent(np.arange(0, 31, 1), 'tempo_emprego')
-        self.dividas = ctrl.Antecedent(np.arange(0, 101, 1), 'percentual_dividas')
-
-        # === VARIÁVEL DE SAÍDA ===
-        self.risco = ctrl.Consequent(np.arange(0, 101, 1), 'risco_credito')
-
-        # === FUNÇÕES DE PERTINÊNCIA - RENDA ===
-        self.renda['muito_baixa'] = fuzz.trimf(self.renda.universe, [0, 0, 2000])
-        self.renda['baixa'] = fuzz.trimf(self.renda.universe, [1000, 2500, 4000])
-        self.renda['media'] = fuzz.trimf(self.renda.universe, [3000, 5500, 8000])
-        self.renda['alta'] = fuzz.trimf(self.renda.universe, [6500, 10000, 12000])
-        self.renda['muito_alta'] = fuzz.trimf(self.renda.universe, [10000, 15000, 15000])
-
-        # === FUNÇÕES DE PERTINÊNCIA - HISTÓRICO ===
-        self.historico['pessimo'] = fuzz.trimf(self.historico.universe, [0, 0, 2])
-        self.historico['ruim'] = fuzz.trimf(self.historico.universe, [1, 3, 5])
-        self.historico['regular'] = fuzz.trimf(self.historico.universe, [4, 6, 8])
-        self.historico['bom'] = fuzz.trimf(self.historico.universe, [7, 9, 10])
-        self.historico['excelente'] = fuzz.trimf(self.historico.universe, [9, 10, 10])
-
-        # === FUNÇÕES DE PERTINÊNCIA - IDADE ===
-        self.idade['jovem'] = fuzz.trimf(self.idade.universe, [18, 18, 30])
-        self.idade['adulto_jovem'] = fuzz.trimf(self.idade.universe, [25, 35, 45])
-        self.idade['adulto'] = fuzz.trimf(self.idade.universe, [40, 50, 60])
-        self.idade['maduro'] = fuzz.trimf(self.idade.universe, [55, 70, 80])
-
-        # === FUNÇÕES DE PERTINÊNCIA - TEMPO DE EMPREGO ===
-        self.tempo_emprego['novo'] = fuzz.trimf(self.tempo_emprego.universe, [0, 0, 2])
-        self.tempo_emprego['pouco'] = fuzz.trimf(self.tempo_emprego.universe, [1, 3, 6])
-        self.tempo_emprego['medio'] = fuzz.trimf(self.tempo_emprego.universe, [4, 8, 15])
-        self.tempo_emprego['experiente'] = fuzz.trimf(self.tempo_emprego.universe, [12, 25, 30])
-
-        # === FUNÇÕES DE PERTINÊNCIA - DÍVIDAS ===
-        self.dividas['baixo'] = fuzz.trimf(self.dividas.universe, [0, 0, 30])
-        self.dividas['medio'] = fuzz.trimf(self.dividas.universe, [20, 40, 60])
-        self.dividas['alto'] = fuzz.trimf(self.dividas.universe, [50, 70, 90])
-        self.dividas['critico'] = fuzz.trimf(self.dividas.universe, [80, 100, 100])
-
-        # === FUNÇÕES DE PERTINÊNCIA - RISCO (SAÍDA) ===
-        self.risco['muito_baixo'] = fuzz.trimf(self.risco.universe, [0, 0, 20])
-        self.risco['baixo'] = fuzz.trimf(self.risco.universe, [10, 25, 40])
-        self.risco['medio'] = fuzz.trimf(self.risco.universe, [30, 50, 70])
-        self.risco['alto'] = fuzz.trimf(self.risco.universe, [60, 75, 90])
-        self.risco['muito_alto'] = fuzz.trimf(self.risco.universe, [80, 100, 100])
-
-        # === REGRAS FUZZY ===
-        self.criar_regras()
-
-        # === SISTEMA DE CONTROLE ===
-        self.sistema_controle = ctrl.ControlSystem(self.regras)
-        self.simulador = ctrl.ControlSystemSimulation(self.sistema_controle)
-
-        print("✅ Sistema Fuzzy configurado com sucesso!")
-
-    def criar_regras(self):
-        """Define as regras fuzzy (mais abrangentes)"""
-        self.regras = [
-            # === REGRAS DE MUITO BAIXO RISCO ===
-            ctrl.Rule(self.renda['muito_alta'] & self.historico['excelente'] &
-                     self.dividas['baixo'], self.risco['muito_baixo']),
-
-            ctrl.Rule(self.renda['alta'] & self.historico['excelente'] &
-                     self.dividas['baixo'] & self.tempo_emprego['experiente'],
-                     self.risco['muito_baixo']),
-
-            # === REGRAS DE BAIXO RISCO ===
-            ctrl.Rule(self.renda['alta'] & self.historico['bom'] &
-                     self.dividas['baixo'], self.risco['baixo']),
-
-            ctrl.Rule(self.renda['alta'] & self.historico['excelente'],
-                     self.risco['baixo']),
-
-            ctrl.Rule(self.renda['muito_alta'] & self.historico['bom'],
-                     self.risco['baixo']),
-
-            ctrl.Rule(self.renda['media'] & self.historico['bom'] &
-                     self.idade['adulto'] & self.dividas['baixo'],
-                     self.risco['baixo']),
-
-            ctrl.Rule(self.idade['maduro'] & self.tempo_emprego['experiente'] &
-                     self.historico['bom'], self.risco['baixo']),
-
-            ctrl.Rule(self.renda['media'] & self.historico['excelente'] &
-                     self.dividas['baixo'], self.risco['baixo']),
-
-            # === REGRAS DE RISCO MÉDIO ===
-            ctrl.Rule(self.renda['media'] & self.historico['regular'],
-                     self.risco['medio']),
-
-            ctrl.Rule(self.renda['baixa'] & self.historico['bom'] &
-                     self.tempo_emprego['medio'], self.risco['medio']),
-
-            ctrl.Rule(self.renda['alta'] & self.historico['regular'] &
-                     self.dividas['alto'], self.risco['medio']),
-
-            ctrl.Rule(self.renda['media'] & self.dividas['medio'],
-                     self.risco['medio']),
-
-            ctrl.Rule(self.historico['regular'] & self.dividas['medio'],
-                     self.risco['medio']),
-
-            # === REGRAS DE ALTO RISCO ===
-            ctrl.Rule(self.renda['baixa'] & self.historico['ruim'],
-                     self.risco['alto']),
-
-            ctrl.Rule(self.historico['ruim'] & self.dividas['alto'],
-                     self.risco['alto']),
-
-            ctrl.Rule(self.idade['jovem'] & self.tempo_emprego['novo'] &
-                     self.renda['baixa'], self.risco['alto']),
-
-            ctrl.Rule(self.dividas['alto'] & self.historico['regular'],
-                     self.risco['alto']),
-
-            # === REGRAS DE MUITO ALTO RISCO ===
-            ctrl.Rule(self.renda['muito_baixa'] & self.historico['pessimo'],
-                     self.risco['muito_alto']),
-
-            ctrl.Rule(self.dividas['critico'], self.risco['muito_alto']),
+DIRETORIO_GRAFICOS = os.path.join(DIRETORIO_CACHE, 'graficos')
+
+# === MÉTRICAS HTTP ===
+REQUISICOES = metricas.histograma('http_requisicao_segundos', 'Duração das requisições, por rota',
+                                  ('rota', 'metodo'))
+RESPOSTAS = metricas.contador('http_respostas_total', 'Respostas enviadas, por rota e status',
+                              ('rota', 'status'))
+BYTES_RESPOSTA = metricas.contador('http_resposta_bytes_total', 'Bytes enviados no corpo das respostas, por rota',
+                                   ('rota',))
+
+
+class ModeloSubstituido(Exception):
+    """A avaliação foi feita com um modelo que já foi recarregado (o gráfico não pode ser redesenhado)"""
+
+    def __init__(self, avaliado, atual):
+        super().__init__(f"Avaliação feita com o modelo {avaliado}; o modelo atual é {atual}")
+        self.avaliado = avaliado
+        self.atual = atual
+
+
+class GraficoIndisponivel(Exception):
+    """O processo de renderização morreu, o renderizador foi encerrado, o desenho falhou ou demorou demais"""
+
+
+class SistemaRiscoWeb(SistemaRiscoFuzzy):
+    """Sistema fuzzy da aplicação web: núcleo + histórico e URLs dos gráficos"""
+
+    def __init__(self, backend=None, defuzz=None, modelo=None):
+        super().__init__(backend, defuzz, modelo)
+        # Renomeado para evitar conflito com a variável fuzzy (backend em HISTORICO_BACKEND)
+        self.historico_avaliacoes = criar_historico()
+        self._trava_plots = threading.Lock()
+        # PNGs dos gráficos dinâmicos por (modelo, variável, valor)
+        self.cache_graficos = CacheLRU('graficos', int(os.environ.get('FUZZY_CACHE_GRAFICOS', 512)),
+                                       self.cache.ttl)
+        # FUZZY_PROCESSOS_GRAFICOS=<n> desenha os gráficos em n processos dedicados (0 = na própria thread)
+        limite = os.environ.get('FUZZY_FILA_GRAFICOS')
+        self.renderizador = RenderizadorGraficos(int(os.environ.get('FUZZY_PROCESSOS_GRAFICOS', 0)),
+                                                 int(limite) if limite else None)
+
+    @property
+    def plots(self):
+        """URLs dos gráficos estáticos das funções de pertinência
+
+        O hash da configuração entra na URL, então o navegador pode guardar a
+        imagem e só volta a baixá-la quando universo ou termos mudarem. O PNG
+        em si é renderizado (uma vez, em disco) quando a URL é pedida.
+        """
+        estado = self.estado
+        if estado.plots is None:
+            with self._trava_plots:
+                if estado.plots is None:
+                    plots = {}
+                    for chave in STATIC_PLOTS:
+                        # Hash dos triângulos do modelo: não monta o scikit-fuzzy
+                        versao = plot_hash(chave, estado.variavel_modelo(chave))
+                        plots[chave] = f'/plots/{chave}.png?v={versao}'
+                    estado.plots = plots
+        return estado.plots
+
+    def avaliar_cliente(self, dados, incluir_graficos=True, explicar=False):
+        """Avalia um cliente e guarda o resultado no histórico
+
+        Os gráficos dinâmicos não são renderizados aqui: o resultado traz apenas
+        as URLs de `/avaliacao/<id>/plots/<variavel>`, geradas sob demanda.
+        Com `incluir_graficos=False` nem as URLs são incluídas.
+        """
+        resultado = super().avaliar_cliente(dados, explicar)
+        resultado['plots'] = {}
+        if incluir_graficos:
+            resultado['plots'] = {chave: f"/avaliacao/{resultado['id']}/plots/{chave}"
+                                  for chave in DYNAMIC_PLOTS}
+
+        # Salvar no histórico (sem os gráficos)
+        with ETAPAS.medir(etapa='historico', backend=self.backend):
+            self.historico_avaliacoes.adicionar(resultado)
 
-            ctrl.Rule(self.historico['pessimo'] & self.dividas['alto'],
-                     self.risco['muito_alto']),
-
-            ctrl.Rule(self.renda['muito_baixa'] & self.historico['ruim'],
-                     self.risco['muito_alto']),
-
-            # === REGRAS DE FALLBACK (para evitar o erro) ===
-            ctrl.Rule(self.renda['alta'], self.risco['baixo']),
-            ctrl.Rule(self.renda['muito_alta'], self.risco['muito_baixo']),
-            ctrl.Rule(self.historico['excelente'], self.risco['baixo']),
-            ctrl.Rule(self.historico['bom'], self.risco['baixo']),
-            ctrl.Rule(self.historico['pessimo'], self.risco['muito_alto']),
-            ctrl.Rule(self.historico['ruim'], self.risco['alto']),
-            ctrl.Rule(self.dividas['critico'], self.risco['muito_alto']),
-            ctrl.Rule(self.dividas['baixo'], self.risco['baixo']),
-        ]
+        return resultado
 
-    def avaliar_cliente(self, dados):
-        """Avalia um cliente usando lógica fuzzy"""
+    def obter_avaliacao(self, avaliacao_id):
+        """Procura uma avaliação do histórico pelo id"""
+        return self.historico_avaliacoes.obter(avaliacao_id)
+
+    def chave_grafico(self, estado, dados, variavel):
+        """Chave do cache de gráficos: modelo, variável e valor do cliente"""
+        return (estado.modelo.assinatura, variavel, float(dados[variavel]))
+
+    def estado_avaliacao(self, resultado):
+        """Estado do modelo com que a avaliação do histórico foi feita
+
+        Cada registro traz a assinatura do modelo em `modelo`. Só o modelo
+        atual fica carregado, então uma avaliação anterior a um recarregamento
+        levanta ModeloSubstituido em vez de ter o gráfico desenhado com outros
+        triângulos.
+        """
+        estado = self.estado
+        if resultado.get('modelo') != estado.modelo.assinatura:
+            raise ModeloSubstituido(resultado.get('modelo'), estado.modelo.assinatura)
+        return estado
+
+    def grafico_dinamico(self, dados, variavel, estado=None):
+        """PNG de uma variável com o valor do cliente, renderizado uma vez por valor e modelo"""
+        estado = estado or self.estado
+        chave = self.chave_grafico(estado, dados, variavel)
+        png = self.cache_graficos.obter(chave)
+        if png is None:
+            with ETAPAS.medir(etapa='graficos', backend=self.backend):
+                if self.usar_renderizador(estado):
+                    png = self.renderizar_no_pool('dinamico', estado.modelo.origem, estado.modelo.assinatura,
+                                                  variavel, dados[variavel])
+                else:
+                    png = generate_dynamic_plot(estado, dados, variavel)
+            self.cache_graficos.guardar(chave, png)
+        return png
+
+    def arquivo_grafico(self, variavel, formato):
+        """(caminho em disco, hash) do gráfico estático, renderizado na primeira vez"""
+        estado = self.estado
+        render = None
+        if self.usar_renderizador(estado):
+            render = partial(self.renderizar_no_pool, 'estatico', estado.modelo.origem, estado.modelo.assinatura)
+        with ETAPAS.medir(etapa='graficos', backend=self.backend):
+            return membership_plot_file(estado, variavel, DIRETORIO_GRAFICOS, formato, render)
+
+    def renderizar_no_pool(self, tipo, *args):
+        """Bytes do gráfico pelos processos de renderização; falhas do pool viram GraficoIndisponivel (503)"""
         try:
-            # Configurar inputs
-            self.simulador.input['renda'] = dados['renda']
-            self.simulador.input['historico_credito'] = dados['historico']
-            self.simulador.input['idade'] = dados['idade']
-            self.simulador.input['tempo_emprego'] = dados['tempo_emprego']
-            self.simulador.input['percentual_dividas'] = dados['dividas']
-
-            # Executar inferência fuzzy
-            self.simulador.compute()
-
-            # Obter resultado
-            risco_score = self.simulador.output['risco_credito']
-
-            # Gerar gráficos dinâmicos com os valores atuais
-            dynamic_plots = generate_dynamic_plots(self, dados)
-
-        except Exception as fuzzy_error:
-            # Se der erro no fuzzy, usar fallback baseado em lógica simples
-            print(f"⚠️ Erro fuzzy: {fuzzy_error}")
-            print("🔄 Usando sistema de fallback...")
-
-            risco_score = self.calcular_risco_fallback(dados)
-            dynamic_plots = {}
-
-        # Classificar risco
-        classificacao = self.classificar_risco(risco_score)
-
-        # Gerar recomendação
-        recomendacao = self.gerar_recomendacao(risco_score, dados)
-
-        # Resultado completo
-        resultado = {
-            'nome': dados['nome'],
-            'risco_score': round(risco_score, 1),
-            'classificacao': classificacao,
-            'recomendacao': recomendacao,
-            'timestamp': datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
-            'dados_entrada': dados,
-            'plots': dynamic_plots
-        }
-
-        # Salvar no histórico
-        self.historico_avaliacoes.append(resultado)
-
+            return self.renderizador.renderizar(tipo, *args)
+        except (RuntimeError, TimeoutError) as e:
+            raise GraficoIndisponivel(str(e) or type(e).__name__) from e
+
+    def usar_renderizador(self, estado):
+        """Os processos de renderização leem o modelo do arquivo: só valem para modelos com origem"""
+        return bool(self.renderizador.processos and estado.modelo.origem)
+
+    def recarregar_modelo(self, caminho=None, forcar=False):
+        """Recarrega o modelo e descarta os gráficos do modelo anterior"""
+        resultado = super().recarregar_modelo(caminho, forcar)
+        if resultado['recarregado']:
+            self.cache_graficos.limpar()
         return resultado
 
-    def calcular_risco_fallback(self, dados):
-        """Sistema de fallback quando o fuzzy falha"""
-        # Normalizar valores
-        renda_norm = min(dados['renda'] / 10000, 1.0)
-        historico_norm = dados['historico'] / 10
-        idade_factor = 1.0 if 25 <= dados['idade'] <= 55 else 0.7
-        emprego_factor = min(dados['tempo_emprego'] / 15, 1.0)
-        divida_penalty = dados['dividas'] / 100
-
-        # Cálculo híbrido fuzzy-like
-        score_positivo = (renda_norm * 0.35 + historico_norm * 0.30 +
-                         idade_factor * 0.15 + emprego_factor * 0.20)
-
-        risco_score = max(0, min(100, (1 - score_positivo + divida_penalty * 0.8) * 100))
-
-        return risco_score
-
-    def classificar_risco(self, score):
-        """Classifica o score de risco"""
-        if score <= 20:
-            return {"nivel": "MUITO BAIXO", "emoji": "🟢", "cor": "#28a745"}
-        elif score <= 40:
-            return {"nivel": "BAIXO", "emoji": "🔵", "cor": "#17a2b8"}
-        elif score <= 60:
-            return {"nivel": "MÉDIO", "emoji": "🟡", "cor": "#ffc107"}
-        elif score <= 80:
-            return {"nivel": "ALTO", "emoji": "🟠", "cor": "#fd7e14"}
-        else:
-            return {"nivel": "MUITO ALTO", "emoji": "🔴", "cor": "#dc3545"}
-
-    def gerar_recomendacao(self, risco_score, dados):
-        """Gera recomendação baseada no risco"""
-        if risco_score <= 30:
-            return {
-                "decisao": "✅ APROVADO",
-                "limite": min(dados['renda'] * 8, 50000),
-                "taxa": "Taxa preferencial (1.2% a.m.)",
-                "observacoes": "Cliente com excelente perfil. Baixo risco de inadimplência."
-            }
-        elif risco_score <= 50:
-            return {
-                "decisao": "⚠️ APROVADO COM RESTRIÇÕES",
-                "limite": min(dados['renda'] * 4, 25000),
-                "taxa": "Taxa intermediária (2.5% a.m.)",
-                "observacoes": "Bom perfil, mas requer acompanhamento."
-            }
-        elif risco_score <= 70:
-            return {
-                "decisao": "🔍 ANÁLISE MANUAL",
-                "limite": min(dados['renda'] * 2, 10000),
-                "taxa": "Taxa elevada (4.0% a.m.)",
-                "observacoes": "Requer análise detalhada e garantias adicionais."
-            }
-        else:
-            return {
-                "decisao": "❌ REPROVADO",
-                "limite": 0,
-                "taxa": "N/A",
-                "observacoes": "Alto risco de inadimplência. Crédito não recomendado."
-            }
-
 # Instância global do sistema
-sistema = SistemaRiscoFuzzy()
+sistema = SistemaRiscoWeb()
+metricas.medidor('risco_historico_registros', 'Avaliações guardadas no histórico',
+                 lambda: len(sistema.historico_avaliacoes))
+
+# FUZZY_MODELO_OBSERVAR=<segundos> recarrega o modelo sozinho quando o arquivo muda
+if float(os.environ.get('FUZZY_MODELO_OBSERVAR', 0)) > 0:
+    observar_modelo(sistema, float(os.environ['FUZZY_MODELO_OBSERVAR']))
 
 # Template HTML com seções adicionais sobre o projeto e lógica fuzzy
 HTML_TEMPLATE = """
@@ -606,6 +496,11 @@ HTML_TEMPLATE = """
             box-shadow: 0 4px 8px rgba(0,0,0,0.1);
         }
         
+        .plot-svg {
+            width: 100%;
+            background: white;
+        }
+        
         .plot-tabs {
             display: flex;
             margin: 20px 0;
@@ -773,23 +668,23 @@ HTML_TEMPLATE = """
                     <div class="plots-container">
                         <div class="plot-item">
                             <h3>Renda Mensal</h3>
-                            <img src="{{ plots.renda }}" alt="Funções de Pertinência - Renda" class="plot-img">
+                            <div data-variavel="renda" data-png="{{ plots.renda }}" data-alt="Funções de Pertinência - Renda"></div>
                         </div>
                         <div class="plot-item">
                             <h3>Score de Crédito</h3>
-                            <img src="{{ plots.historico }}" alt="Funções de Pertinência - Histórico" class="plot-img">
+                            <div data-variavel="historico" data-png="{{ plots.historico }}" data-alt="Funções de Pertinência - Histórico"></div>
                         </div>
                         <div class="plot-item">
                             <h3>Idade</h3>
-                            <img src="{{ plots.idade }}" alt="Funções de Pertinência - Idade" class="plot-img">
+                            <div data-variavel="idade" data-png="{{ plots.idade }}" data-alt="Funções de Pertinência - Idade"></div>
                         </div>
                         <div class="plot-item">
                             <h3>Tempo de Emprego</h3>
-                            <img src="{{ plots.tempo_emprego }}" alt="Funções de Pertinência - Tempo de Emprego" class="plot-img">
+                            <div data-variavel="tempo_emprego" data-png="{{ plots.tempo_emprego }}" data-alt="Funções de Pertinência - Tempo de Emprego"></div>
                         </div>
                         <div class="plot-item">
                             <h3>Percentual de Dívidas</h3>
-                            <img src="{{ plots.dividas }}" alt="Funções de Pertinência - Dívidas" class="plot-img">
+                            <div data-variavel="dividas" data-png="{{ plots.dividas }}" data-alt="Funções de Pertinência - Dívidas"></div>
                         </div>
                     </div>
                 </div>
@@ -798,7 +693,7 @@ HTML_TEMPLATE = """
                     <div class="plots-container">
                         <div class="plot-item" style="grid-column: span 2;">
                             <h3>Risco de Crédito (Saída)</h3>
-                            <img src="{{ plots.risco }}" alt="Funções de Pertinência - Risco" class="plot-img">
+                            <div data-variavel="risco" data-png="{{ plots.risco }}" data-alt="Funções de Pertinência - Risco"></div>
                         </div>
                     </div>
                 </div>
@@ -1027,10 +922,145 @@ HTML_TEMPLATE = """
             resultContent.innerHTML = html;
         }
         
-        function mostrarGraficosDinamicos(resultado) {
+        // === GRÁFICOS DESENHADOS NO NAVEGADOR ===
+        // O servidor envia só o universo e os vértices [a, b, c] de cada termo (/pertinencias, ~1,5 KB
+        // para o modelo todo); curvas, eixos e o marcador do valor atual viram SVG aqui.
+        // Se esses dados não chegarem, a página usa os PNGs renderizados pelo servidor.
+        const CORES_TERMOS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+                              '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'];
+        let pertinencias = null;
+        // Assinatura do modelo dessas curvas (ETag de /pertinencias), comparada com a de cada avaliação
+        let modeloPertinencias = null;
+        
+        function escaparHtml(texto) {
+            const entidades = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'};
+            return String(texto).replace(/[&<>"']/g, c => entidades[c]);
+        }
+        
+        // Grau de pertinência de x no triângulo [a, b, c] (mesma fórmula do trimf)
+        function grauTriangulo([a, b, c], x) {
+            if (x < a || x > c) {
+                return 0;
+            }
+            if (x === b) {
+                return 1;
+            }
+            return x < b ? (x - a) / (b - a) : (c - x) / (c - b);
+        }
+        
+        // Marcas do eixo em passos "redondos" (1, 2 ou 5 × 10^n)
+        function marcasEixo(minimo, maximo, quantidade = 8) {
+            const bruto = (maximo - minimo) / quantidade;
+            const potencia = 10 ** Math.floor(Math.log10(bruto));
+            const passo = [1, 2, 5, 10].map(m => m * potencia).find(p => p >= bruto);
+            const marcas = [];
+            for (let v = Math.ceil(minimo / passo) * passo; v <= maximo + passo * 1e-9; v += passo) {
+                marcas.push(Number(v.toPrecision(12)));
+            }
+            return marcas;
+        }
+        
+        // SVG com as funções de pertinência de uma variável e, se informado, o valor atual destacado
+        function graficoPertinencia(dados, valor) {
+            const largura = 640, altura = 380, esquerda = 60, direita = 150, topo = 40, base = 55;
+            const larguraEixos = largura - esquerda - direita, alturaEixos = altura - topo - base;
+            const [minimo, maximo] = dados.universo;
+            const px = x => (esquerda + (x - minimo) / (maximo - minimo) * larguraEixos).toFixed(1);
+            const py = y => (topo + (1 - y / 1.1) * alturaEixos).toFixed(1);
+            const legenda = (i, cor, texto, tracejado = '') => `
+                <line x1="${largura - direita + 12}" y1="${topo + 12 + i * 20}" x2="${largura - direita + 36}"
+                      y2="${topo + 12 + i * 20}" stroke="${cor}" stroke-width="2" ${tracejado}/>
+                <text x="${largura - direita + 42}" y="${topo + 16 + i * 20}">${escaparHtml(texto)}</text>`;
+            const partes = [];
+            
+            // Grade e marcas dos eixos (y de 0 a 1,1, como nos PNGs)
+            for (const x of marcasEixo(minimo, maximo)) {
+                partes.push(`<line x1="${px(x)}" y1="${topo}" x2="${px(x)}" y2="${topo + alturaEixos}" stroke="#ddd"/>
+                    <text x="${px(x)}" y="${topo + alturaEixos + 16}" text-anchor="middle">${x.toLocaleString('pt-BR')}</text>`);
+            }
+            for (const y of [0, 0.2, 0.4, 0.6, 0.8, 1]) {
+                partes.push(`<line x1="${esquerda}" y1="${py(y)}" x2="${esquerda + larguraEixos}" y2="${py(y)}" stroke="#ddd"/>
+                    <text x="${esquerda - 6}" y="${Number(py(y)) + 4}" text-anchor="end">${y.toLocaleString('pt-BR', {minimumFractionDigits: 1})}</text>`);
+            }
+            partes.push(`<rect x="${esquerda}" y="${topo}" width="${larguraEixos}" height="${alturaEixos}" fill="none" stroke="#333"/>`);
+            
+            // Uma linha por termo: os vértices bastam, o trecho entre eles é reto
+            Object.entries(dados.termos).forEach(([termo, vertices], i) => {
+                const cor = CORES_TERMOS[i % CORES_TERMOS.length];
+                const xs = [...new Set([minimo, ...vertices, maximo])].sort((p, q) => p - q);
+                const pontos = xs.map(x => `${px(x)},${py(grauTriangulo(vertices, x))}`).join(' ');
+                partes.push(`<polyline points="${pontos}" fill="none" stroke="${cor}" stroke-width="2"/>`,
+                            legenda(i, cor, termo));
+            });
+            
+            // Valor atual: linha tracejada, presa às bordas do universo como no PNG
+            if (valor !== undefined && valor !== null && valor !== '' && !isNaN(Number(valor))) {
+                const x = px(Math.min(Math.max(Number(valor), minimo), maximo));
+                partes.push(`<line x1="${x}" y1="${topo}" x2="${x}" y2="${topo + alturaEixos}"
+                                   stroke="red" stroke-width="2" stroke-dasharray="6 4"/>
+                    <text x="${x}" y="${py(1.05)}" text-anchor="middle" fill="red">Valor atual: ${escaparHtml(valor)}</text>`,
+                            legenda(Object.keys(dados.termos).length, 'red', 'Valor atual', 'stroke-dasharray="6 4"'));
+            }
+            
+            // Título e rótulos dos eixos
+            partes.push(`<text x="${esquerda + larguraEixos / 2}" y="22" text-anchor="middle" font-size="15">${escaparHtml(dados.titulo)}</text>
+                <text x="${esquerda + larguraEixos / 2}" y="${altura - 12}" text-anchor="middle" font-size="13">${escaparHtml(dados.rotulo_x)}</text>
+                <text transform="translate(16 ${topo + alturaEixos / 2}) rotate(-90)" text-anchor="middle" font-size="13">${escaparHtml(dados.rotulo_y)}</text>`);
+            
+            return `<svg class="plot-img plot-svg" viewBox="0 0 ${largura} ${altura}" role="img"
+                         aria-label="${escaparHtml(dados.titulo)}" font-family="DejaVu Sans, Arial, sans-serif"
+                         font-size="12">${partes.join('')}</svg>`;
+        }
+        
+        // Gráficos da aba "Funções de Pertinência": SVG com os dados do modelo ou, sem eles, os PNGs
+        function desenharGraficosEstaticos() {
+            for (const caixa of document.querySelectorAll('[data-variavel]')) {
+                const dados = pertinencias && pertinencias[caixa.dataset.variavel];
+                caixa.innerHTML = dados
+                    ? graficoPertinencia(dados)
+                    : `<img src="${caixa.dataset.png}" alt="${caixa.dataset.alt}" class="plot-img" onerror="tentarNovamente(this)">`;
+            }
+        }
+        
+        function carregarPertinencias(url) {
+            return fetch(url)
+                .then(resposta => resposta.ok
+                    ? resposta.json().then(dados => [dados, (resposta.headers.get('ETag') || '').replace(/^W\//, '').replace(/"/g, '')])
+                    : [null, null])
+                .catch(() => [null, null])
+                .then(([dados, modelo]) => {
+                    pertinencias = dados;
+                    modeloPertinencias = modelo;
+                    desenharGraficosEstaticos();
+                });
+        }
+        
+        carregarPertinencias('{{ pertinencias_url }}');
+        
+        // Gráfico recusado (503 com a fila de renderização cheia): tenta de novo com espera crescente
+        function tentarNovamente(img) {
+            const tentativas = Number(img.dataset.tentativas || 0);
+            if (tentativas >= 4) {
+                return;
+            }
+            img.dataset.tentativas = tentativas + 1;
+            const url = new URL(img.src);
+            url.searchParams.set('tentativa', tentativas + 1);
+            setTimeout(() => { img.src = url.toString(); }, 1000 * 2 ** tentativas);
+        }
+        
+        async function mostrarGraficosDinamicos(resultado) {
             if (!resultado.plots || Object.keys(resultado.plots).length === 0) {
                 return;
             }
+            const dados = resultado.dados_entrada || {};
+            
+            // Modelo recarregado no servidor depois que a página buscou as curvas: busca as do modelo atual
+            if (pertinencias && resultado.modelo && resultado.modelo !== modeloPertinencias) {
+                await carregarPertinencias(`/pertinencias?v=${encodeURIComponent(resultado.modelo)}`);
+            }
+            // Curvas de outro modelo nunca desenham esta avaliação: nesse caso vale o PNG do servidor
+            const curvas = resultado.modelo && resultado.modelo === modeloPertinencias ? pertinencias : null;
             
             const dynamicPlotsSection = document.getElementById('dynamicPlotsSection');
             const dynamicPlotsContainer = document.getElementById('dynamicPlotsContainer');
@@ -1061,10 +1091,15 @@ HTML_TEMPLATE = """
                         title = key.charAt(0).toUpperCase() + key.slice(1);
                 }
                 
+                // Com as curvas do modelo carregadas, o gráfico é desenhado aqui; senão, o PNG do servidor
+                const grafico = curvas && curvas[key]
+                    ? graficoPertinencia(curvas[key], dados[key])
+                    : `<img src="${plotUrl}" alt="Função de Pertinência - ${title}" class="plot-img" loading="lazy" onerror="tentarNovamente(this)">`;
+                
                 html += `
                     <div class="plot-item">
                         <h3>${title}</h3>
-                        <img src="${plotUrl}" alt="Função de Pertinência - ${title}" class="plot-img">
+                        ${grafico}
                     </div>
                 `;
             }
@@ -1073,52 +1108,65 @@ HTML_TEMPLATE = """
             dynamicPlotsSection.style.display = 'block';
         }
 
+        // Campos usados na tabela: o servidor não precisa enviar dados_entrada
+        const CAMPOS_HISTORICO = 'nome,risco_score,classificacao,recomendacao,timestamp';
+
+        function linhaHistorico(item) {
+            return `
+                <tr>
+                    <td>${item.nome}</td>
+                    <td>${item.risco_score}</td>
+                    <td style="color: ${item.classificacao.cor};">
+                        ${item.classificacao.emoji} ${item.classificacao.nivel}
+                    </td>
+                    <td>${item.recomendacao.decisao}</td>
+                    <td>R$ ${item.recomendacao.limite.toLocaleString('pt-BR')}</td>
+                    <td>${item.timestamp.split(' ')[1]}</td>
+                </tr>
+            `;
+        }
+
         async function carregarHistorico() {
             try {
-                const response = await fetch('/historico');
-                const historico = await response.json();
+                // NDJSON: cada avaliação chega em uma linha e entra na tabela assim que é lida
+                const response = await fetch(`/historico?formato=ndjson&limite=200&campos=${CAMPOS_HISTORICO}`);
+                const leitor = response.body.getReader();
+                const decodificador = new TextDecoder();
+                const historicoSection = document.getElementById('historicoSection');
+                const historicoContent = document.getElementById('historicoContent');
+                let tbody = null;
+                let pendente = '';
                 
-                if (historico.length > 0) {
-                    const historicoSection = document.getElementById('historicoSection');
-                    const historicoContent = document.getElementById('historicoContent');
-                    
-                    let html = `
-                        <table>
-                            <thead>
-                                <tr>
-                                    <th>Nome</th>
-                                    <th>Score</th>
-                                    <th>Classificação</th>
-                                    <th>Decisão</th>
-                                    <th>Limite</th>
-                                    <th>Hora</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                    `;
-                    
-                    historico.forEach(item => {
-                        html += `
-                            <tr>
-                                <td>${item.nome}</td>
-                                <td>${item.risco_score}</td>
-                                <td style="color: ${item.classificacao.cor};">
-                                    ${item.classificacao.emoji} ${item.classificacao.nivel}
-                                </td>
-                                <td>${item.recomendacao.decisao}</td>
-                                <td>R$ ${item.recomendacao.limite.toLocaleString('pt-BR')}</td>
-                                <td>${item.timestamp.split(' ')[1]}</td>
-                            </tr>
-                        `;
-                    });
+                while (true) {
+                    const { done, value } = await leitor.read();
+                    pendente += decodificador.decode(value || new Uint8Array(), { stream: !done });
+                    const linhas = pendente.split('\\n');
+                    pendente = done ? '' : linhas.pop();
+                    const itens = linhas.filter(linha => linha.trim()).map(linha => JSON.parse(linha));
                     
-                    html += `
-                            </tbody>
-                        </table>
-                    `;
-                    
-                    historicoContent.innerHTML = html;
-                    historicoSection.style.display = 'block';
+                    if (itens.length > 0) {
+                        if (!tbody) {
+                            historicoContent.innerHTML = `
+                                <table>
+                                    <thead>
+                                        <tr>
+                                            <th>Nome</th>
+                                            <th>Score</th>
+                                            <th>Classificação</th>
+                                            <th>Decisão</th>
+                                            <th>Limite</th>
+                                            <th>Hora</th>
+                                        </tr>
+                                    </thead>
+                                    <tbody></tbody>
+                                </table>
+                            `;
+                            tbody = historicoContent.querySelector('tbody');
+                            historicoSection.style.display = 'block';
+                        }
+                        tbody.insertAdjacentHTML('beforeend', itens.map(linhaHistorico).join(''));
+                    }
+                    if (done) break;
                 }
             } catch (error) {
                 console.error('Erro ao carregar histórico:', error);
@@ -1132,30 +1180,245 @@ HTML_TEMPLATE = """
 </html>
 """
 
+@app.before_request
+def iniciar_cronometro():
+    g.inicio = time.perf_counter()
+
+def contar_bytes(corpo, rota):
+    """Repassa um corpo em streaming contando os bytes quando ele termina"""
+    enviados = 0
+    try:
+        for pedaco in corpo:
+            enviados += len(pedaco)
+            yield pedaco
+    finally:
+        BYTES_RESPOSTA.incrementar(enviados, rota=rota)
+        if hasattr(corpo, 'close'):
+            corpo.close()
+
+@app.after_request
+def registrar_metricas(resposta):
+    """Duração, status e bytes de cada resposta (rota = endpoint do Flask)"""
+    rota = request.endpoint or 'desconhecida'
+    if 'inicio' in g:
+        REQUISICOES.observar(time.perf_counter() - g.inicio, rota=rota, metodo=request.method)
+    RESPOSTAS.incrementar(rota=rota, status=str(resposta.status_code))
+    if resposta.direct_passthrough:
+        # Arquivos (send_file) vão direto ao servidor: o tamanho vem do cabeçalho
+        BYTES_RESPOSTA.incrementar(resposta.content_length or 0, rota=rota)
+    elif resposta.is_streamed:
+        # O corpo ainda não foi gerado: conta ao final do envio
+        resposta.response = contar_bytes(resposta.response, rota)
+    else:
+        BYTES_RESPOSTA.incrementar(resposta.content_length or 0, rota=rota)
+    return resposta
+
+@app.errorhandler(FilaCheia)
+def fila_graficos_cheia(erro):
+    """503 quando os processos de renderização já têm gráficos demais na fila"""
+    resposta = Response('Fila de gráficos cheia, tente de novo', status=503, mimetype='text/plain')
+    resposta.headers['Retry-After'] = '1'
+    return resposta
+
+@app.errorhandler(GraficoIndisponivel)
+def grafico_indisponivel(erro):
+    """503 quando o pool de renderização falhou (mesma resposta do serviço ASGI)"""
+    print(f"⚠️ Erro ao renderizar o gráfico: {erro}")
+    resposta = Response('Gráfico indisponível no momento, tente de novo', status=503, mimetype='text/plain')
+    resposta.headers['Retry-After'] = '1'
+    return resposta
+
+@app.errorhandler(ModeloSubstituido)
+def modelo_substituido(erro):
+    """410 para o gráfico de uma avaliação feita com um modelo que já foi recarregado"""
+    return jsonify({'erro': str(erro), 'modelo': erro.avaliado, 'modelo_atual': erro.atual}), 410
+
+@app.route('/metrics', methods=['GET'])
+def metricas_prometheus():
+    """Métricas no formato de texto do Prometheus (etapas, fallback, histórico e HTTP)"""
+    return Response(metricas.REGISTRO.texto(), content_type=metricas.TIPO_CONTEUDO)
+
 @app.route('/')
 def index():
     """Página principal"""
-    return render_template_string(HTML_TEMPLATE, plots=sistema.plots)
+    return render_template_string(HTML_TEMPLATE, plots=sistema.plots,
+                                  pertinencias_url=f'/pertinencias?v={sistema.estado.modelo.assinatura}')
 
 @app.route('/avaliar', methods=['POST'])
 def avaliar():
-    """Endpoint para avaliar cliente"""
+    """Endpoint para avaliar cliente (?plots=0 para só o score, ?explicar=1 para as regras disparadas)"""
     try:
         dados = request.get_json()
-        resultado = sistema.avaliar_cliente(dados)
+        incluir_graficos = dados.pop('incluir_graficos', request.args.get('plots', '1') != '0')
+        explicar = dados.pop('explicar', request.args.get('explicar', '0') == '1')
+        resultado = sistema.avaliar_cliente(dados, incluir_graficos=incluir_graficos, explicar=explicar)
         return jsonify(resultado)
     except Exception as e:
         return jsonify({'erro': str(e)}), 400
 
+@app.route('/avaliar/lote', methods=['POST'])
+def avaliar_lote_csv():
+    """Avalia um CSV de clientes em blocos e devolve o resultado em streaming
+
+    O CSV (colunas de `exemplos/dados_exemplo.csv`) vem no corpo da requisição
+    (`Content-Type: text/csv`) ou no campo `arquivo` de um formulário
+    multipart. `?formato=ndjson` troca a saída CSV por uma linha JSON por
+    cliente; `?bloco=` define quantas linhas são avaliadas de cada vez. As
+    avaliações em lote não entram no histórico.
+    """
+    formato = request.args.get('formato', 'csv')
+    if formato not in ('csv', 'ndjson'):
+        return jsonify({'erro': f"Formato desconhecido: {formato} (use csv, ndjson)"}), 400
+    try:
+        tamanho_bloco = min(max(int(request.args.get('bloco', TAMANHO_BLOCO)), 1), 10000)
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+
+    entrada = request.stream
+    if 'arquivo' in request.files:
+        # Os arquivos do formulário são fechados ao fim da view, antes do streaming:
+        # o upload vai para um temporário próprio (em disco, sem carregar na memória)
+        entrada = tempfile.TemporaryFile()
+        shutil.copyfileobj(request.files['arquivo'].stream, entrada)
+        entrada.seek(0)
+    arquivo = io.TextIOWrapper(entrada, encoding='utf-8-sig', newline='')
+    # Um único estado para o arquivo inteiro, mesmo se o modelo for recarregado no meio
+    estado = sistema.estado
+    try:
+        colunas, blocos = avaliar_csv(sistema, arquivo, tamanho_bloco, estado)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'erro': str(e)}), 400
+
+    if formato == 'ndjson':
+        resposta = Response(stream_with_context(escrever_ndjson(blocos)), mimetype='application/x-ndjson')
+    else:
+        resposta = Response(stream_with_context(escrever_csv(colunas, blocos)), mimetype='text/csv')
+        resposta.headers['Content-Disposition'] = 'attachment; filename=avaliacoes.csv'
+    resposta.headers['X-Modelo'] = estado.modelo.assinatura
+    return resposta
+
+@app.route('/plots/<variavel>.<formato>', methods=['GET'])
+def grafico_estatico(variavel, formato):
+    """Gráfico estático de uma variável (png ou svg), servido do cache em disco"""
+    if variavel not in STATIC_PLOTS or formato not in PLOT_FORMATS:
+        abort(404)
+
+    caminho, versao = sistema.arquivo_grafico(variavel, formato)
+    # ETag = hash da configuração; conditional=True responde 304 a If-None-Match
+    return send_file(caminho, mimetype=PLOT_FORMATS[formato], etag=versao,
+                     max_age=86400, conditional=True)
+
+@app.route('/pertinencias', methods=['GET'])
+def pertinencias():
+    """Universo e vértices [a, b, c] dos termos de cada variável, para a página desenhar os gráficos"""
+    estado = sistema.estado
+    # Sem ordenar as chaves: a ordem dos termos é a do modelo (cores e legenda iguais às do PNG)
+    corpo = app.json.dumps(generate_membership_plots(estado, output='json'), sort_keys=False,
+                           separators=(',', ':'))
+    resposta = Response(corpo, mimetype='application/json')
+    resposta.set_etag(estado.modelo.assinatura)
+    resposta.cache_control.public = True
+    resposta.cache_control.max_age = 86400
+    return resposta.make_conditional(request)
+
+@app.route('/avaliacao/<avaliacao_id>/plots/<variavel>', methods=['GET'])
+def grafico_avaliacao(avaliacao_id, variavel):
+    """Renderiza sob demanda o gráfico de uma variável com o valor do cliente"""
+    resultado = sistema.obter_avaliacao(avaliacao_id)
+    if resultado is None or variavel not in DYNAMIC_PLOTS:
+        abort(404)
+
+    estado = sistema.estado_avaliacao(resultado)
+    png = sistema.grafico_dinamico(resultado['dados_entrada'], variavel, estado)
+    resposta = Response(png, mimetype='image/png')
+    resposta.headers['Cache-Control'] = 'private, max-age=3600'
+    return resposta
+
+def ler_instante(valor):
+    """Instante de um parâmetro de consulta: epoch em segundos ou data ISO 8601"""
+    if valor is None:
+        return None
+    try:
+        return float(valor)
+    except ValueError:
+        return datetime.fromisoformat(valor).timestamp()
+
 @app.route('/historico', methods=['GET'])
 def historico():
-    """Endpoint para obter histórico"""
-    return jsonify(sistema.historico_avaliacoes)
+    """Endpoint para obter histórico (paginado, mais recentes primeiro)
+
+    Parâmetros: `limite` (padrão 50, máximo 500), `cursor` (o `proximo` da
+    página anterior) ou `deslocamento`, o período `inicio`/`fim` (epoch ou
+    ISO 8601) e `campos` separados por vírgula. Com `formato=ndjson` o
+    período inteiro (ou até `limite` registros) é transmitido um por linha.
+    """
+    try:
+        limite = int(request.args['limite']) if 'limite' in request.args else None
+        deslocamento = max(int(request.args.get('deslocamento', 0)), 0)
+        cursor = int(request.args['cursor']) if request.args.get('cursor') else None
+        inicio = ler_instante(request.args.get('inicio'))
+        fim = ler_instante(request.args.get('fim'))
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+
+    campos = request.args.get('campos')
+    campos = [campo.strip() for campo in campos.split(',') if campo.strip()] if campos else None
+
+    if request.args.get('formato') == 'ndjson':
+        registros = sistema.historico_avaliacoes.iterar(inicio, fim, cursor)
+        if limite is not None:
+            registros = islice(registros, max(limite, 0))
+        linhas = (json.dumps(projetar(registro, campos), ensure_ascii=False) + '\n'
+                  for registro in registros)
+        return Response(stream_with_context(linhas), mimetype='application/x-ndjson')
+
+    limite = min(max(limite or 50, 1), 500)
+    itens, total, proximo = sistema.historico_avaliacoes.listar(
+        limite, deslocamento, inicio, fim, cursor)
+    return jsonify({'itens': [projetar(registro, campos) for registro in itens],
+                    'total': total, 'limite': limite, 'proximo': proximo})
+
+def exigir_admin():
+    """403 sem o cabeçalho X-Admin-Token igual a FUZZY_ADMIN_TOKEN
+
+    Sem FUZZY_ADMIN_TOKEN configurado as rotas de administração ficam
+    fechadas: atrás da ponte ASGI ou de um proxy o endereço de origem é
+    sempre local e não serve para autorizar ninguém.
+    """
+    token = os.environ.get('FUZZY_ADMIN_TOKEN')
+    if not token:
+        abort(403, description='Rotas de administração desativadas: configure FUZZY_ADMIN_TOKEN')
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode('utf-8'), token.encode('utf-8')):
+        abort(403)
+
+@app.route('/admin/recarregar', methods=['POST'])
+def recarregar_modelo():
+    """Relê o arquivo do modelo e troca o sistema fuzzy sem reiniciar (?forcar=1 remonta sempre)
+
+    Exige o cabeçalho X-Admin-Token igual a FUZZY_ADMIN_TOKEN; sem token
+    configurado, recusa todas as chamadas.
+    """
+    exigir_admin()
+    try:
+        resultado = sistema.recarregar_modelo(forcar=request.args.get('forcar', '0') == '1')
+    except Exception as e:
+        return jsonify({'erro': f'Modelo inválido, mantido o atual: {e}'}), 400
+    return jsonify(resultado)
+
+@app.route('/admin/cache', methods=['GET', 'DELETE'])
+def cache_admin():
+    """Estatísticas dos caches de avaliações e de gráficos (DELETE invalida os dois)"""
+    exigir_admin()
+    if request.method == 'DELETE':
+        sistema.cache.limpar()
+        sistema.cache_graficos.limpar()
+    return jsonify({'avaliacoes': sistema.cache.estatisticas(),
+                    'graficos': sistema.cache_graficos.estatisticas()})
 
 @app.route('/limpar', methods=['POST'])
 def limpar_historico():
     """Endpoint para limpar histórico"""
-    sistema.historico_avaliacoes.clear()
+    sistema.historico_avaliacoes.limpar()
     return jsonify({'success': True})
 
 if __name__ == '__main__':
@@ -1163,6 +1426,7 @@ if __name__ == '__main__':
     print("🧠 Usando scikit-fuzzy para Lógica Fuzzy REAL")
     print("📱 Acesse: http://localhost:5000")
     print("⚡ Compatible com Python 3.11")
+    print(f"⚙️ Backend de inferência: {sistema.backend} (defuzzificação: {sistema.defuzz})")
     print("🔥 Pressione Ctrl+C para parar")
 
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,135 @@
+"""
+Avaliação em lote de arquivos de clientes
+Lê linhas no formato de `exemplos/dados_exemplo.csv` em blocos, calcula os
+scores de cada bloco de uma vez (`SistemaRiscoFuzzy.avaliar_lote`) e devolve
+as linhas com classificação e recomendação. Só um bloco fica em memória por
+vez, qualquer que seja o tamanho do arquivo.
+"""
+
+import csv
+import io
+import json
+import math
+
+import numpy as np
+
+# Campo de `avaliar_cliente` -> colunas aceitas no arquivo (nome do CSV de exemplo primeiro)
+COLUNAS_ENTRADA = {
+    'renda': ('renda',),
+    'historico': ('historico_credito', 'historico'),
+    'idade': ('idade',),
+    'tempo_emprego': ('tempo_emprego',),
+    'dividas': ('percentual_dividas', 'dividas'),
+}
+
+# Colunas acrescentadas a cada linha avaliada
+COLUNAS_RESULTADO = ('risco_score', 'classificacao', 'decisao', 'limite', 'taxa', 'observacoes', 'erro')
+
+TAMANHO_BLOCO = 1000
+
+
+def mapear_colunas(cabecalho):
+    """Coluna do arquivo usada para cada campo de entrada; ValueError se faltar alguma"""
+    mapa, faltando = {}, []
+    for campo, aceitas in COLUNAS_ENTRADA.items():
+        coluna = next((nome for nome in aceitas if nome in cabecalho), None)
+        if coluna is None:
+            faltando.append(aceitas[0])
+        mapa[campo] = coluna
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+    return mapa
+
+
+def colunas_saida(cabecalho):
+    """Colunas do arquivo de saída: as da entrada seguidas das de resultado"""
+    return list(cabecalho) + [coluna for coluna in COLUNAS_RESULTADO if coluna not in cabecalho]
+
+
+def em_blocos(linhas, tamanho=TAMANHO_BLOCO):
+    """Agrupa um iterável de linhas em listas de até `tamanho` linhas"""
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha)
+        if len(bloco) == tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def avaliar_bloco(sistema, linhas, mapa, estado=None):
+    """Avalia um bloco de linhas (dicts) e devolve as linhas com as colunas de resultado
+
+    Linhas com valor não numérico não são avaliadas: saem com a coluna `erro`.
+    """
+    n = len(linhas)
+    colunas = {campo: np.full(n, np.nan) for campo in mapa}
+    erros = [''] * n
+    for i, linha in enumerate(linhas):
+        for campo, coluna in mapa.items():
+            try:
+                colunas[campo][i] = float(linha[coluna])
+            except (TypeError, ValueError):
+                erros[i] = f"valor inválido em {coluna}: {linha[coluna]!r}"
+        if not erros[i] and any(math.isnan(colunas[campo][i]) for campo in mapa):
+            erros[i] = "valor ausente"
+
+    scores = sistema.avaliar_lote(colunas, estado=estado)
+
+    resultado = []
+    for i, linha in enumerate(linhas):
+        saida = dict(linha)
+        if erros[i]:
+            saida.update(dict.fromkeys(COLUNAS_RESULTADO, ''), erro=erros[i])
+        else:
+            score = round(float(scores[i]), 1)
+            dados = {campo: colunas[campo][i] for campo in mapa}
+            recomendacao = sistema.gerar_recomendacao(score, dados)
+            saida.update(risco_score=score,
+                         classificacao=sistema.classificar_risco(score)['nivel'],
+                         decisao=recomendacao['decisao'],
+                         limite=float(recomendacao['limite']),
+                         taxa=recomendacao['taxa'],
+                         observacoes=recomendacao['observacoes'],
+                         erro='')
+        resultado.append(saida)
+    return resultado
+
+
+def avaliar_csv(sistema, arquivo, tamanho_bloco=TAMANHO_BLOCO, estado=None):
+    """Lê um CSV (arquivo texto) e devolve (cabeçalho de saída, gerador de blocos avaliados)
+
+    O cabeçalho é lido e validado antes de o gerador começar, para que um
+    arquivo sem as colunas obrigatórias falhe logo.
+    """
+    leitor = csv.DictReader(arquivo)
+    cabecalho = leitor.fieldnames or []
+    mapa = mapear_colunas(cabecalho)
+    estado = estado or sistema.estado
+    colunas = colunas_saida(cabecalho)
+    blocos = (avaliar_bloco(sistema, bloco, mapa, estado) for bloco in em_blocos(leitor, tamanho_bloco))
+    return colunas, blocos
+
+
+def formatar_csv(colunas, linhas, cabecalho=False):
+    """Texto CSV das linhas (dicts), com o cabeçalho se `cabecalho`"""
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=colunas, extrasaction='ignore', lineterminator='\n')
+    if cabecalho:
+        escritor.writeheader()
+    escritor.writerows(linhas)
+    return buffer.getvalue()
+
+
+def escrever_csv(colunas, blocos):
+    """Texto CSV, um pedaço por bloco (cabeçalho primeiro)"""
+    yield formatar_csv(colunas, [], cabecalho=True)
+    for bloco in blocos:
+        yield formatar_csv(colunas, bloco)
+
+
+def escrever_ndjson(blocos):
+    """Uma linha JSON por cliente, um pedaço por bloco"""
+    for bloco in blocos:
+        yield ''.join(json.dumps(linha, ensure_ascii=False) + '\n' for linha in bloco)
@@ -0,0 +1,177 @@
+"""
+Avaliação de carteiras grandes em vários processos
+Lê um CSV ou Parquet de clientes em blocos, distribui os blocos entre
+processos (cada um monta o núcleo `sistema_risco` uma única vez, sem Flask nem gráficos) e
+grava o resultado em CSV ou NDJSON à medida que os blocos terminam, na
+ordem do arquivo de entrada. O progresso fica em `<saida>.progresso.json`,
+e `--retomar` continua a partir do último bloco gravado.
+
+    python avaliar_carteira.py clientes.csv avaliacoes.csv --processos 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from itertools import islice
+
+from avaliacao_lote import avaliar_bloco, colunas_saida, em_blocos, formatar_csv, mapear_colunas
+from modelo_fuzzy import ModeloFuzzy
+from sistema_risco import CAMPOS_ENTRADA, SistemaRiscoFuzzy
+
+TAMANHO_BLOCO = 20000
+
+# Sistema fuzzy de cada processo (montado uma vez em `_iniciar_processo`)
+_sistema = None
+
+
+def _iniciar_processo(backend, defuzz, modelo):
+    """Monta o sistema fuzzy do processo com o backend, a defuzzificação e o modelo pedidos"""
+    global _sistema
+    _sistema = SistemaRiscoFuzzy(backend, defuzz, modelo)
+
+
+def _avaliar(linhas, mapa, colunas, formato):
+    """Avalia um bloco no processo e devolve (texto já formatado, número de linhas)"""
+    avaliadas = avaliar_bloco(_sistema, linhas, mapa)
+    if formato == 'ndjson':
+        texto = ''.join(json.dumps(linha, ensure_ascii=False, default=str) + '\n' for linha in avaliadas)
+    else:
+        texto = formatar_csv(colunas, avaliadas)
+    return texto, len(linhas)
+
+
+def ler_blocos(caminho, tamanho_bloco):
+    """(cabeçalho, gerador de blocos de linhas) de um arquivo CSV ou Parquet"""
+    if caminho.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌ Para ler Parquet instale o pyarrow (pip install pyarrow)")
+        arquivo = pq.ParquetFile(caminho)
+        return arquivo.schema_arrow.names, (lote.to_pylist() for lote in arquivo.iter_batches(tamanho_bloco))
+
+    # O gerador já começa parado dentro do `with`: fechá-lo (mesmo antes da
+    # primeira linha) fecha o arquivo
+    blocos = _blocos_csv(caminho, tamanho_bloco)
+    return next(blocos), blocos
+
+
+def _blocos_csv(caminho, tamanho_bloco):
+    """Gera o cabeçalho do CSV e depois os blocos de linhas"""
+    with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+        leitor = csv.DictReader(arquivo)
+        yield leitor.fieldnames or []
+        yield from em_blocos(leitor, tamanho_bloco)
+
+
+def gravar_progresso(caminho, progresso):
+    """Grava o progresso em arquivo temporário e renomeia (nunca fica pela metade)"""
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(progresso, arquivo)
+    os.replace(temporario, caminho)
+
+
+def avaliar_carteira(entrada, saida, processos=None, tamanho_bloco=TAMANHO_BLOCO, retomar=False,
+                     backend=None, defuzz=None, modelo=None):
+    """Avalia o arquivo `entrada` e grava em `saida`; retorna o resumo da execução"""
+    processos = processos or os.cpu_count() or 1
+    backend = backend or os.environ.get('FUZZY_BACKEND', 'nativo')
+    defuzz = defuzz or os.environ.get('FUZZY_DEFUZZ', 'centroid')
+    modelo = ModeloFuzzy.carregar(modelo, CAMPOS_ENTRADA.values())
+    formato = 'ndjson' if saida.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+    cabecalho, blocos = ler_blocos(entrada, tamanho_bloco)
+    # Fecha o arquivo de entrada também quando a execução para antes do fim
+    with closing(blocos):
+        mapa = mapear_colunas(cabecalho)
+        colunas = colunas_saida(cabecalho)
+
+        # Identifica a execução: só é possível retomar com a mesma entrada, blocos e modelo
+        execucao = {'entrada': os.path.abspath(entrada), 'tamanho_bloco': tamanho_bloco,
+                    'modelo': modelo.assinatura, 'backend': backend, 'defuzz': defuzz, 'formato': formato}
+        caminho_progresso = f'{saida}.progresso.json'
+        progresso = dict(execucao, blocos=0, linhas=0, bytes=0, concluido=False)
+
+        if retomar and os.path.exists(caminho_progresso) and os.path.exists(saida):
+            with open(caminho_progresso, encoding='utf-8') as arquivo:
+                anterior = json.load(arquivo)
+            diferencas = [chave for chave in execucao if anterior.get(chave) != execucao[chave]]
+            if diferencas:
+                raise SystemExit(f"❌ Não é possível retomar: {', '.join(diferencas)} "
+                                 f"mudou desde a execução anterior")
+            progresso = anterior
+            if progresso['concluido']:
+                print(f"✅ {saida} já está completo ({progresso['linhas']} linhas)")
+                return progresso
+            print(f"⏩ Retomando após o bloco {progresso['blocos']} ({progresso['linhas']} linhas já gravadas)")
+            # Descarta o que foi escrito depois do último bloco registrado
+            os.truncate(saida, progresso['bytes'])
+            blocos = islice(blocos, progresso['blocos'], None)
+
+        arquivo_saida = open(saida, 'ab' if progresso['blocos'] else 'wb')
+        if not progresso['blocos'] and formato == 'csv':
+            arquivo_saida.write(formatar_csv(colunas, [], cabecalho=True).encode('utf-8'))
+
+        print(f"🚀 Avaliando {entrada} com {processos} processos (blocos de {tamanho_bloco} linhas)")
+        inicio = time.perf_counter()
+        linhas_sessao = 0
+
+        def gravar(futuro):
+            nonlocal linhas_sessao
+            texto, linhas = futuro.result()
+            arquivo_saida.write(texto.encode('utf-8'))
+            arquivo_saida.flush()
+            os.fsync(arquivo_saida.fileno())
+
+            linhas_sessao += linhas
+            progresso.update(blocos=progresso['blocos'] + 1, linhas=progresso['linhas'] + linhas,
+                             bytes=arquivo_saida.tell())
+            gravar_progresso(caminho_progresso, progresso)
+            decorrido = time.perf_counter() - inicio
+            print(f"📦 Bloco {progresso['blocos']}: {progresso['linhas']} linhas "
+                  f"({linhas_sessao / decorrido:,.0f} linhas/s)")
+
+        iniciar = (backend, defuzz, os.path.abspath(modelo.origem))
+        with arquivo_saida, ProcessPoolExecutor(processos, initializer=_iniciar_processo,
+                                                initargs=iniciar) as executor:
+            # Poucos blocos em andamento por vez: a memória não cresce com o tamanho do arquivo
+            pendentes = deque()
+            for bloco in blocos:
+                pendentes.append(executor.submit(_avaliar, bloco, mapa, colunas, formato))
+                if len(pendentes) >= 2 * processos:
+                    gravar(pendentes.popleft())
+            while pendentes:
+                gravar(pendentes.popleft())
+
+        decorrido = time.perf_counter() - inicio
+        progresso['concluido'] = True
+        gravar_progresso(caminho_progresso, progresso)
+        print(f"✅ {linhas_sessao} linhas em {decorrido:.1f}s ({linhas_sessao / max(decorrido, 1e-9):,.0f} linhas/s) "
+              f"-> {saida}")
+        return dict(progresso, segundos=decorrido, linhas_por_segundo=linhas_sessao / max(decorrido, 1e-9))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avaliação de risco de uma carteira em vários processos")
+    parser.add_argument('entrada', help="CSV ou Parquet com as colunas de exemplos/dados_exemplo.csv")
+    parser.add_argument('saida', help="arquivo de resultado (.csv, ou .ndjson/.jsonl)")
+    parser.add_argument('--processos', type=int, help="processos de avaliação (padrão: número de CPUs)")
+    parser.add_argument('--bloco', type=int, default=TAMANHO_BLOCO, help="linhas por bloco")
+    parser.add_argument('--retomar', action='store_true', help="continuar do último bloco gravado")
+    parser.add_argument('--backend', help="nativo, skfuzzy ou tabela (padrão: FUZZY_BACKEND)")
+    parser.add_argument('--defuzz', help="método de defuzzificação (padrão: FUZZY_DEFUZZ)")
+    parser.add_argument('--modelo', help="arquivo do modelo (padrão: FUZZY_MODELO)")
+    argumentos = parser.parse_args()
+
+    try:
+        avaliar_carteira(argumentos.entrada, argumentos.saida, argumentos.processos, argumentos.bloco,
+                         argumentos.retomar, argumentos.backend, argumentos.defuzz, argumentos.modelo)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
@@ -0,0 +1,398 @@
+"""
+Benchmark dos caminhos críticos do sistema de risco
+Mede separadamente a montagem do sistema, a avaliação (com e sem gráficos,
+sem e com o cache de avaliações), o `compute()` do scikit-fuzzy, a geração
+de gráficos e os endpoints `/avaliar` e `/historico` pelo cliente de teste
+do Flask. As entradas vêm de `exemplos/dados_exemplo.csv` e de perfis
+sintéticos com semente fixa.
+
+Os números de referência ficam em `benchmarks/referencia.json`. Cada caso
+tem uma tolerância (razão sobre a mediana de referência); acima dela a
+execução termina com código 1.
+
+    python benchmark.py                  # mede e compara com a referência
+    python benchmark.py --salvar         # mede e grava uma nova referência
+    python benchmark.py avaliar_cliente http_avaliar --repeticoes 9
+
+Antes de medir, o motor nativo é conferido contra o scikit-fuzzy
+(`validar_motor`): se os scores divergirem, não há o que comparar e a
+execução termina com código 1 (`--sem-validar` pula a conferência).
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from cache_lru import CacheLRU
+from sistema_risco import CAMPOS_ENTRADA, SistemaRiscoFuzzy
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_REFERENCIA = os.path.join(DIRETORIO, 'benchmarks', 'referencia.json')
+CAMINHO_CSV = os.path.join(DIRETORIO, 'exemplos', 'dados_exemplo.csv')
+
+# Razão máxima sobre a referência antes de acusar regressão (por caso em `referencia.json`)
+TOLERANCIA_PADRAO = 1.5
+
+# Tempo mínimo de cada repetição: chamadas rápidas são agrupadas até atingi-lo
+DURACAO_MINIMA = 0.2
+
+
+def carregar_clientes(quantidade_sintetica=200, semente=42):
+    """Clientes do CSV de exemplo seguidos de perfis sintéticos
+
+    Metade dos sintéticos é uniforme em todo o universo (inclusive renda acima
+    de 15.000); a outra metade segue uma carteira típica, com renda log-normal
+    e histórico, idade, emprego e dívidas concentrados perto da média.
+    """
+    with open(CAMINHO_CSV, encoding='utf-8') as arquivo:
+        clientes = [{
+            'nome': linha['nome'],
+            'renda': float(linha['renda']),
+            'historico': float(linha['historico_credito']),
+            'idade': float(linha['idade']),
+            'tempo_emprego': float(linha['tempo_emprego']),
+            'dividas': float(linha['percentual_dividas']),
+        } for linha in csv.DictReader(arquivo)]
+
+    rng = np.random.default_rng(semente)
+    metade = quantidade_sintetica // 2
+    uniformes = {
+        'renda': rng.uniform(0, 20000, metade),
+        'historico': rng.uniform(0, 10, metade),
+        'idade': rng.uniform(18, 80, metade),
+        'tempo_emprego': rng.uniform(0, 30, metade),
+        'dividas': rng.uniform(0, 100, metade),
+    }
+    tipicos = {
+        'renda': rng.lognormal(np.log(4500), 0.6, quantidade_sintetica - metade),
+        'historico': np.clip(rng.normal(6, 2, quantidade_sintetica - metade), 0, 10),
+        'idade': np.clip(rng.normal(40, 12, quantidade_sintetica - metade), 18, 80),
+        'tempo_emprego': np.clip(rng.exponential(6, quantidade_sintetica - metade), 0, 30),
+        'dividas': np.clip(rng.normal(35, 18, quantidade_sintetica - metade), 0, 100),
+    }
+    for prefixo, colunas in (('Uniforme', uniformes), ('Típico', tipicos)):
+        for i in range(len(colunas['renda'])):
+            cliente = {campo: round(float(valores[i]), 2) for campo, valores in colunas.items()}
+            clientes.append(dict(cliente, nome=f'{prefixo} {i}'))
+    return clientes
+
+
+# === CASOS ===
+# Cada caso recebe o contexto e devolve a função medida, chamada com um cliente
+
+def caso_construir_nativo(contexto):
+    """Montagem do núcleo com o motor nativo"""
+    return lambda cliente: SistemaRiscoFuzzy(backend='nativo')
+
+
+def caso_construir_skfuzzy(contexto):
+    """Montagem do núcleo com o scikit-fuzzy (variáveis, regras e pool de simuladores)"""
+    return lambda cliente: SistemaRiscoFuzzy(backend='skfuzzy')
+
+
+def caso_avaliar_cliente(contexto):
+    """`avaliar_cliente` do núcleo (motor nativo), sem gráficos"""
+    sistema = contexto.nucleo()
+    return sistema.avaliar_cliente
+
+
+def caso_avaliar_cliente_cache(contexto):
+    """`avaliar_cliente` com o cache de avaliações aquecido (todos os clientes já vistos)"""
+    sistema = SistemaRiscoFuzzy(backend='nativo')
+    sistema.cache = CacheLRU('benchmark', len(contexto.clientes))
+    for cliente in contexto.clientes:
+        sistema.avaliar_cliente(cliente)
+    return sistema.avaliar_cliente
+
+
+def caso_avaliar_cliente_graficos(contexto):
+    """`avaliar_cliente` da aplicação web seguido dos gráficos dinâmicos do cliente"""
+    from generate_fuzzy_plots import generate_dynamic_plots
+    sistema = contexto.web().sistema
+
+    def avaliar(cliente):
+        resultado = sistema.avaliar_cliente(cliente)
+        generate_dynamic_plots(sistema.estado, resultado['dados_entrada'])
+    return avaliar
+
+
+def caso_skfuzzy_compute(contexto):
+    """`ControlSystemSimulation.compute()` isolado, com as entradas já limitadas
+
+    Sem o cache de resultados do scikit-fuzzy: com os clientes em rodízio ele
+    passaria a responder de memória e o tempo dependeria da calibração.
+    """
+    from skfuzzy import control as ctrl
+    sistema = contexto.nucleo()
+    simulador = ctrl.ControlSystemSimulation(sistema.estado.sistema_controle, cache=False)
+
+    def computar(cliente):
+        for variavel, valor in sistema.limitar_entradas(cliente).items():
+            simulador.input[variavel] = valor
+        simulador.compute()
+        return simulador.output['risco_credito']
+    return computar
+
+
+def caso_avaliar_lote(contexto):
+    """`avaliar_lote` com 10.000 clientes (tempo por lote)"""
+    sistema = contexto.nucleo()
+    n = 10000
+    clientes = contexto.clientes
+    colunas = {campo: np.array([clientes[i % len(clientes)][campo] for i in range(n)])
+               for campo in CAMPOS_ENTRADA}
+    return lambda cliente: sistema.avaliar_lote(colunas)
+
+
+def caso_graficos_dinamicos(contexto):
+    """`generate_dynamic_plots`: as cinco entradas com o valor do cliente destacado"""
+    from generate_fuzzy_plots import generate_dynamic_plots
+    estado = contexto.nucleo().estado
+    return lambda cliente: generate_dynamic_plots(estado, cliente)
+
+
+def caso_graficos_pertinencia(contexto):
+    """`generate_membership_plots`: as seis funções de pertinência sem cache"""
+    from generate_fuzzy_plots import generate_membership_plots
+    estado = contexto.nucleo().estado
+    return lambda cliente: generate_membership_plots(estado)
+
+
+def caso_http_avaliar(contexto):
+    """POST /avaliar pelo cliente de teste do Flask"""
+    cliente_http = contexto.web().app.test_client()
+
+    def avaliar(cliente):
+        resposta = cliente_http.post('/avaliar', json=cliente)
+        assert resposta.status_code == 200, resposta.status_code
+    return avaliar
+
+
+def caso_http_historico(contexto):
+    """GET /historico (página padrão de 50) com o histórico já preenchido"""
+    web = contexto.web()
+    for cliente in contexto.clientes:
+        web.sistema.avaliar_cliente(cliente, incluir_graficos=False)
+    cliente_http = web.app.test_client()
+
+    def listar(cliente):
+        resposta = cliente_http.get('/historico')
+        assert resposta.status_code == 200, resposta.status_code
+    return listar
+
+
+CASOS = {
+    'construir_nativo': caso_construir_nativo,
+    'construir_skfuzzy': caso_construir_skfuzzy,
+    'avaliar_cliente': caso_avaliar_cliente,
+    'avaliar_cliente_cache': caso_avaliar_cliente_cache,
+    'avaliar_cliente_graficos': caso_avaliar_cliente_graficos,
+    'skfuzzy_compute': caso_skfuzzy_compute,
+    'avaliar_lote': caso_avaliar_lote,
+    'graficos_dinamicos': caso_graficos_dinamicos,
+    'graficos_pertinencia': caso_graficos_pertinencia,
+    'http_avaliar': caso_http_avaliar,
+    'http_historico': caso_http_historico,
+}
+
+
+class Contexto:
+    """Clientes e sistemas compartilhados entre os casos (montados uma vez, quando pedidos)"""
+
+    def __init__(self, clientes):
+        self.clientes = clientes
+        self._nucleo = None
+        self._web = None
+
+    def nucleo(self):
+        if self._nucleo is None:
+            self._nucleo = SistemaRiscoFuzzy(backend='nativo')
+        return self._nucleo
+
+    def web(self):
+        """Módulo da aplicação web (importado só pelos casos que o usam)"""
+        if self._web is None:
+            import SistemaRiscoFuzzy_com_graficos
+            self._web = SistemaRiscoFuzzy_com_graficos
+        return self._web
+
+
+# === MEDIÇÃO ===
+
+def medir(funcao, clientes, repeticoes):
+    """Segundos por chamada em cada repetição
+
+    Como o `timeit`, agrupa chamadas até cada repetição durar pelo menos
+    DURACAO_MINIMA; os clientes são usados em rodízio.
+    """
+    indice = 0
+
+    def rodada(chamadas):
+        nonlocal indice
+        inicio = time.perf_counter()
+        for _ in range(chamadas):
+            funcao(clientes[indice % len(clientes)])
+            indice += 1
+        return time.perf_counter() - inicio
+
+    # Aquecimento e calibração do número de chamadas por repetição
+    chamadas = 1
+    while (duracao := rodada(chamadas)) < DURACAO_MINIMA:
+        chamadas = max(chamadas * 2, int(chamadas * DURACAO_MINIMA / max(duracao, 1e-9)))
+
+    return [rodada(chamadas) / chamadas for _ in range(repeticoes)], chamadas
+
+
+def resumir(tempos, chamadas):
+    """Estatísticas de uma medição, em milissegundos por chamada"""
+    tempos = sorted(tempos)
+    return {
+        'mediana_ms': statistics.median(tempos) * 1000,
+        'minimo_ms': tempos[0] * 1000,
+        'maximo_ms': tempos[-1] * 1000,
+        'repeticoes': len(tempos),
+        'chamadas': chamadas,
+    }
+
+
+def descrever_maquina():
+    """Ambiente da medição, para saber se a comparação com a referência é justa"""
+    import matplotlib
+    import skfuzzy
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'skfuzzy': skfuzzy.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+
+def comparar(resultados, referencia):
+    """(caso, razão, tolerância) de cada caso medido que também está na referência"""
+    comparacoes = []
+    for nome, resultado in resultados.items():
+        if nome not in referencia.get('casos', {}):
+            continue
+        base = referencia['casos'][nome]
+        tolerancia = base.get('tolerancia', TOLERANCIA_PADRAO)
+        comparacoes.append((nome, resultado['mediana_ms'] / base['mediana_ms'], tolerancia))
+    return comparacoes
+
+
+def salvar_referencia(resultados, maquina, caminho=CAMINHO_REFERENCIA):
+    """Grava a referência, mantendo as tolerâncias já ajustadas à mão"""
+    anterior = {}
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo).get('casos', {})
+
+    # Casos não medidos nesta execução continuam com a referência anterior
+    casos = dict(anterior)
+    for nome, resultado in resultados.items():
+        tolerancia = anterior.get(nome, {}).get('tolerancia', TOLERANCIA_PADRAO)
+        casos[nome] = {'mediana_ms': round(resultado['mediana_ms'], 4), 'tolerancia': tolerancia}
+    casos = dict(sorted(casos.items(), key=lambda caso: list(CASOS).index(caso[0])
+                        if caso[0] in CASOS else len(CASOS)))
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump({'maquina': maquina, 'casos': casos}, arquivo, indent=2, ensure_ascii=False)
+        arquivo.write('\n')
+    os.replace(temporario, caminho)
+
+
+def main():
+    """Executa os casos pedidos e compara com a referência (ou grava uma nova)"""
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos críticos do sistema de risco")
+    parser.add_argument('casos', nargs='*', metavar='caso',
+                        help=f"casos a medir (padrão: todos): {', '.join(CASOS)}")
+    parser.add_argument('--repeticoes', type=int, default=5, help="repetições por caso")
+    parser.add_argument('--salvar', action='store_true', help="gravar o resultado como nova referência")
+    parser.add_argument('--referencia', default=CAMINHO_REFERENCIA, help="arquivo de referência")
+    parser.add_argument('--json', help="gravar também o resultado completo neste arquivo")
+    parser.add_argument('--sem-validar', action='store_true',
+                        help="não conferir o motor nativo contra o scikit-fuzzy antes de medir")
+    parser.add_argument('--tolerancia-motor', type=float, default=1e-6,
+                        help="diferença máxima de score na conferência (com centroide_exato, "
+                             "o erro de discretização do scikit-fuzzy; use ~0.05)")
+    argumentos = parser.parse_args()
+
+    desconhecidos = [nome for nome in argumentos.casos if nome not in CASOS]
+    if desconhecidos:
+        parser.error(f"caso desconhecido: {', '.join(desconhecidos)}")
+    nomes = argumentos.casos or list(CASOS)
+
+    # Os casos medem o cálculo de verdade; só `avaliar_cliente_cache` usa cache
+    os.environ['FUZZY_CACHE_TAMANHO'] = os.environ['FUZZY_CACHE_GRAFICOS'] = '0'
+    contexto = Contexto(carregar_clientes())
+
+    print("⏱️  BENCHMARK - SISTEMA DE RISCO FUZZY")
+    print("=" * 70)
+    if not argumentos.sem_validar:
+        with contextlib.redirect_stdout(io.StringIO()):
+            validacao = contexto.nucleo().validar_motor(tolerancia=argumentos.tolerancia_motor)
+        print(f"{'✅' if validacao['ok'] else '❌'} Motor nativo x scikit-fuzzy: erro máximo "
+              f"{validacao['erro_maximo']:.2e} em {validacao['amostras']} entradas "
+              f"(tolerância {argumentos.tolerancia_motor:.0e})")
+        if not validacao['ok']:
+            sys.exit(1)
+    resultados = {}
+    for nome in nomes:
+        # As mensagens de inicialização do sistema não entram na saída (nem competem com a medição)
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcao = CASOS[nome](contexto)
+            tempos, chamadas = medir(funcao, contexto.clientes, argumentos.repeticoes)
+        resultados[nome] = resumir(tempos, chamadas)
+        r = resultados[nome]
+        print(f"{nome:26} | mediana {r['mediana_ms']:10.3f} ms | "
+              f"mín {r['minimo_ms']:10.3f} ms | máx {r['maximo_ms']:10.3f} ms")
+
+    maquina = descrever_maquina()
+    if argumentos.json:
+        with open(argumentos.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({'maquina': maquina, 'casos': resultados}, arquivo, indent=2, ensure_ascii=False)
+
+    print("=" * 70)
+    if argumentos.salvar:
+        salvar_referencia(resultados, maquina, argumentos.referencia)
+        print(f"💾 Referência gravada em {argumentos.referencia}")
+        return
+
+    if not os.path.exists(argumentos.referencia):
+        print("ℹ️  Sem referência para comparar (use --salvar para criar uma)")
+        return
+
+    with open(argumentos.referencia, encoding='utf-8') as arquivo:
+        referencia = json.load(arquivo)
+    diferencas = [chave for chave, valor in maquina.items() if referencia.get('maquina', {}).get(chave) != valor]
+    if diferencas:
+        print(f"⚠️  Ambiente diferente da referência ({', '.join(diferencas)}): compare com cautela")
+
+    regressoes = []
+    for nome, razao, tolerancia in comparar(resultados, referencia):
+        simbolo = '❌' if razao > tolerancia else ('🚀' if razao < 1 / tolerancia else '✅')
+        print(f"{simbolo} {nome:26} {razao:6.2f}x a referência (tolerância {tolerancia:.2f}x)")
+        if razao > tolerancia:
+            regressoes.append(nome)
+
+    if regressoes:
+        print(f"❌ Regressão de desempenho em: {', '.join(regressoes)}")
+        sys.exit(1)
+    print("✅ Nenhuma regressão acima da tolerância")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cache LRU com expiração
+Guarda resultados já calculados (avaliações, PNGs de gráficos) por chave,
+descarta o menos usado quando enche e ignora entradas mais velhas que o TTL.
+Acertos, faltas e o tamanho de cada cache aparecem em `/metrics`.
+"""
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import metricas
+
+CONSULTAS = metricas.contador('risco_cache_consultas_total', 'Consultas aos caches, por resultado',
+                              ('cache', 'resultado'))
+
+# Caches vivos, por instância (para o medidor de tamanho). Vários caches
+# podem ter o mesmo nome (um por SistemaRiscoFuzzy, por exemplo), então
+# a chave não é o nome
+_caches = weakref.WeakValueDictionary()
+
+
+def _entradas_por_nome():
+    """Entradas guardadas somadas por nome de cache, como as consultas em CONSULTAS"""
+    entradas = {}
+    for cache in list(_caches.values()):
+        entradas[(cache.nome,)] = entradas.get((cache.nome,), 0) + len(cache)
+    return entradas
+
+
+metricas.medidor('risco_cache_entradas', 'Entradas guardadas em cada cache', _entradas_por_nome,
+                 rotulos=('cache',))
+
+
+class CacheLRU:
+    """Mapa chave -> valor limitado a `tamanho` entradas, cada uma válida por `ttl` segundos
+
+    `tamanho=0` desliga o cache (toda consulta é falta, nada é guardado);
+    `ttl=0` não expira as entradas. Seguro para threads.
+    """
+
+    def __init__(self, nome, tamanho=1024, ttl=0):
+        self.nome = nome
+        self.tamanho = max(int(tamanho), 0)
+        self.ttl = max(float(ttl), 0)
+        self._dados = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = self.faltas = self.expirados = self.descartados = 0
+        _caches[id(self)] = self
+
+    def __len__(self):
+        return len(self._dados)
+
+    def obter(self, chave):
+        """Valor guardado para `chave`, ou None"""
+        if not self.tamanho:
+            return None
+        with self._trava:
+            item = self._dados.get(chave)
+            if item is not None and self.ttl and item[0] < time.monotonic():
+                del self._dados[chave]
+                self.expirados += 1
+                item = None
+            if item is None:
+                self.faltas += 1
+            else:
+                self._dados.move_to_end(chave)
+                self.acertos += 1
+        CONSULTAS.incrementar(cache=self.nome, resultado='falta' if item is None else 'acerto')
+        return None if item is None else item[1]
+
+    def guardar(self, chave, valor):
+        """Guarda `valor` (descartando o menos usado se o cache estiver cheio)"""
+        if not self.tamanho:
+            return
+        expira = time.monotonic() + self.ttl if self.ttl else None
+        with self._trava:
+            self._dados[chave] = (expira, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho:
+                self._dados.popitem(last=False)
+                self.descartados += 1
+
+    def limpar(self):
+        """Invalida todas as entradas (as estatísticas continuam)"""
+        with self._trava:
+            self._dados.clear()
+
+    def estatisticas(self):
+        consultas = self.acertos + self.faltas
+        return {
+            'entradas': len(self._dados),
+            'tamanho': self.tamanho,
+            'ttl': self.ttl,
+            'acertos': self.acertos,
+            'faltas': self.faltas,
+            'expirados': self.expirados,
+            'descartados': self.descartados,
+            'taxa_acerto': round(self.acertos / consultas, 4) if consultas else None,
+        }
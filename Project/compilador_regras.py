@@ -0,0 +1,137 @@
+"""
+Compilador da base de regras
+Normaliza as regras decompostas (`decompor_regra`), junta regras com o mesmo
+antecedente, elimina as que nunca alteram o resultado e monta o índice
+termo -> regras usado para avaliar só as regras que podem disparar.
+
+Com AND = mínimo e acumulação por máximo, uma regra B é redundante quando
+existe outra regra A para o mesmo termo de saída, com peso maior ou igual,
+cujos antecedentes são um subconjunto dos de B: a força de A é sempre maior
+ou igual à de B, então B nunca define o corte.
+"""
+
+import numpy as np
+
+from motor_fuzzy import indexar_regras
+from tabela_risco import EIXOS, TabelaRisco
+
+
+def descrever_regra(termos, consequentes):
+    """Texto legível de uma regra, ex.: renda[alta] & historico_credito[bom] -> baixo"""
+    antecedente = ' & '.join(f'{variavel}[{termo}]' for variavel, termo in termos)
+    saida = ', '.join(termo if peso == 1 else f'{termo} (peso {peso})' for termo, peso in consequentes)
+    return f'{antecedente} -> {saida}'
+
+
+class RegrasCompiladas:
+    """Resultado da compilação: regras finais, índice por termo e o que foi removido"""
+
+    def __init__(self, originais, regras, removidas):
+        self.originais = originais
+        self.regras = regras
+        self.removidas = removidas
+
+        # (variável, termo) -> índices das regras compiladas que usam o termo
+        self.indice = indexar_regras(regras)
+
+    def relatorio(self):
+        """Resumo da compilação (quantidades e motivo de cada remoção)"""
+        return {'originais': len(self.originais), 'compiladas': len(self.regras),
+                'removidas': [{'regra': descrever_regra(*regra), 'motivo': motivo}
+                              for regra, motivo in self.removidas]}
+
+
+def compilar_regras(regras):
+    """Compila a lista de regras no formato de `decompor_regra`"""
+    originais = list(regras)
+    removidas = []
+
+    # 1. Normalizar e juntar regras com o mesmo conjunto de antecedentes
+    por_antecedente = {}
+    for termos, consequentes in originais:
+        chave = tuple(sorted(set(termos)))
+        saidas = por_antecedente.get(chave)
+        if saidas is None:
+            por_antecedente[chave] = dict(consequentes)
+            continue
+
+        for termo, peso in consequentes:
+            if termo in saidas:
+                motivo = 'duplicada' if peso <= saidas[termo] else 'duplicada (mantido o maior peso)'
+                removidas.append(((list(termos), [(termo, peso)]), motivo))
+            else:
+                removidas.append(((list(termos), [(termo, peso)]),
+                                  f'mesclada em {descrever_regra(chave, saidas.items())}'))
+            saidas[termo] = max(peso, saidas.get(termo, 0))
+
+    # 2. Remover consequentes cobertos por uma regra mais geral com peso maior ou igual
+    compiladas = []
+    for chave, saidas in por_antecedente.items():
+        conjunto = set(chave)
+        restantes = []
+        for termo, peso in saidas.items():
+            cobertura = next((outra for outra, outras_saidas in por_antecedente.items()
+                              if set(outra) < conjunto and outras_saidas.get(termo, 0) >= peso), None)
+            if cobertura is None:
+                restantes.append((termo, peso))
+            else:
+                geral = descrever_regra(cobertura, [(termo, por_antecedente[cobertura][termo])])
+                removidas.append(((list(chave), [(termo, peso)]), f'subsumida por {geral}'))
+        if restantes:
+            compiladas.append((list(chave), restantes))
+
+    return RegrasCompiladas(originais, compiladas, removidas)
+
+
+def verificar_equivalencia(motor_original, motor_compilado, subdivisoes=0, tamanho_bloco=65536):
+    """Compara os cortes e os scores dos dois motores em toda a grade de vértices
+
+    A grade é a mesma da tabela de risco (`TabelaRisco.montar_eixos`): como as
+    pertinências são lineares entre vértices, ela passa por todos os trechos
+    de cada termo.
+    """
+    eixos = TabelaRisco.montar_eixos(motor_original, subdivisoes)
+    forma = tuple(len(eixo) for eixo in eixos)
+    total = int(np.prod(forma))
+
+    diferenca_cortes = diferenca_scores = 0.0
+    for inicio in range(0, total, tamanho_bloco):
+        indices = np.unravel_index(np.arange(inicio, min(inicio + tamanho_bloco, total)), forma)
+        entradas = {variavel: eixo[indice] for variavel, eixo, indice in zip(EIXOS, eixos, indices)}
+        pertinencias = motor_original.fuzzificar(entradas)
+        n = len(indices[0])
+
+        cortes_original = motor_original.disparar_regras(pertinencias, n)
+        cortes_compilado = motor_compilado.disparar_regras(pertinencias, n)
+        for nome in cortes_original:
+            diferenca_cortes = max(diferenca_cortes,
+                                   float(np.abs(cortes_original[nome] - cortes_compilado[nome]).max()))
+
+        original = motor_original.defuzzificar(cortes_original)
+        compilado = motor_compilado.defuzzificar(cortes_compilado)
+        # NaN (nenhuma regra ativada) só é igual a NaN
+        diferenca = np.where(np.isnan(original) & np.isnan(compilado), 0.0, np.abs(original - compilado))
+        diferenca_scores = max(diferenca_scores, float(np.nan_to_num(diferenca, nan=np.inf).max()))
+
+    return {'pontos_grade': total, 'diferenca_cortes': diferenca_cortes,
+            'diferenca_scores': diferenca_scores,
+            'equivalente': diferenca_cortes == 0 and diferenca_scores == 0}
+
+
+if __name__ == "__main__":
+    # Relatório da compilação e prova de equivalência: python compilador_regras.py [subdivisoes]
+    import sys
+    from sistema_risco import SistemaRiscoFuzzy
+
+    sistema = SistemaRiscoFuzzy(backend='nativo')
+    relatorio = sistema.estado.regras_compiladas.relatorio()
+    print(f"📋 Regras: {relatorio['originais']} originais -> {relatorio['compiladas']} compiladas")
+    for removida in relatorio['removidas']:
+        print(f"   ✂️ {removida['regra']}  ({removida['motivo']})")
+
+    resultado = sistema.verificar_regras_compiladas(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    print(f"🔍 Grade de {resultado['pontos_grade']} pontos: diferença máxima de corte "
+          f"{resultado['diferenca_cortes']}, de score {resultado['diferenca_scores']}")
+    print("✅ Saída idêntica à da base original" if resultado['equivalente']
+          else "❌ A base compilada muda o resultado")
+    sys.exit(0 if resultado['equivalente'] else 1)
@@ -14,40 +14,35 @@ import matplotlib.pyplot as plt
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
-# Importar o sistema (descomente quando tiver o arquivo principal)
-# from sistema_risco_fuzzy import SistemaRiscoFuzzy
+from sistema_risco import SistemaRiscoFuzzy
 
 class TestadorSistemaFuzzy:
     """Classe para realizar testes sistemáticos do sistema fuzzy"""
 
     def __init__(self):
-        # Para demonstração, vamos simular o sistema
-        self.sistema = self.criar_sistema_demo()
+        self.sistema = self.criar_sistema()
         self.resultados_teste = []
 
-    def criar_sistema_demo(self):
-        """Cria uma versão demo do sistema para testes"""
+    def criar_sistema(self):
+        """Núcleo do sistema fuzzy, recebendo os dados com os nomes de coluna do CSV"""
 
-        class SistemaDemo:
-            def avaliar_cliente(self, dados):
-                # Simulação simplificada da lógica fuzzy
-                renda_score = min(dados['renda'] / 10000, 1.0) * 30
-                historico_score = (dados['historico_credito'] / 10) * 40
-                idade_score = 15 if 25 <= dados['idade'] <= 55 else 5
-                emprego_score = min(dados['tempo_emprego'] / 10, 1.0) * 10
-                divida_penalty = (dados['percentual_dividas'] / 100) * 50
-
-                risco_score = max(0, min(100, 100 - (
-                            renda_score + historico_score + idade_score + emprego_score) + divida_penalty))
+        nucleo = SistemaRiscoFuzzy()
 
-                return {
+        class SistemaCSV:
+            def avaliar_cliente(self, dados):
+                resultado = nucleo.avaliar_cliente({
                     'nome': dados.get('nome', 'Cliente'),
-                    'risco_score': round(risco_score, 1),
-                    'dados_entrada': dados,
-                    'timestamp': datetime.now()
-                }
-
-        return SistemaDemo()
+                    'renda': dados['renda'],
+                    'historico': dados['historico_credito'],
+                    'idade': dados['idade'],
+                    'tempo_emprego': dados['tempo_emprego'],
+                    'dividas': dados['percentual_dividas'],
+                })
+                resultado['dados_entrada'] = dados
+                resultado['timestamp'] = datetime.now()
+                return resultado
+
+        return SistemaCSV()
 
     def carregar_clientes_exemplo(self):
         """Carrega clientes de exemplo para teste"""
@@ -4,273 +4,20 @@ Usando scikit-fuzzy para lógica fuzzy real (Python 3.11)
 """
 
 from flask import Flask, render_template_string, request, jsonify
-import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
-from datetime import datetime
 import warnings
+import os
+import sys
+
+# Núcleo compartilhado com o sistema principal (Project/sistema_risco.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sistema_risco import SistemaRiscoFuzzy
 warnings.filterwarnings('ignore')
 
 app = Flask(__name__)
 
-class SistemaRiscoFuzzy:
-    def __init__(self):
-        """Inicializa o sistema fuzzy"""
-        self.setup_fuzzy_system()
-        self.historico = []
-
-    def setup_fuzzy_system(self):
-        """Configura o sistema fuzzy com scikit-fuzzy"""
-        print("🔧 Configurando Sistema Fuzzy com scikit-fuzzy...")
-
-        # === VARIÁVEIS DE ENTRADA ===
-        self.renda = ctrl.Antecedent(np.arange(0, 15001, 1), 'renda')
-        self.historico = ctrl.Antecedent(np.arange(0, 11, 1), 'historico_credito')
-        self.idade = ctrl.Antecedent(np.arange(18, 81, 1), 'idade')
-        self.tempo_emprego = ctrl.Antecedent(np.arange(0, 31, 1), 'tempo_emprego')
-        self.dividas = ctrl.Antecedent(np.arange(0, 101, 1), 'percentual_dividas')
-
-        # === VARIÁVEL DE SAÍDA ===
-        self.risco = ctrl.Consequent(np.arange(0, 101, 1), 'risco_credito')
-
-        # === FUNÇÕES DE PERTINÊNCIA - RENDA ===
-        self.renda['muito_baixa'] = fuzz.trimf(self.renda.universe, [0, 0, 2000])
-        self.renda['baixa'] = fuzz.trimf(self.renda.universe, [1000, 2500, 4000])
-        self.renda['media'] = fuzz.trimf(self.renda.universe, [3000, 5500, 8000])
-        self.renda['alta'] = fuzz.trimf(self.renda.universe, [6500, 10000, 12000])
-        self.renda['muito_alta'] = fuzz.trimf(self.renda.universe, [10000, 15000, 15000])
-
-        # === FUNÇÕES DE PERTINÊNCIA - HISTÓRICO ===
-        self.historico['pessimo'] = fuzz.trimf(self.historico.universe, [0, 0, 2])
-        self.historico['ruim'] = fuzz.trimf(self.historico.universe, [1, 3, 5])
-        self.historico['regular'] = fuzz.trimf(self.historico.universe, [4, 6, 8])
-        self.historico['bom'] = fuzz.trimf(self.historico.universe, [7, 9, 10])
-        self.historico['excelente'] = fuzz.trimf(self.historico.universe, [9, 10, 10])
-
-        # === FUNÇÕES DE PERTINÊNCIA - IDADE ===
-        self.idade['jovem'] = fuzz.trimf(self.idade.universe, [18, 18, 30])
-        self.idade['adulto_jovem'] = fuzz.trimf(self.idade.universe, [25, 35, 45])
-        self.idade['adulto'] = fuzz.trimf(self.idade.universe, [40, 50, 60])
-        self.idade['maduro'] = fuzz.trimf(self.idade.universe, [55, 70, 80])
-
-        # === FUNÇÕES DE PERTINÊNCIA - TEMPO DE EMPREGO ===
-        self.tempo_emprego['novo'] = fuzz.trimf(self.tempo_emprego.universe, [0, 0, 2])
-        self.tempo_emprego['pouco'] = fuzz.trimf(self.tempo_emprego.universe, [1, 3, 6])
-        self.tempo_emprego['medio'] = fuzz.trimf(self.tempo_emprego.universe, [4, 8, 15])
-        self.tempo_emprego['experiente'] = fuzz.trimf(self.tempo_emprego.universe, [12, 25, 30])
-
-        # === FUNÇÕES DE PERTINÊNCIA - DÍVIDAS ===
-        self.dividas['baixo'] = fuzz.trimf(self.dividas.universe, [0, 0, 30])
-        self.dividas['medio'] = fuzz.trimf(self.dividas.universe, [20, 40, 60])
-        self.dividas['alto'] = fuzz.trimf(self.dividas.universe, [50, 70, 90])
-        self.dividas['critico'] = fuzz.trimf(self.dividas.universe, [80, 100, 100])
-
-        # === FUNÇÕES DE PERTINÊNCIA - RISCO (SAÍDA) ===
-        self.risco['muito_baixo'] = fuzz.trimf(self.risco.universe, [0, 0, 20])
-        self.risco['baixo'] = fuzz.trimf(self.risco.universe, [10, 25, 40])
-        self.risco['medio'] = fuzz.trimf(self.risco.universe, [30, 50, 70])
-        self.risco['alto'] = fuzz.trimf(self.risco.universe, [60, 75, 90])
-        self.risco['muito_alto'] = fuzz.trimf(self.risco.universe, [80, 100, 100])
-
-        # === REGRAS FUZZY ===
-        self.criar_regras()
-
-        # === SISTEMA DE CONTROLE ===
-        self.sistema_controle = ctrl.ControlSystem(self.regras)
-        self.simulador = ctrl.ControlSystemSimulation(self.sistema_controle)
-
-        print("✅ Sistema Fuzzy configurado com sucesso!")
-
-    def criar_regras(self):
-        """Define as regras fuzzy (mais abrangentes)"""
-        self.regras = [
-            # === REGRAS DE MUITO BAIXO RISCO ===
-            ctrl.Rule(self.renda['muito_alta'] & self.historico['excelente'] &
-                     self.dividas['baixo'], self.risco['muito_baixo']),
-
-            ctrl.Rule(self.renda['alta'] & self.historico['excelente'] &
-                     self.dividas['baixo'] & self.tempo_emprego['experiente'],
-                     self.risco['muito_baixo']),
-
-            # === REGRAS DE BAIXO RISCO ===
-            ctrl.Rule(self.renda['alta'] & self.historico['bom'] &
-                     self.dividas['baixo'], self.risco['baixo']),
-
-            ctrl.Rule(self.renda['alta'] & self.historico['excelente'],
-                     self.risco['baixo']),
-
-            ctrl.Rule(self.renda['muito_alta'] & self.historico['bom'],
-                     self.risco['baixo']),
-
-            ctrl.Rule(self.renda['media'] & self.historico['bom'] &
-                     self.idade['adulto'] & self.dividas['baixo'],
-                     self.risco['baixo']),
-
-            ctrl.Rule(self.idade['maduro'] & self.tempo_emprego['experiente'] &
-                     self.historico['bom'], self.risco['baixo']),
-
-            ctrl.Rule(self.renda['media'] & self.historico['excelente'] &
-                     self.dividas['baixo'], self.risco['baixo']),
-
-            # === REGRAS DE RISCO MÉDIO ===
-            ctrl.Rule(self.renda['media'] & self.historico['regular'],
-                     self.risco['medio']),
-
-            ctrl.Rule(self.renda['baixa'] & self.historico['bom'] &
-                     self.tempo_emprego['medio'], self.risco['medio']),
-
-            ctrl.Rule(self.renda['alta'] & self.historico['regular'] &
-                     self.dividas['alto'], self.risco['medio']),
-
-            ctrl.Rule(self.renda['media'] & self.dividas['medio'],
-                     self.risco['medio']),
-
-            ctrl.Rule(self.historico['regular'] & self.dividas['medio'],
-                     self.risco['medio']),
-
-            # === REGRAS DE ALTO RISCO ===
-            ctrl.Rule(self.renda['baixa'] & self.historico['ruim'],
-                     self.risco['alto']),
-
-            ctrl.Rule(self.historico['ruim'] & self.dividas['alto'],
-                     self.risco['alto']),
-
-            ctrl.Rule(self.idade['jovem'] & self.tempo_emprego['novo'] &
-                     self.renda['baixa'], self.risco['alto']),
-
-            ctrl.Rule(self.dividas['alto'] & self.historico['regular'],
-                     self.risco['alto']),
-
-            # === REGRAS DE MUITO ALTO RISCO ===
-            ctrl.Rule(self.renda['muito_baixa'] & self.historico['pessimo'],
-                     self.risco['muito_alto']),
-
-            ctrl.Rule(self.dividas['critico'], self.risco['muito_alto']),
-
-            ctrl.Rule(self.historico['pessimo'] & self.dividas['alto'],
-                     self.risco['muito_alto']),
-
-            ctrl.Rule(self.renda['muito_baixa'] & self.historico['ruim'],
-                     self.risco['muito_alto']),
-
-            # === REGRAS DE FALLBACK (para evitar o erro) ===
-            ctrl.Rule(self.renda['alta'], self.risco['baixo']),
-            ctrl.Rule(self.renda['muito_alta'], self.risco['muito_baixo']),
-            ctrl.Rule(self.historico['excelente'], self.risco['baixo']),
-            ctrl.Rule(self.historico['bom'], self.risco['baixo']),
-            ctrl.Rule(self.historico['pessimo'], self.risco['muito_alto']),
-            ctrl.Rule(self.historico['ruim'], self.risco['alto']),
-            ctrl.Rule(self.dividas['critico'], self.risco['muito_alto']),
-            ctrl.Rule(self.dividas['baixo'], self.risco['baixo']),
-        ]
-
-    def avaliar_cliente(self, dados):
-        """Avalia um cliente usando lógica fuzzy"""
-        try:
-            # Configurar inputs
-            self.simulador.input['renda'] = dados['renda']
-            self.simulador.input['historico_credito'] = dados['historico']
-            self.simulador.input['idade'] = dados['idade']
-            self.simulador.input['tempo_emprego'] = dados['tempo_emprego']
-            self.simulador.input['percentual_dividas'] = dados['dividas']
-
-            # Executar inferência fuzzy
-            self.simulador.compute()
-
-            # Obter resultado
-            risco_score = self.simulador.output['risco_credito']
-
-        except Exception as fuzzy_error:
-            # Se der erro no fuzzy, usar fallback baseado em lógica simples
-            print(f"⚠️ Erro fuzzy: {fuzzy_error}")
-            print("🔄 Usando sistema de fallback...")
-
-            risco_score = self.calcular_risco_fallback(dados)
-
-        # Classificar risco
-        classificacao = self.classificar_risco(risco_score)
-
-        # Gerar recomendação
-        recomendacao = self.gerar_recomendacao(risco_score, dados)
-
-        # Resultado completo
-        resultado = {
-            'nome': dados['nome'],
-            'risco_score': round(risco_score, 1),
-            'classificacao': classificacao,
-            'recomendacao': recomendacao,
-            'timestamp': datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
-            'dados_entrada': dados
-        }
-
-        # Salvar no histórico
-        self.historico.append(resultado)
-
-        return resultado
-
-    def calcular_risco_fallback(self, dados):
-        """Sistema de fallback quando o fuzzy falha"""
-        # Normalizar valores
-        renda_norm = min(dados['renda'] / 10000, 1.0)
-        historico_norm = dados['historico'] / 10
-        idade_factor = 1.0 if 25 <= dados['idade'] <= 55 else 0.7
-        emprego_factor = min(dados['tempo_emprego'] / 15, 1.0)
-        divida_penalty = dados['dividas'] / 100
-
-        # Cálculo híbrido fuzzy-like
-        score_positivo = (renda_norm * 0.35 + historico_norm * 0.30 +
-                         idade_factor * 0.15 + emprego_factor * 0.20)
-
-        risco_score = max(0, min(100, (1 - score_positivo + divida_penalty * 0.8) * 100))
-
-        return risco_score
-
-    def classificar_risco(self, score):
-        """Classifica o score de risco"""
-        if score <= 20:
-            return {"nivel": "MUITO BAIXO", "emoji": "🟢", "cor": "#28a745"}
-        elif score <= 40:
-            return {"nivel": "BAIXO", "emoji": "🔵", "cor": "#17a2b8"}
-        elif score <= 60:
-            return {"nivel": "MÉDIO", "emoji": "🟡", "cor": "#ffc107"}
-        elif score <= 80:
-            return {"nivel": "ALTO", "emoji": "🟠", "cor": "#fd7e14"}
-        else:
-            return {"nivel": "MUITO ALTO", "emoji": "🔴", "cor": "#dc3545"}
-
-    def gerar_recomendacao(self, risco_score, dados):
-        """Gera recomendação baseada no risco"""
-        if risco_score <= 30:
-            return {
-                "decisao": "✅ APROVADO",
-                "limite": min(dados['renda'] * 8, 50000),
-                "taxa": "Taxa preferencial (1.2% a.m.)",
-                "observacoes": "Cliente com excelente perfil. Baixo risco de inadimplência."
-            }
-        elif risco_score <= 50:
-            return {
-                "decisao": "⚠️ APROVADO COM RESTRIÇÕES",
-                "limite": min(dados['renda'] * 4, 25000),
-                "taxa": "Taxa intermediária (2.5% a.m.)",
-                "observacoes": "Bom perfil, mas requer acompanhamento."
-            }
-        elif risco_score <= 70:
-            return {
-                "decisao": "🔍 ANÁLISE MANUAL",
-                "limite": min(dados['renda'] * 2, 10000),
-                "taxa": "Taxa elevada (4.0% a.m.)",
-                "observacoes": "Requer análise detalhada e garantias adicionais."
-            }
-        else:
-            return {
-                "decisao": "❌ REPROVADO",
-                "limite": 0,
-                "taxa": "N/A",
-                "observacoes": "Alto risco de inadimplência. Crédito não recomendado."
-            }
-
-# Instância global do sistema
-sistema = SistemaRiscoFuzzy()
+# Instância global do sistema (inferência pelo scikit-fuzzy) e histórico desta página
+sistema = SistemaRiscoFuzzy(backend='skfuzzy')
+historico_avaliacoes = []
 
 # Template HTML com seções adicionais sobre o projeto e lógica fuzzy
 HTML_TEMPLATE = """
@@ -931,6 +678,7 @@ def avaliar():
     try:
         dados = request.get_json()
         resultado = sistema.avaliar_cliente(dados)
+        historico_avaliacoes.append(resultado)
         return jsonify(resultado)
     except Exception as e:
         return jsonify({'erro': str(e)}), 400
@@ -938,12 +686,12 @@ def avaliar():
 @app.route('/historico', methods=['GET'])
 def historico():
     """Endpoint para obter histórico"""
-    return jsonify(sistema.historico)
+    return jsonify(historico_avaliacoes)
 
 @app.route('/limpar', methods=['POST'])
 def limpar_historico():
     """Endpoint para limpar histórico"""
-    sistema.historico.clear()
+    historico_avaliacoes.clear()
     return jsonify({'success': True})
 
 if __name__ == '__main__':
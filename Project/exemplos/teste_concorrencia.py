@@ -0,0 +1,94 @@
+"""
+Teste de Concorrência - Sistema de Avaliação de Risco Fuzzy
+Dispara avaliações simultâneas em várias threads e confere se os scores
+são idênticos aos calculados sequencialmente
+"""
+
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Adicionar o diretório pai ao path para importar o sistema
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sistema_risco import SistemaRiscoFuzzy
+
+
+def carregar_clientes(quantidade_aleatoria=200, semente=42):
+    """Clientes do CSV de exemplo mais perfis aleatórios"""
+    caminho = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados_exemplo.csv')
+    df = pd.read_csv(caminho)
+    clientes = [{
+        'nome': linha['nome'],
+        'renda': float(linha['renda']),
+        'historico': float(linha['historico_credito']),
+        'idade': float(linha['idade']),
+        'tempo_emprego': float(linha['tempo_emprego']),
+        'dividas': float(linha['percentual_dividas']),
+    } for _, linha in df.iterrows()]
+
+    rng = np.random.default_rng(semente)
+    for i in range(quantidade_aleatoria):
+        clientes.append({
+            'nome': f'Aleatório {i}',
+            'renda': float(rng.uniform(0, 20000)),
+            'historico': float(rng.uniform(0, 10)),
+            'idade': float(rng.uniform(18, 80)),
+            'tempo_emprego': float(rng.uniform(0, 30)),
+            'dividas': float(rng.uniform(0, 100)),
+        })
+    return clientes
+
+
+def avaliar_com_seguranca(sistema, cliente):
+    """Score do cliente, ou a exceção lançada (conta como divergência)"""
+    try:
+        return sistema.calcular_score(cliente)
+    except Exception as erro:
+        return erro
+
+
+def testar_backend(backend, clientes, threads=16, repeticoes=5):
+    """Compara os scores concorrentes com a referência sequencial"""
+    sistema = SistemaRiscoFuzzy(backend=backend)
+    referencia = [sistema.calcular_score(cliente) for cliente in clientes]
+
+    tarefas = [i for _ in range(repeticoes) for i in range(len(clientes))]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        resultados = list(executor.map(
+            lambda i: (i, avaliar_com_seguranca(sistema, clientes[i])), tarefas))
+    duracao = time.perf_counter() - inicio
+
+    divergencias = [(i, score) for i, score in resultados if score != referencia[i]]
+    print(f"{backend:8} | {len(tarefas)} avaliações em {threads} threads | "
+          f"{len(tarefas) / duracao:8.0f} aval/s | divergências: {len(divergencias)}")
+    return not divergencias
+
+
+def main():
+    """Executa o teste de concorrência para os backends de inferência"""
+    print("🧵 TESTE DE CONCORRÊNCIA - AVALIAÇÃO DE RISCO FUZZY")
+    print("=" * 70)
+
+    clientes = carregar_clientes()
+
+    # Trocas de thread bem mais frequentes que o padrão (5 ms) para forçar disputas
+    sys.setswitchinterval(1e-5)
+    backends = sys.argv[1:] or ['skfuzzy', 'nativo']
+    resultados = [testar_backend(backend, clientes) for backend in backends]
+
+    print("=" * 70)
+    if all(resultados):
+        print("✅ Scores idênticos sob concorrência")
+    else:
+        print("❌ Scores divergentes sob concorrência")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
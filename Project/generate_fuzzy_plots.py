@@ -3,188 +3,368 @@ Gerador de gráficos para funções de pertinência fuzzy
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib
 import os
 import base64
+import hashlib
+import json
+import threading
 from io import BytesIO
 
-# Configurar matplotlib para usar português
-matplotlib.rcParams['font.family'] = 'DejaVu Sans'
-plt.rcParams.update({'font.size': 12})
+def setup_matplotlib():
+    """Importa e configura o matplotlib só quando algum gráfico é de fato gerado"""
+    import matplotlib
+    
+    # Configurar matplotlib para usar português
+    matplotlib.rcParams['font.family'] = 'DejaVu Sans'
+    matplotlib.rcParams.update({'font.size': 12})
+
+# Gráficos estáticos: chave -> (atributo no sistema, título, rótulo do eixo x)
+STATIC_PLOTS = {
+    'renda': ('renda', 'Funções de Pertinência - Renda Mensal (R$)', 'Renda (R$)'),
+    'historico': ('historico', 'Funções de Pertinência - Score de Crédito', 'Score (0-10)'),
+    'idade': ('idade', 'Funções de Pertinência - Idade', 'Idade (anos)'),
+    'tempo_emprego': ('tempo_emprego', 'Funções de Pertinência - Tempo de Emprego', 'Tempo (anos)'),
+    'dividas': ('dividas', 'Funções de Pertinência - Percentual de Dívidas', 'Dívidas/Renda (%)'),
+    'risco': ('risco', 'Funções de Pertinência - Risco de Crédito', 'Risco (0-100)'),
+}
+
+# Formatos em que os gráficos estáticos podem ser gravados -> mimetype
+PLOT_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
 
-def generate_membership_plots(sistema_fuzzy):
-    """Gera gráficos para todas as funções de pertinência do sistema fuzzy"""
+# Saídas de generate_membership_plots/generate_dynamic_plots: imagens PNG em data URI ou os dados das curvas
+PLOT_OUTPUTS = ('png', 'json')
+
+def membership_data(key, model_variable):
+    """Dados para desenhar o gráfico de uma variável no navegador
     
-    plots = {}
+    `model_variable` é a VariavelModelo da chave (`variavel_modelo` do
+    estado): cada termo triangular é descrito pelos seus vértices [a, b, c],
+    sem montar o scikit-fuzzy, e o gráfico inteiro cabe em algumas centenas
+    de bytes de JSON, contra dezenas de KB de PNG.
+    """
     
-    # Gerar gráficos para cada variável de entrada
-    plots['renda'] = plot_variable(
-        sistema_fuzzy.renda, 
-        'Funções de Pertinência - Renda Mensal (R$)',
-        'Renda (R$)',
-        'Grau de Pertinência'
-    )
-    
-    plots['historico'] = plot_variable(
-        sistema_fuzzy.historico, 
-        'Funções de Pertinência - Score de Crédito',
-        'Score (0-10)',
-        'Grau de Pertinência'
-    )
+    attribute, title, xlabel = STATIC_PLOTS[key]
+    return {
+        'titulo': title,
+        'rotulo_x': xlabel,
+        'rotulo_y': 'Grau de Pertinência',
+        'universo': [model_variable.minimo, model_variable.maximo],
+        'termos': model_variable.termos,
+    }
+
+def check_output(output):
+    """ValueError se `output` não for uma das saídas de PLOT_OUTPUTS"""
+    if output not in PLOT_OUTPUTS:
+        raise ValueError(f"Saída de gráficos desconhecida: {output} (use {', '.join(PLOT_OUTPUTS)})")
+
+def generate_membership_plots(sistema_fuzzy, output='png'):
+    """Gera gráficos para todas as funções de pertinência do sistema fuzzy
     
-    plots['idade'] = plot_variable(
-        sistema_fuzzy.idade, 
-        'Funções de Pertinência - Idade',
-        'Idade (anos)',
-        'Grau de Pertinência'
-    )
+    Com `output='json'`, devolve os dados das curvas (`membership_data`) em
+    vez das imagens.
+    """
     
-    plots['tempo_emprego'] = plot_variable(
-        sistema_fuzzy.tempo_emprego, 
-        'Funções de Pertinência - Tempo de Emprego',
-        'Tempo (anos)',
-        'Grau de Pertinência'
-    )
+    check_output(output)
+    if output == 'json':
+        return {key: membership_data(key, sistema_fuzzy.variavel_modelo(key)) for key in STATIC_PLOTS}
     
-    plots['dividas'] = plot_variable(
-        sistema_fuzzy.dividas, 
-        'Funções de Pertinência - Percentual de Dívidas',
-        'Dívidas/Renda (%)',
-        'Grau de Pertinência'
-    )
+    plots = {}
     
-    plots['risco'] = plot_variable(
-        sistema_fuzzy.risco, 
-        'Funções de Pertinência - Risco de Crédito',
-        'Risco (0-100)',
-        'Grau de Pertinência'
-    )
+    # Gerar gráficos para cada variável (entradas e saída)
+    for key, (attribute, title, xlabel) in STATIC_PLOTS.items():
+        plots[key] = plot_variable(
+            getattr(sistema_fuzzy, attribute),
+            title,
+            xlabel,
+            'Grau de Pertinência'
+        )
     
     return plots
 
-def plot_variable(variable, title, xlabel, ylabel):
-    """Gera um gráfico para uma variável fuzzy específica"""
+# Figura reaproveitada pelos gráficos estáticos: (Figure, Axes), criada no primeiro gráfico
+_static_figure = None
+_static_figure_lock = threading.Lock()
+
+def render_variable_plot(variable, title, xlabel, ylabel, fmt='png'):
+    """Renderiza o gráfico de uma variável fuzzy (bytes no formato `fmt`)"""
+    
+    with _static_figure_lock:
+        return _draw_variable_plot(variable, title, xlabel, ylabel, fmt)
+
+def _draw_variable_plot(variable, title, xlabel, ylabel, fmt):
+    global _static_figure
     
-    # Criar figura
-    plt.figure(figsize=(10, 6))
+    if _static_figure is None:
+        setup_matplotlib()
+        from matplotlib.figure import Figure
+        
+        # Figure direto, sem o estado global do pyplot; os eixos são limpos a cada gráfico
+        fig = Figure(figsize=(10, 6))
+        _static_figure = (fig, fig.subplots())
+    fig, ax = _static_figure
+    ax.clear()
     
     # Verificar se a variável é do tipo correto (com atributo terms)
     if hasattr(variable, 'terms'):
         # Plotar cada função de pertinência
         for term_name, term_mf in variable.terms.items():
-            plt.plot(variable.universe, term_mf.mf, label=term_name)
+            ax.plot(variable.universe, term_mf.mf, label=term_name)
     else:
         print(f"Erro: Variável {title} não possui atributo 'terms'")
         # Criar um gráfico vazio para não quebrar o fluxo
-        plt.text(0.5, 0.5, "Gráfico não disponível", 
-                 horizontalalignment='center', verticalalignment='center',
-                 transform=plt.gca().transAxes, fontsize=14)
+        ax.text(0.5, 0.5, "Gráfico não disponível", 
+                horizontalalignment='center', verticalalignment='center',
+                transform=ax.transAxes, fontsize=14)
     
     # Configurar o gráfico
-    plt.title(title)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.ylim(0, 1.1)
-    plt.grid(True)
-    plt.legend(loc='center right')
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_ylim(0, 1.1)
+    ax.grid(True)
+    ax.legend(loc='center right')
     
     # Salvar o gráfico em um buffer de memória
     buf = BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    plt.close()
+    fig.savefig(buf, format=fmt, dpi=100, bbox_inches='tight')
+    return buf.getvalue()
+
+def plot_variable(variable, title, xlabel, ylabel):
+    """Gera um gráfico para uma variável fuzzy específica"""
+    
+    png = render_variable_plot(variable, title, xlabel, ylabel)
     
     # Converter para base64 para uso em HTML
-    buf.seek(0)
-    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+    img_base64 = base64.b64encode(png).decode('utf-8')
     
     return f"data:image/png;base64,{img_base64}"
 
-def plot_with_current_value(variable, value, title, xlabel, ylabel):
-    """Gera um gráfico para uma variável fuzzy com o valor atual destacado"""
+def plot_hash(key, model_variable):
+    """Hash dos rótulos, do universo amostrado e dos triângulos do gráfico de uma variável
     
-    # Criar figura
-    plt.figure(figsize=(10, 6))
+    `model_variable` é a variável do modelo (universo e vértices [a, b, c]),
+    então o hash sai sem montar o scikit-fuzzy nem importar o matplotlib.
+    """
     
-    # Verificar se a variável é do tipo correto (com atributo terms)
-    if hasattr(variable, 'terms'):
+    attribute, title, xlabel = STATIC_PLOTS[key]
+    labels = [title, xlabel, 'Grau de Pertinência', model_variable.termos]
+    digest = hashlib.sha256(json.dumps(labels, sort_keys=False).encode('utf-8'))
+    digest.update(np.ascontiguousarray(model_variable.universo, dtype=float).tobytes())
+    return digest.hexdigest()[:16]
+
+def membership_plot_file(sistema_fuzzy, key, cache_dir, fmt='png', render=None):
+    """Caminho do gráfico estático em disco e o hash da configuração
+    
+    O arquivo leva o hash no nome, então só é renderizado quando universo ou
+    termos mudam; reinícios e outros workers reaproveitam o mesmo arquivo.
+    `sistema_fuzzy` precisa de `variavel_modelo(key)` (como o EstadoModelo).
+    `render(key, fmt)`, se informado, substitui a renderização local (ex.:
+    enviando o gráfico a um processo de renderização).
+    """
+    
+    attribute, title, xlabel = STATIC_PLOTS[key]
+    digest = plot_hash(key, sistema_fuzzy.variavel_modelo(key))
+    path = os.path.join(cache_dir, f'{key}-{digest}.{fmt}')
+    
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        if render is None:
+            # Só aqui, com o arquivo ainda inexistente, as variáveis do scikit-fuzzy são montadas
+            variable = getattr(sistema_fuzzy, attribute)
+            content = render_variable_plot(variable, title, xlabel, 'Grau de Pertinência', fmt)
+        else:
+            content = render(key, fmt)
+        # Grava em arquivo temporário e renomeia: quem lê nunca vê um arquivo pela metade
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            # Falha na gravação (disco cheio, interrupção): não deixa o temporário para trás
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    return path, digest
+
+class CachedVariablePlot:
+    """Figura de uma variável desenhada uma única vez; por cliente só o marcador é redesenhado"""
+    
+    def __init__(self, variable, title, xlabel, ylabel):
+        self.variable = variable
+        self.lock = threading.Lock()
+        
+        setup_matplotlib()
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from PIL import Image
+        
+        self.fig = Figure(figsize=(10, 6), dpi=100)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.subplots()
+        
         # Plotar cada função de pertinência
         for term_name, term_mf in variable.terms.items():
-            plt.plot(variable.universe, term_mf.mf, label=term_name)
+            self.ax.plot(variable.universe, term_mf.mf, label=term_name)
         
-        # Destacar o valor atual
-        plt.axvline(x=value, color='red', linestyle='--', label=f'Valor atual: {value}')
-    else:
-        print(f"Erro: Variável {title} não possui atributo 'terms'")
-        # Criar um gráfico vazio para não quebrar o fluxo
-        plt.text(0.5, 0.5, "Gráfico não disponível", 
-                 horizontalalignment='center', verticalalignment='center',
-                 transform=plt.gca().transAxes, fontsize=14)
-    
-    # Configurar o gráfico
-    plt.title(title)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.ylim(0, 1.1)
-    plt.grid(True)
-    plt.legend(loc='center right')
+        # Marcador e rótulo do valor atual ficam fora do fundo (animated)
+        self.marker = self.ax.axvline(x=variable.universe[0], color='red', linestyle='--',
+                                      label='Valor atual', animated=True)
+        self.label = self.ax.text(0, 1.05, '', color='red', horizontalalignment='center',
+                                  verticalalignment='bottom', animated=True)
+        
+        # Configurar o gráfico
+        self.ax.set_title(title)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        self.ax.set_ylim(0, 1.1)
+        self.ax.grid(True)
+        self.ax.legend(loc='center right')
+        self.fig.tight_layout()
+        
+        # Renderizar o fundo estático uma vez
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.xmin, self.xmax = self.ax.get_xlim()
+        
+        # Paleta fixa (fundo + marcador): PNG de 8 bits sai bem mais rápido que RGB
+        self.palette = None
+        self.palette = Image.open(BytesIO(self.render((self.xmin + self.xmax) / 2))).quantize(
+            256, dither=Image.Dither.NONE)
     
-    # Salvar o gráfico em um buffer de memória
-    buf = BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    plt.close()
+    def render(self, value):
+        """Compõe o marcador sobre o fundo em cache e devolve os bytes PNG"""
+        from PIL import Image
+        
+        # Valores fora do universo ficam presos na borda do gráfico
+        x = min(max(float(value), self.xmin), self.xmax)
+        
+        with self.lock:
+            self.canvas.restore_region(self.background)
+            self.marker.set_xdata([x, x])
+            self.label.set_x(x)
+            self.label.set_text(f'Valor atual: {value}')
+            self.ax.draw_artist(self.marker)
+            self.ax.draw_artist(self.label)
+            image = Image.frombuffer('RGBA', self.canvas.get_width_height(),
+                                     self.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1).convert('RGB')
+        
+        if self.palette is not None:
+            image = image.quantize(palette=self.palette, dither=Image.Dither.NONE)
+        
+        buf = BytesIO()
+        image.save(buf, format='png', compress_level=1)
+        return buf.getvalue()
+
+# Figuras em cache: título -> CachedVariablePlot (da variável mais recente com esse título)
+_cached_plots = {}
+_cached_plots_lock = threading.Lock()
+
+def get_cached_plot(variable, title, xlabel, ylabel):
+    """Obtém (ou cria na primeira chamada) a figura em cache de uma variável
     
-    # Converter para base64 para uso em HTML
-    buf.seek(0)
-    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+    Quando o modelo é recarregado, a figura da variável antiga é substituída
+    em vez de acumular no cache.
+    """
     
-    return f"data:image/png;base64,{img_base64}"
+    with _cached_plots_lock:
+        cached = _cached_plots.get(title)
+        if cached is None or cached.variable is not variable:
+            cached = _cached_plots[title] = CachedVariablePlot(variable, title, xlabel, ylabel)
+    return cached
 
-def generate_dynamic_plots(sistema_fuzzy, dados_cliente):
-    """Gera gráficos com os valores atuais do cliente destacados"""
+def render_current_value_png(variable, value, title, xlabel, ylabel):
+    """Renderiza o gráfico de uma variável com o valor atual destacado (bytes PNG)"""
     
-    plots = {}
+    # Verificar se a variável é do tipo correto (com atributo terms)
+    if hasattr(variable, 'terms'):
+        return get_cached_plot(variable, title, xlabel, ylabel).render(value)
     
-    # Gerar gráficos para cada variável de entrada com o valor atual
-    plots['renda'] = plot_with_current_value(
-        sistema_fuzzy.renda,
-        dados_cliente['renda'],
-        'Funções de Pertinência - Renda Mensal (R$)',
-        'Renda (R$)',
-        'Grau de Pertinência'
-    )
+    print(f"Erro: Variável {title} não possui atributo 'terms'")
+    setup_matplotlib()
+    from matplotlib.figure import Figure
     
-    plots['historico'] = plot_with_current_value(
-        sistema_fuzzy.historico,
-        dados_cliente['historico'],
-        'Funções de Pertinência - Score de Crédito',
-        'Score (0-10)',
-        'Grau de Pertinência'
-    )
+    # Criar um gráfico vazio para não quebrar o fluxo
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.text(0.5, 0.5, "Gráfico não disponível", 
+            horizontalalignment='center', verticalalignment='center',
+            transform=ax.transAxes, fontsize=14)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
     
-    plots['idade'] = plot_with_current_value(
-        sistema_fuzzy.idade,
-        dados_cliente['idade'],
-        'Funções de Pertinência - Idade',
-        'Idade (anos)',
-        'Grau de Pertinência'
-    )
+    # Salvar o gráfico em um buffer de memória
+    buf = BytesIO()
+    fig.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+    return buf.getvalue()
+
+# Gráficos dinâmicos: chave em dados_cliente -> (atributo no sistema, título, rótulo do eixo x)
+DYNAMIC_PLOTS = {key: value for key, value in STATIC_PLOTS.items() if key != 'risco'}
+
+def generate_dynamic_plot(sistema_fuzzy, dados_cliente, key):
+    """Gera o PNG de uma única variável com o valor do cliente destacado"""
     
-    plots['tempo_emprego'] = plot_with_current_value(
-        sistema_fuzzy.tempo_emprego,
-        dados_cliente['tempo_emprego'],
-        'Funções de Pertinência - Tempo de Emprego',
-        'Tempo (anos)',
+    attribute, title, xlabel = DYNAMIC_PLOTS[key]
+    return render_current_value_png(
+        getattr(sistema_fuzzy, attribute),
+        dados_cliente[key],
+        title,
+        xlabel,
         'Grau de Pertinência'
     )
+
+# Estado do modelo em processos de renderização: caminho -> (assinatura pedida, EstadoModelo)
+_process_states = {}
+
+def _process_state(model_path, signature):
+    """Modelo lido do arquivo uma vez e relido quando a assinatura pedida muda (modelo recarregado no servidor)
+
+    Se o arquivo já não tem a assinatura pedida (editado e ainda não
+    recarregado, ou recarga recusada), levanta ValueError: desenhar os
+    triângulos novos sob o hash antigo deixaria um gráfico errado no cache.
+    """
+    cached = _process_states.get(model_path)
+    if cached is None or cached[0] != signature:
+        from modelo_fuzzy import ModeloFuzzy
+        from sistema_risco import CAMPOS_ENTRADA, EstadoModelo
+        model = ModeloFuzzy.carregar(model_path, CAMPOS_ENTRADA.values())
+        if model.assinatura != signature:
+            raise ValueError(f"O arquivo {model_path} tem o modelo {model.assinatura}, não o pedido {signature}")
+        cached = _process_states[model_path] = (signature, EstadoModelo(model, 'centroid'))
+    return cached[1]
+
+def render_dynamic_plot_from_model(model_path, signature, key, value):
+    """Renderiza o PNG dinâmico num processo que não tem o sistema fuzzy"""
+    return generate_dynamic_plot(_process_state(model_path, signature), {key: value}, key)
+
+def render_static_plot_from_model(model_path, signature, key, fmt='png'):
+    """Renderiza um gráfico estático (bytes no formato `fmt`) num processo que não tem o sistema fuzzy"""
+    attribute, title, xlabel = STATIC_PLOTS[key]
+    variable = getattr(_process_state(model_path, signature), attribute)
+    return render_variable_plot(variable, title, xlabel, 'Grau de Pertinência', fmt)
+
+def generate_dynamic_plots(sistema_fuzzy, dados_cliente, output='png'):
+    """Gera gráficos com os valores atuais do cliente destacados
     
-    plots['dividas'] = plot_with_current_value(
-        sistema_fuzzy.dividas,
-        dados_cliente['dividas'],
-        'Funções de Pertinência - Percentual de Dívidas',
-        'Dívidas/Renda (%)',
-        'Grau de Pertinência'
-    )
+    Com `output='json'`, devolve os dados das curvas com o valor do cliente
+    em `valor`, para o marcador ser desenhado no navegador.
+    """
+    
+    check_output(output)
+    if output == 'json':
+        return {key: dict(membership_data(key, sistema_fuzzy.variavel_modelo(key)), valor=dados_cliente[key])
+                for key in DYNAMIC_PLOTS}
+    
+    plots = {}
+    
+    # Gerar gráficos para cada variável de entrada com o valor atual
+    for key in DYNAMIC_PLOTS:
+        png = generate_dynamic_plot(sistema_fuzzy, dados_cliente, key)
+        plots[key] = f"data:image/png;base64,{base64.b64encode(png).decode('utf-8')}"
     
     return plots
 
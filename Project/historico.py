@@ -0,0 +1,219 @@
+"""
+Histórico de avaliações
+Armazena os resultados de `avaliar_cliente` sem os gráficos. O backend padrão
+é um buffer circular em memória (limitado); o SQLite guarda o histórico em
+disco e sobrevive a reinícios do servidor.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+# Campos do resultado que não entram no histórico (gráficos são gerados sob demanda)
+CAMPOS_EXCLUIDOS = ('plots',)
+
+
+def preparar_registro(resultado):
+    """Cópia do resultado sem os campos excluídos"""
+    return {chave: valor for chave, valor in resultado.items() if chave not in CAMPOS_EXCLUIDOS}
+
+
+def projetar(registro, campos=None):
+    """Só os `campos` pedidos do registro (todos se `campos` for None)"""
+    if campos is None:
+        return registro
+    return {campo: registro[campo] for campo in campos if campo in registro}
+
+
+class HistoricoBase:
+    """Operações comuns aos backends, construídas sobre `listar`"""
+
+    def iterar(self, inicio=None, fim=None, cursor=None, lote=500):
+        """Percorre os registros do mais recente ao mais antigo, uma página por vez
+
+        Só uma página fica em memória de cada vez, então serve para exportar
+        históricos grandes em streaming.
+        """
+        while True:
+            itens, _, cursor = self.listar(lote, inicio=inicio, fim=fim, cursor=cursor)
+            yield from itens
+            if cursor is None:
+                return
+
+
+class HistoricoMemoria(HistoricoBase):
+    """Buffer circular: ao passar de `maximo` registros, os mais antigos são descartados
+
+    Os registros ficam numa lista indexável (os descartados são apagados do
+    começo aos blocos), e como `seq` é contínuo a posição de cada um sai por
+    conta. Assim uma página é encontrada por busca binária e lida direto,
+    sem copiar nem filtrar o histórico inteiro.
+    """
+
+    def __init__(self, maximo=1000):
+        self.maximo = maximo
+        # (seq, criado_em, registro), do mais antigo ao mais novo, a partir de _base
+        self._registros = []
+        self._base = 0
+        self._por_id = {}
+        self._seq = 0
+        self._trava = threading.Lock()
+
+    def adicionar(self, resultado):
+        """Guarda o resultado (sem gráficos) e devolve o registro armazenado"""
+        registro = preparar_registro(resultado)
+        with self._trava:
+            self._seq += 1
+            # criado_em nunca recua (relógio ajustado para trás), para a busca binária por período
+            criado_em = time.time()
+            if len(self._registros) > self._base:
+                criado_em = max(criado_em, self._registros[-1][1])
+            self._registros.append((self._seq, criado_em, registro))
+            self._por_id[registro['id']] = registro
+            while len(self._registros) - self._base > self.maximo:
+                _, _, antigo = self._registros[self._base]
+                self._registros[self._base] = None
+                self._base += 1
+                self._por_id.pop(antigo['id'], None)
+            if self._base > 1024 and self._base * 2 > len(self._registros):
+                # Compacta quando os descartados passam da metade (custo amortizado constante)
+                del self._registros[:self._base]
+                self._base = 0
+        return registro
+
+    def obter(self, avaliacao_id):
+        """Registro pelo id, ou None se não existir (ou já tiver sido descartado)"""
+        return self._por_id.get(avaliacao_id)
+
+    def listar(self, limite=50, deslocamento=0, inicio=None, fim=None, cursor=None):
+        """Página de registros do mais recente ao mais antigo
+
+        `inicio`/`fim` (epoch) filtram o período e `cursor` é o valor de
+        `proximo` devolvido pela página anterior. Retorna (itens, total no
+        período, proximo), com `proximo` None na última página.
+        """
+        momento = itemgetter(1)
+        with self._trava:
+            registros, base = self._registros, self._base
+            # Posições [baixo, alto) do período: criado_em cresce junto com seq
+            baixo = base if inicio is None else bisect_left(registros, inicio, base, len(registros), key=momento)
+            alto = len(registros) if fim is None else bisect_right(registros, fim, baixo, len(registros), key=momento)
+            total = alto - baixo
+
+            topo = alto
+            if cursor is not None and total:
+                # seq contínuo: os registros com seq < cursor ficam antes desta posição
+                topo = min(topo, max(cursor - registros[base][0] + base, baixo))
+            topo -= deslocamento
+            fundo = max(topo - limite, baixo)
+            pagina = [registros[i] for i in range(topo - 1, fundo - 1, -1)]
+
+        proximo = pagina[-1][0] if pagina and fundo > baixo else None
+        return [registro for _, _, registro in pagina], total, proximo
+
+    def limpar(self):
+        with self._trava:
+            self._registros = []
+            self._base = 0
+            self._por_id.clear()
+
+    def __len__(self):
+        return len(self._registros) - self._base
+
+
+class HistoricoSQLite(HistoricoBase):
+    """Histórico persistente em um arquivo SQLite (uma conexão compartilhada entre threads)"""
+
+    def __init__(self, caminho, maximo=None):
+        self.caminho = caminho
+        self.maximo = maximo
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._trava = threading.Lock()
+        with self._trava, self._conexao:
+            self._conexao.execute(
+                "CREATE TABLE IF NOT EXISTS avaliacoes ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " id TEXT UNIQUE NOT NULL,"
+                " criado_em REAL NOT NULL,"
+                " registro TEXT NOT NULL)")
+            self._conexao.execute(
+                "CREATE INDEX IF NOT EXISTS idx_avaliacoes_criado_em ON avaliacoes (criado_em)")
+
+    def adicionar(self, resultado):
+        """Guarda o resultado (sem gráficos) e devolve o registro armazenado"""
+        registro = preparar_registro(resultado)
+        with self._trava, self._conexao:
+            self._conexao.execute(
+                "INSERT INTO avaliacoes (id, criado_em, registro) VALUES (?, ?, ?)",
+                (registro['id'], time.time(), json.dumps(registro, ensure_ascii=False)))
+            if self.maximo:
+                self._conexao.execute(
+                    "DELETE FROM avaliacoes WHERE seq <= "
+                    "(SELECT MAX(seq) FROM avaliacoes) - ?", (self.maximo,))
+        return registro
+
+    def obter(self, avaliacao_id):
+        """Registro pelo id, ou None se não existir"""
+        with self._trava:
+            linha = self._conexao.execute(
+                "SELECT registro FROM avaliacoes WHERE id = ?", (avaliacao_id,)).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def listar(self, limite=50, deslocamento=0, inicio=None, fim=None, cursor=None):
+        """Página de registros do mais recente ao mais antigo (mesma interface da memória)"""
+        filtro, parametros = self._filtro(inicio, fim)
+        filtro_cursor, parametros_cursor = self._filtro(inicio, fim, cursor)
+        with self._trava:
+            total = self._conexao.execute(
+                f"SELECT COUNT(*) FROM avaliacoes{filtro}", parametros).fetchone()[0]
+            # Uma linha a mais só para saber se existe próxima página
+            linhas = self._conexao.execute(
+                f"SELECT seq, registro FROM avaliacoes{filtro_cursor} "
+                "ORDER BY seq DESC LIMIT ? OFFSET ?",
+                parametros_cursor + [limite + 1, deslocamento]).fetchall()
+
+        proximo = linhas[limite - 1][0] if len(linhas) > limite else None
+        return [json.loads(registro) for _, registro in linhas[:limite]], total, proximo
+
+    @staticmethod
+    def _filtro(inicio, fim, cursor=None):
+        condicoes, parametros = [], []
+        if inicio is not None:
+            condicoes.append("criado_em >= ?")
+            parametros.append(inicio)
+        if fim is not None:
+            condicoes.append("criado_em <= ?")
+            parametros.append(fim)
+        if cursor is not None:
+            condicoes.append("seq < ?")
+            parametros.append(cursor)
+        return (" WHERE " + " AND ".join(condicoes) if condicoes else ""), parametros
+
+    def limpar(self):
+        with self._trava, self._conexao:
+            self._conexao.execute("DELETE FROM avaliacoes")
+
+    def __len__(self):
+        with self._trava:
+            return self._conexao.execute("SELECT COUNT(*) FROM avaliacoes").fetchone()[0]
+
+
+def criar_historico(backend=None, maximo=None, caminho=None):
+    """Histórico conforme HISTORICO_BACKEND ('memoria' ou 'sqlite'), HISTORICO_MAX e HISTORICO_DB"""
+    backend = backend or os.environ.get('HISTORICO_BACKEND', 'memoria')
+    if 'HISTORICO_MAX' in os.environ:
+        maximo = maximo or int(os.environ['HISTORICO_MAX'])
+
+    if backend == 'memoria':
+        return HistoricoMemoria(maximo or 1000)
+    if backend == 'sqlite':
+        # No SQLite o limite só vale se for configurado explicitamente
+        caminho = caminho or os.environ.get('HISTORICO_DB') or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'cache', 'historico.sqlite3')
+        return HistoricoSQLite(caminho, maximo)
+    raise ValueError(f"Backend de histórico desconhecido: {backend} (use memoria, sqlite)")
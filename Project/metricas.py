@@ -0,0 +1,226 @@
+"""
+Métricas no formato de texto do Prometheus
+Contadores, medidores e histogramas com rótulos, seguros para threads e sem
+dependências externas. As métricas ficam num registro do processo
+(`REGISTRO`) e `texto()` gera a página servida em `/metrics`. Com vários
+processos (gunicorn com workers), cada processo tem as suas.
+"""
+
+import bisect
+import math
+import threading
+import time
+
+# Limites dos histogramas de duração, em segundos (de 50 µs a 10 s)
+LIMITES_DURACAO = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _rotulos(nomes, valores):
+    """Texto `{a="x",b="y"}` dos rótulos (vazio sem rótulos)"""
+    if not nomes:
+        return ''
+    pares = []
+    for nome, valor in zip(nomes, valores):
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{nome}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+
+def _numero(valor):
+    """Número no formato do Prometheus (+Inf, inteiros sem casa decimal)"""
+    if math.isinf(valor):
+        return '+Inf' if valor > 0 else '-Inf'
+    return repr(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+class Metrica:
+    """Base: nome, ajuda, nomes dos rótulos e uma trava"""
+
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._trava = threading.Lock()
+
+    def _chave(self, rotulos):
+        try:
+            if len(rotulos) == len(self.rotulos):
+                return tuple([rotulos[nome] for nome in self.rotulos])
+        except KeyError:
+            pass
+        raise ValueError(f"{self.nome} espera os rótulos {self.rotulos}, recebeu {tuple(rotulos)}")
+
+    def amostras(self):
+        """(sufixo, texto dos rótulos, valor) de cada série"""
+        raise NotImplementedError
+
+    def texto(self):
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} {self.tipo}']
+        linhas += [f'{self.nome}{sufixo}{rotulos} {_numero(valor)}'
+                   for sufixo, rotulos, valor in self.amostras()]
+        return '\n'.join(linhas)
+
+
+class Contador(Metrica):
+    """Valor que só cresce (eventos, bytes)"""
+
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores = {}
+
+    def incrementar(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def valor(self, **rotulos):
+        return self._valores.get(self._chave(rotulos), 0)
+
+    def amostras(self):
+        with self._trava:
+            valores = sorted(self._valores.items())
+        return [('', _rotulos(self.rotulos, chave), valor) for chave, valor in valores]
+
+
+class Medidor(Metrica):
+    """Valor instantâneo, lido de uma função no momento da coleta
+
+    Com rótulos, a função devolve {(valores dos rótulos): valor}.
+    """
+
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, funcao, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self.funcao = funcao
+
+    def amostras(self):
+        try:
+            valores = self.funcao()
+            if not self.rotulos:
+                return [('', '', float(valores))]
+            return [('', _rotulos(self.rotulos, chave), float(valor))
+                    for chave, valor in sorted(valores.items())]
+        except Exception:
+            # Uma fonte indisponível não derruba a página de métricas inteira
+            return []
+
+
+class Histograma(Metrica):
+    """Distribuição de valores em faixas cumulativas (le), com soma e contagem"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_DURACAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites))
+        self._series = {}
+
+    def observar(self, valor, **rotulos):
+        self._observar(self._chave(rotulos), valor)
+
+    def _observar(self, chave, valor):
+        faixa = bisect.bisect_left(self.limites, valor)
+        with self._trava:
+            serie = self._series.get(chave)
+            if serie is None:
+                # [contagem por faixa (a última é +Inf), soma, contagem total]
+                serie = self._series[chave] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][faixa] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def medir(self, **rotulos):
+        """Cronômetro para `with`: observa a duração do bloco em segundos"""
+        return Cronometro(self, self._chave(rotulos))
+
+    def contagem(self, **rotulos):
+        serie = self._series.get(self._chave(rotulos))
+        return serie[2] if serie else 0
+
+    def amostras(self):
+        with self._trava:
+            series = sorted((chave, (list(faixas), soma, total))
+                            for chave, (faixas, soma, total) in self._series.items())
+        amostras = []
+        for chave, (faixas, soma, total) in series:
+            acumulado = 0
+            for limite, quantidade in zip(self.limites + (math.inf,), faixas):
+                acumulado += quantidade
+                rotulos = _rotulos(self.rotulos + ('le',), chave + (_numero(limite),))
+                amostras.append(('_bucket', rotulos, acumulado))
+            rotulos = _rotulos(self.rotulos, chave)
+            amostras += [('_sum', rotulos, soma), ('_count', rotulos, total)]
+        return amostras
+
+
+class Cronometro:
+    """Mede a duração de um bloco `with` e registra no histograma"""
+
+    __slots__ = ('histograma', 'chave', 'inicio')
+
+    def __init__(self, histograma, chave):
+        self.histograma = histograma
+        self.chave = chave
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        self.histograma._observar(self.chave, time.perf_counter() - self.inicio)
+        return False
+
+
+class Registro:
+    """Conjunto das métricas de um processo, por nome"""
+
+    def __init__(self):
+        self._metricas = {}
+        self._trava = threading.Lock()
+
+    def registrar(self, metrica):
+        """Registra a métrica; um nome já registrado devolve a métrica existente
+
+        Assim um módulo importado de novo (ou dois sistemas no mesmo processo)
+        compartilham as séries em vez de duplicá-las na página.
+        """
+        with self._trava:
+            existente = self._metricas.get(metrica.nome)
+            if existente is not None:
+                if type(existente) is not type(metrica):
+                    raise ValueError(f"Métrica {metrica.nome} já registrada como {existente.tipo}")
+                if isinstance(metrica, Medidor):
+                    existente.funcao = metrica.funcao
+                return existente
+            self._metricas[metrica.nome] = metrica
+            return metrica
+
+    def texto(self):
+        """Página de métricas no formato de texto do Prometheus (versão 0.0.4)"""
+        with self._trava:
+            metricas = list(self._metricas.values())
+        return '\n'.join(metrica.texto() for metrica in metricas) + '\n'
+
+
+REGISTRO = Registro()
+
+# Content-Type da página de métricas
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def contador(nome, ajuda, rotulos=(), registro=REGISTRO):
+    return registro.registrar(Contador(nome, ajuda, rotulos))
+
+
+def medidor(nome, ajuda, funcao, rotulos=(), registro=REGISTRO):
+    return registro.registrar(Medidor(nome, ajuda, funcao, rotulos))
+
+
+def histograma(nome, ajuda, rotulos=(), limites=LIMITES_DURACAO, registro=REGISTRO):
+    return registro.registrar(Histograma(nome, ajuda, rotulos, limites))
@@ -0,0 +1,132 @@
+"""
+Modelo fuzzy declarativo
+Lê de um arquivo JSON os universos, os triângulos [a, b, c] de cada termo e as
+regras, valida a definição uma única vez e entrega as estruturas usadas pelo
+motor nativo (arrays NumPy e regras já decompostas) e, quando necessário, as
+variáveis e regras do scikit-fuzzy.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from motor_fuzzy import MotorFuzzyVetorizado, universo_por_vertices
+
+CAMINHO_MODELO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     'modelos', 'risco_credito.json')
+
+
+class VariavelModelo:
+    """Universo amostrado e triângulos de uma variável do modelo"""
+
+    __slots__ = ('nome', 'minimo', 'maximo', 'universo', 'termos', 'pontos')
+
+    def __init__(self, nome, definicao):
+        self.nome = nome
+        self.minimo, self.maximo = definicao['universo']
+        self.termos = {termo: list(pontos) for termo, pontos in definicao['termos'].items()}
+
+        if self.minimo >= self.maximo:
+            raise ValueError(f"Universo inválido em {nome}: {definicao['universo']}")
+        for termo, pontos in self.termos.items():
+            if len(pontos) != 3 or not self.minimo <= pontos[0] <= pontos[1] <= pontos[2] <= self.maximo:
+                raise ValueError(f"Triângulo inválido em {nome}[{termo}]: {pontos}")
+
+        # (termos x 3) com os vértices, na mesma ordem de `termos`
+        self.pontos = np.array(list(self.termos.values()), dtype=float).reshape(-1, 3)
+        self.universo = universo_por_vertices(self.minimo, self.maximo, self.termos,
+                                              definicao.get('passo'))
+
+
+class ModeloFuzzy:
+    """Definição completa do sistema fuzzy, lida de um arquivo e validada"""
+
+    def __init__(self, definicao, origem=None, entradas=()):
+        self.definicao = definicao
+        self.origem = origem
+        self.nome = definicao.get('nome', 'modelo')
+        self.versao = definicao.get('versao', 1)
+
+        self.entradas = {nome: VariavelModelo(nome, variavel)
+                         for nome, variavel in definicao['entradas'].items()}
+        faltando = [nome for nome in entradas if nome not in self.entradas]
+        if faltando:
+            raise ValueError(f"Entradas ausentes no modelo: {', '.join(faltando)}")
+        if len(definicao['saida']) != 1:
+            raise ValueError("O modelo deve ter exatamente uma variável de saída")
+        (nome_saida, saida), = definicao['saida'].items()
+        self.saida = VariavelModelo(nome_saida, saida)
+
+        self.regras = [self._decompor(i, regra) for i, regra in enumerate(definicao['regras'])]
+
+        # Hash do conteúdo (independe de espaços e da ordem das chaves no arquivo)
+        conteudo = json.dumps(definicao, sort_keys=True, ensure_ascii=False)
+        self.assinatura = hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def carregar(cls, caminho=None, entradas=()):
+        """Lê o modelo de `caminho` (padrão: FUZZY_MODELO ou modelos/risco_credito.json)
+
+        `entradas` são as variáveis de entrada que quem chama vai usar; um
+        arquivo sem alguma delas é recusado aqui, e não na primeira avaliação.
+        """
+        caminho = caminho or os.environ.get('FUZZY_MODELO') or CAMINHO_MODELO_PADRAO
+        with open(caminho, encoding='utf-8') as arquivo:
+            return cls(json.load(arquivo), origem=caminho, entradas=entradas)
+
+    def _decompor(self, i, regra):
+        """Regra do arquivo no formato do motor: ([(variável, termo)], [(termo, peso)])"""
+        if not regra['se']:
+            raise ValueError(f"Regra {i}: sem condições em 'se'")
+        termos = []
+        for variavel, termo in regra['se'].items():
+            if variavel not in self.entradas or termo not in self.entradas[variavel].termos:
+                raise ValueError(f"Regra {i}: termo desconhecido {variavel}[{termo}]")
+            termos.append((variavel, termo))
+        if regra['entao'] not in self.saida.termos:
+            raise ValueError(f"Regra {i}: termo de saída desconhecido {regra['entao']}")
+        return termos, [(regra['entao'], regra.get('peso', 1.0))]
+
+    @property
+    def pertinencias(self):
+        """{variável: {termo: [a, b, c]}} de todas as variáveis, entradas e saída"""
+        variaveis = list(self.entradas.values()) + [self.saida]
+        return {variavel.nome: variavel.termos for variavel in variaveis}
+
+    def criar_motor(self, metodo_defuzz='centroid', regras=None):
+        """Motor nativo do modelo (com as regras do arquivo ou a lista dada)"""
+        return MotorFuzzyVetorizado(
+            {nome: (variavel.minimo, variavel.maximo, variavel.termos)
+             for nome, variavel in self.entradas.items()},
+            (self.saida.nome, self.saida.universo, self.saida.termos),
+            self.regras if regras is None else regras,
+            metodo_defuzz)
+
+    def criar_variaveis_controle(self):
+        """Antecedents e Consequent do scikit-fuzzy, por nome da variável"""
+        import skfuzzy as fuzz
+        from skfuzzy import control as ctrl
+
+        variaveis = {nome: ctrl.Antecedent(variavel.universo, nome)
+                     for nome, variavel in self.entradas.items()}
+        variaveis[self.saida.nome] = ctrl.Consequent(self.saida.universo, self.saida.nome)
+        for nome, variavel in variaveis.items():
+            for termo, pontos in self.pertinencias[nome].items():
+                variavel[termo] = fuzz.trimf(variavel.universe, pontos)
+        return variaveis
+
+    def criar_regras_controle(self, variaveis):
+        """ctrl.Rule de cada regra do modelo sobre as variáveis de `criar_variaveis_controle`"""
+        from skfuzzy import control as ctrl
+
+        regras = []
+        for termos, consequentes in self.regras:
+            antecedente = variaveis[termos[0][0]][termos[0][1]]
+            for variavel, termo in termos[1:]:
+                antecedente = antecedente & variaveis[variavel][termo]
+            (saida, peso), = consequentes
+            consequente = variaveis[self.saida.nome][saida]
+            regras.append(ctrl.Rule(antecedente, consequente % peso if peso != 1 else consequente))
+        return regras
@@ -0,0 +1,342 @@
+"""
+Motor de inferência fuzzy nativo
+Avalia as funções triangulares de forma analítica e aplica min/max diretamente,
+sem passar pelo grafo de controle do scikit-fuzzy. Funciona com arrays NumPy,
+então serve tanto para um cliente quanto para lotes.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+# Defuzzificação: os métodos do scikit-fuzzy (sobre o universo amostrado) e o
+# centróide exato da função agregada, que é linear por partes
+METODOS_DEFUZZ = ('centroid', 'bisector', 'mom', 'som', 'lom', 'centroide_exato')
+
+
+def trimf(x, pontos):
+    """Função de pertinência triangular analítica (mesma convenção do fuzz.trimf)
+
+    O triângulo é definido pelos próprios vértices, então a interpolação linear
+    entre eles é exata e roda em uma única passada do NumPy.
+    """
+    a, b, c = pontos
+    vertices, alturas = [b], [1.0]
+    if a != b:
+        vertices.insert(0, a)
+        alturas.insert(0, 0.0)
+    if b != c:
+        vertices.append(c)
+        alturas.append(0.0)
+    return np.interp(x, vertices, alturas, left=0.0, right=0.0)
+
+
+def trimf_escalar(x, pontos):
+    """Versão escalar de `trimf`, sem o custo de criar arrays"""
+    a, b, c = pontos
+    if x == b:
+        return 1.0
+    if a < x < b:
+        return (x - a) / (b - a)
+    if b < x < c:
+        return (c - x) / (c - b)
+    return 0.0
+
+
+def universo_por_vertices(minimo, maximo, termos, passo=None):
+    """Universo com os vértices dos triângulos e, se `passo`, amostras regulares entre eles
+
+    Entre vértices consecutivos as pertinências são lineares, então os
+    vértices já bastam para a interpolação do scikit-fuzzy ser exata; o
+    `passo` só deixa o universo mais denso.
+    """
+    pontos = [minimo, maximo] + [v for triangulo in termos.values() for v in triangulo]
+    if passo:
+        pontos += np.arange(minimo, maximo, passo).tolist()
+    universo = np.unique(pontos)
+    return universo[(universo >= minimo) & (universo <= maximo)]
+
+
+def cruzamentos_arestas(termos):
+    """Abscissas onde arestas de triângulos diferentes se cruzam
+
+    Junto com os vértices e os pontos de corte, são os pontos onde o máximo
+    dos triângulos cortados pode mudar de inclinação.
+    """
+    arestas = []
+    for a, b, c in termos.values():
+        if a != b:
+            arestas.append((a, 0.0, b, 1.0))
+        if b != c:
+            arestas.append((b, 1.0, c, 0.0))
+
+    pontos = []
+    for i, (x1, y1, x2, y2) in enumerate(arestas):
+        m1 = (y2 - y1) / (x2 - x1)
+        for x3, y3, x4, y4 in arestas[i + 1:]:
+            m2 = (y4 - y3) / (x4 - x3)
+            if m1 == m2:
+                continue
+            x = (y3 - y1 + m1 * x1 - m2 * x3) / (m1 - m2)
+            if max(x1, x3) <= x <= min(x2, x4):
+                pontos.append(x)
+    return pontos
+
+
+def indexar_regras(regras):
+    """(variável, termo) -> índices das regras que usam o termo"""
+    indice = {}
+    for i, (termos, _) in enumerate(regras):
+        for termo in termos:
+            indice.setdefault(termo, []).append(i)
+    return indice
+
+
+def decompor_regra(regra):
+    """Converte uma ctrl.Rule em ([(variável, termo), ...], [(termo, peso), ...])"""
+
+    def termos(antecedente):
+        if getattr(antecedente, 'kind', None) == 'and':
+            return termos(antecedente.term1) + termos(antecedente.term2)
+        if hasattr(antecedente, 'kind'):
+            raise ValueError(f"Regra não suportada pelo motor nativo: {antecedente}")
+        return [(antecedente.parent.label, antecedente.label)]
+
+    consequentes = [(c.term.label, c.weight) for c in regra.consequent]
+    return termos(regra.antecedent), consequentes
+
+
+class MotorFuzzyVetorizado:
+    """Fuzzificação, disparo de regras e defuzzificação por centróide em lote
+
+    `entradas` mapeia cada variável para (mínimo, máximo, {termo: [a, b, c]}),
+    `saida` é (nome, universo, {termo: [a, b, c]}) e `regras` é a lista
+    produzida por `decompor_regra`.
+    """
+
+    def __init__(self, entradas, saida, regras, metodo_defuzz='centroid'):
+        if metodo_defuzz not in METODOS_DEFUZZ:
+            raise ValueError(f"Método de defuzzificação desconhecido: {metodo_defuzz} "
+                             f"(use {', '.join(METODOS_DEFUZZ)})")
+        self.entradas = {variavel: (float(minimo), float(maximo), termos)
+                         for variavel, (minimo, maximo, termos) in entradas.items()}
+        self.nome_saida, universo, self.termos_saida = saida
+        self.universo_saida = np.asarray(universo, dtype=float)
+        self.regras = list(regras)
+        self.metodo_defuzz = metodo_defuzz
+        self.indice_regras = indexar_regras(self.regras)
+
+        # Pontos fixos do centróide exato: extremos do universo, vértices e cruzamentos de arestas
+        vertices = [v for triangulo in self.termos_saida.values() for v in triangulo]
+        self._pontos_fixos = np.unique(np.clip(
+            [self.universo_saida[0], self.universo_saida[-1]] + vertices
+            + cruzamentos_arestas(self.termos_saida),
+            self.universo_saida[0], self.universo_saida[-1]))
+        triangulos = np.array(list(self.termos_saida.values()), dtype=float)
+        self._a, self._b, self._c = triangulos.T
+
+    def assinatura(self):
+        """Hash do modelo (universos, termos e regras) para invalidar artefatos em cache"""
+        conteudo = json.dumps([self.entradas, self.nome_saida, self.universo_saida.tolist(),
+                               self.termos_saida, self.regras, self.metodo_defuzz], sort_keys=True)
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:16]
+
+    def fuzzificar(self, valores):
+        """Calcula o grau de pertinência de cada termo para todas as amostras"""
+        pertinencias = {}
+        for variavel, (minimo, maximo, termos) in self.entradas.items():
+            # Mesmo comportamento do ControlSystemSimulation (clip_to_bounds)
+            x = np.clip(np.asarray(valores[variavel], dtype=float), minimo, maximo)
+            for nome, pontos in termos.items():
+                pertinencias[(variavel, nome)] = trimf(x, pontos)
+        return pertinencias
+
+    def disparar_regras(self, pertinencias, n):
+        """Aplica AND (mínimo) nas regras e acumula os cortes por máximo"""
+        cortes = {nome: np.zeros(n) for nome in self.termos_saida}
+        # Regras com algum termo nulo em todo o bloco não contribuem
+        nulos = {termo for termo, graus in pertinencias.items() if not graus.any()}
+        for termos, consequentes in self.regras:
+            if nulos.intersection(termos):
+                continue
+            forca = np.minimum.reduce([pertinencias[termo] for termo in termos])
+            for nome, peso in consequentes:
+                np.maximum(cortes[nome], forca * peso, out=cortes[nome])
+        return cortes
+
+    def defuzzificar(self, cortes):
+        """Converte os cortes de cada termo de saída no valor final (`metodo_defuzz`)"""
+        if self.metodo_defuzz == 'centroide_exato':
+            x = self._pontos_quebra(cortes)
+            return self._centroide(x, self._agregar(x, cortes))
+
+        x = self._universo_amostrado(cortes)
+        agregado = self._agregar(x, cortes)
+        if self.metodo_defuzz == 'centroid':
+            return self._centroide(x, agregado)
+        if self.metodo_defuzz == 'bisector':
+            return self._bissetriz(x, agregado)
+        return self._maximos(x, agregado, self.metodo_defuzz)
+
+    def _universo_amostrado(self, cortes):
+        """Universo de saída acrescido dos pontos de corte, ordenado
+
+        Reproduz o reamostramento do scikit-fuzzy: para cada termo entram os
+        pontos onde o triângulo cruza a altura do corte.
+        """
+        universo = self.universo_saida
+        n = len(next(iter(cortes.values())))
+
+        partes = [np.broadcast_to(universo, (n, len(universo)))]
+        for nome, (a, b, c) in self.termos_saida.items():
+            corte = cortes[nome]
+            # Corte zero: o scikit-fuzzy marca os pés do triângulo
+            partes.append(np.stack([a + corte * (b - a), c - corte * (c - b)], axis=1))
+        return np.sort(np.clip(np.concatenate(partes, axis=1), universo[0], universo[-1]), axis=1)
+
+    def _pontos_quebra(self, cortes):
+        """Todos os pontos onde a função agregada muda de inclinação
+
+        Além dos pontos fixos, cada triângulo cruza a altura do corte de cada
+        termo (o máximo troca de termo onde uma aresta encontra o patamar de
+        outro). Entre pontos consecutivos a agregada é linear, então o
+        centróide por trapézios é exato.
+        """
+        niveis = np.stack([cortes[nome] for nome in self.termos_saida], axis=1)[:, :, None]
+        subida = self._a + niveis * (self._b - self._a)
+        descida = self._c - niveis * (self._c - self._b)
+
+        n = len(niveis)
+        universo = self.universo_saida
+        partes = [np.broadcast_to(self._pontos_fixos, (n, len(self._pontos_fixos))),
+                  subida.reshape(n, -1), descida.reshape(n, -1)]
+        return np.sort(np.clip(np.concatenate(partes, axis=1), universo[0], universo[-1]), axis=1)
+
+    def _agregar(self, x, cortes):
+        """Função de pertinência agregada (mínimo com o corte, máximo entre termos)"""
+        agregado = np.zeros_like(x)
+        for nome, pontos in self.termos_saida.items():
+            np.maximum(agregado, np.minimum(cortes[nome][:, None], trimf(x, pontos)), out=agregado)
+        return agregado
+
+    @staticmethod
+    def _centroide(x, agregado):
+        """Centróide exato de cada trapézio entre pontos consecutivos"""
+        dx = np.diff(x, axis=1)
+        y1, y2 = agregado[:, :-1], agregado[:, 1:]
+        soma = y1 + y2
+        area = 0.5 * dx * soma
+        with np.errstate(divide='ignore', invalid='ignore'):
+            momento = np.where(soma > 0, x[:, :-1] + dx * (y1 + 2 * y2) / (3 * soma), 0.0)
+            resultado = (area * momento).sum(axis=1) / area.sum(axis=1)
+
+        # Nenhuma regra ativada: o scikit-fuzzy lança erro nesses casos
+        resultado[agregado.sum(axis=1) == 0] = np.nan
+        return resultado
+
+    @staticmethod
+    def _bissetriz(x, agregado):
+        """Ponto que divide a área em duas metades iguais (agregada linear por partes)"""
+        dx = np.diff(x, axis=1)
+        y1, y2 = agregado[:, :-1], agregado[:, 1:]
+        acumulada = np.cumsum(0.5 * dx * (y1 + y2), axis=1)
+        metade = acumulada[:, -1:] / 2
+
+        # Trecho onde a área acumulada passa da metade e área que falta dentro dele
+        i = np.argmax(acumulada >= metade, axis=1)[:, None]
+        falta = (metade - np.take_along_axis(acumulada, i, axis=1)
+                 + np.take_along_axis(0.5 * dx * (y1 + y2), i, axis=1))[:, 0]
+        x1, y1, y2, dx = (np.take_along_axis(v, i, axis=1)[:, 0] for v in (x[:, :-1], y1, y2, dx))
+
+        # Raiz de y1*u + m*u²/2 = falta na forma racionalizada: estável mesmo com m ~ 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            m = np.where(dx > 0, (y2 - y1) / dx, 0.0)
+            denominador = y1 + np.sqrt(np.maximum(y1 * y1 + 2 * m * falta, 0))
+            resultado = x1 + np.where(denominador > 0, 2 * falta / denominador, 0.0)
+
+        resultado[agregado.sum(axis=1) == 0] = np.nan
+        return resultado
+
+    @staticmethod
+    def _maximos(x, agregado, metodo):
+        """Média (mom), menor (som) ou maior (lom) ponto onde a agregada é máxima"""
+        # Pontos repetidos (corte caindo sobre o universo) contam uma vez, como no union1d
+        distintos = np.ones_like(x, dtype=bool)
+        distintos[:, 1:] = x[:, 1:] != x[:, :-1]
+        # Tolerância para os pontos de corte, onde o triângulo volta ao corte com erro de arredondamento
+        maximos = distintos & (agregado >= agregado.max(axis=1, keepdims=True) - 1e-9)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if metodo == 'mom':
+                resultado = (x * maximos).sum(axis=1) / maximos.sum(axis=1)
+            elif metodo == 'som':
+                resultado = np.where(maximos, x, np.inf).min(axis=1)
+            else:
+                resultado = np.where(maximos, x, -np.inf).max(axis=1)
+
+        resultado[agregado.sum(axis=1) == 0] = np.nan
+        return resultado
+
+    def calcular_um(self, valores, disparos=None):
+        """Caminho escalar para um único cliente; retorna NaN se nenhuma regra disparar
+
+        Só as regras com todos os termos ativos (pertinência > 0) são avaliadas.
+        Se `disparos` for uma lista, recebe (índice da regra, força) de cada uma.
+        """
+        # Termos com pertinência não nula: um ou dois por variável
+        pertinencias = {}
+        for variavel, (minimo, maximo, termos) in self.entradas.items():
+            x = min(max(float(valores[variavel]), minimo), maximo)
+            for nome, pontos in termos.items():
+                grau = trimf_escalar(x, pontos)
+                if grau > 0:
+                    pertinencias[(variavel, nome)] = grau
+
+        candidatas = {i for termo in pertinencias for i in self.indice_regras.get(termo, ())}
+        cortes = dict.fromkeys(self.termos_saida, 0.0)
+        for i in sorted(candidatas):
+            termos, consequentes = self.regras[i]
+            if not all(termo in pertinencias for termo in termos):
+                continue
+            forca = min(map(pertinencias.__getitem__, termos))
+            if disparos is not None:
+                disparos.append((i, forca))
+            for nome, peso in consequentes:
+                if forca * peso > cortes[nome]:
+                    cortes[nome] = forca * peso
+
+        ativos = {nome: corte for nome, corte in cortes.items() if corte > 0}
+        if not ativos:
+            return float('nan')
+
+        # Mesmos pontos do caminho vetorizado; termos sem corte não somam área
+        universo = self.universo_saida
+        if self.metodo_defuzz == 'centroide_exato':
+            niveis = np.array(list(ativos.values()))[:, None]
+            extras = [self._pontos_fixos, (self._a + niveis * (self._b - self._a)).ravel(),
+                      (self._c - niveis * (self._c - self._b)).ravel()]
+        else:
+            pontos = []
+            for nome, (a, b, c) in self.termos_saida.items():
+                pontos += [a + cortes[nome] * (b - a), c - cortes[nome] * (c - b)]
+            extras = [universo, pontos]
+        x = np.sort(np.clip(np.concatenate(extras), universo[0], universo[-1]))
+
+        agregado = np.zeros_like(x)
+        for nome, corte in ativos.items():
+            np.maximum(agregado, np.minimum(corte, trimf(x, self.termos_saida[nome])), out=agregado)
+
+        x, agregado = x[None, :], agregado[None, :]
+        if self.metodo_defuzz in ('centroid', 'centroide_exato'):
+            return float(self._centroide(x, agregado)[0])
+        if self.metodo_defuzz == 'bisector':
+            return float(self._bissetriz(x, agregado)[0])
+        return float(self._maximos(x, agregado, self.metodo_defuzz)[0])
+
+    def calcular(self, valores):
+        """Executa a inferência completa; retorna NaN onde nenhuma regra disparou"""
+        pertinencias = self.fuzzificar(valores)
+        n = len(next(iter(pertinencias.values())))
+        cortes = self.disparar_regras(pertinencias, n)
+        return self.defuzzificar(cortes)
@@ -0,0 +1,49 @@
+"""
+Pool de simuladores scikit-fuzzy
+O scikit-fuzzy guarda a entrada corrente dentro dos próprios Antecedents, então
+dois ControlSystemSimulation sobre o mesmo ControlSystem se atropelam quando
+rodam em threads diferentes. Cada simulador do pool tem sua própria cópia do
+sistema de controle e é usado por uma thread de cada vez.
+"""
+
+import copy
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from skfuzzy import control as ctrl
+
+
+class PoolSimuladores:
+    """Simuladores independentes emprestados por thread, criados sob demanda"""
+
+    def __init__(self, sistema_controle, tamanho=None):
+        # Cópia limpa usada como molde; nunca é simulada diretamente
+        self._molde = copy.deepcopy(sistema_controle)
+        self.tamanho = tamanho or int(os.environ.get('FUZZY_POOL_SIMULADORES',
+                                                     2 * (os.cpu_count() or 1)))
+        self._livres = queue.LifoQueue()
+        self._criados = 0
+        self._trava_criacao = threading.Lock()
+
+    def _novo_simulador(self):
+        return ctrl.ControlSystemSimulation(copy.deepcopy(self._molde))
+
+    @contextmanager
+    def simulador(self):
+        """Empresta um simulador exclusivo e o devolve ao pool no final"""
+        try:
+            simulador = self._livres.get_nowait()
+        except queue.Empty:
+            with self._trava_criacao:
+                pode_criar = self._criados < self.tamanho
+                if pode_criar:
+                    self._criados += 1
+            # Pool cheio: espera algum simulador ser devolvido
+            simulador = self._novo_simulador() if pode_criar else self._livres.get()
+
+        try:
+            yield simulador
+        finally:
+            self._livres.put(simulador)
@@ -0,0 +1,244 @@
+"""
+Renderizador de gráficos em processos dedicados
+O matplotlib (estado global, figuras caras de criar, GIL preso durante o
+desenho) fica fora dos processos que atendem requisições. Cada processo de
+renderização vive enquanto o servidor vive, lê o modelo do arquivo e mantém
+as suas figuras: o fundo de cada gráfico dinâmico é desenhado uma vez e a
+figura dos estáticos é limpa e reaproveitada. Os pedidos entram numa fila
+compartilhada (o processo livre pega o próximo) e as respostas voltam por
+outra fila para uma thread coletora, que entrega cada uma ao seu Future.
+
+    renderizador = RenderizadorGraficos(processos=4)
+    png = renderizador.renderizar('dinamico', caminho_modelo, assinatura, 'renda', 5000)
+"""
+
+import atexit
+import itertools
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+
+import metricas
+from generate_fuzzy_plots import (DYNAMIC_PLOTS, render_dynamic_plot_from_model,
+                                  render_static_plot_from_model, setup_matplotlib)
+
+# Tipos de tarefa -> função executada no processo de renderização
+TAREFAS = {
+    'dinamico': render_dynamic_plot_from_model,
+    'estatico': render_static_plot_from_model,
+}
+
+# Espera máxima por um gráfico em `renderizar` (segundos)
+TEMPO_LIMITE = 60
+
+GRAFICOS_REJEITADOS = metricas.contador('risco_graficos_rejeitados_total',
+                                        'Gráficos recusados com 503 por fila cheia')
+PROCESSOS_REINICIADOS = metricas.contador('risco_graficos_processos_reiniciados_total',
+                                          'Processos de renderização que morreram e foram recriados')
+
+
+class FilaCheia(Exception):
+    """A fila de renderização atingiu o limite"""
+
+
+def _trabalhador(tarefas, respostas, aquecer):
+    """Laço de um processo de renderização: pega tarefas da fila até receber None
+
+    Com `aquecer=(caminho do modelo, assinatura)`, as figuras dos gráficos
+    dinâmicos são montadas antes da primeira tarefa.
+    """
+    # Ctrl+C no terminal chega ao grupo todo; quem encerra os processos é o servidor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_matplotlib()
+    if aquecer is not None:
+        for chave in DYNAMIC_PLOTS:
+            try:
+                render_dynamic_plot_from_model(*aquecer, chave, 0)
+            except Exception:
+                break
+    while True:
+        tarefa = tarefas.get()
+        if tarefa is None:
+            return
+        ident, tipo, args = tarefa
+        try:
+            respostas.put((ident, True, TAREFAS[tipo](*args)))
+        except Exception as e:
+            respostas.put((ident, False, f'{type(e).__name__}: {e}'))
+
+
+class RenderizadorGraficos:
+    """Pool de processos de renderização alimentado por uma fila de tarefas
+
+    `processos=0` desliga o pool (quem usa renderiza no próprio processo).
+    Com `limite` tarefas na fila ou em andamento, novas tarefas levantam
+    FilaCheia. Os processos são criados com `spawn` (nada do servidor é
+    herdado, nem o estado do matplotlib) na primeira tarefa ou em `iniciar`.
+    Se um processo morre, o pool inteiro é recriado (a fila compartilhada
+    pode ter ficado travada por ele) e as tarefas pendentes falham.
+    """
+
+    def __init__(self, processos=0, limite=None):
+        self.processos = max(int(processos), 0)
+        self.limite = limite
+        self._contexto = multiprocessing.get_context('spawn')
+        self._trava = threading.Lock()
+        self._ids = itertools.count()
+        self._pendentes = {}
+        self._processos = []
+        self._tarefas = self._respostas = self._coletor = None
+        self._aquecer = None
+        metricas.medidor('risco_graficos_fila', 'Gráficos na fila ou sendo renderizados',
+                         lambda: len(self._pendentes))
+        metricas.medidor('risco_graficos_processos', 'Processos de renderização ativos',
+                         lambda: sum(processo.is_alive() for processo in self._processos))
+
+    def configurar(self, processos=None, limite=None):
+        """Muda o número de processos e o limite da fila antes de o pool ser criado"""
+        with self._trava:
+            if self._tarefas is not None:
+                raise RuntimeError("Renderizador já iniciado: configure antes da primeira tarefa")
+            if processos is not None:
+                self.processos = max(int(processos), 0)
+            if limite is not None:
+                self.limite = limite
+
+    @property
+    def pendentes(self):
+        return len(self._pendentes)
+
+    def iniciar(self, caminho_modelo=None, assinatura=None):
+        """Cria os processos (se ainda não existem), já com as figuras do modelo montadas"""
+        with self._trava:
+            self._iniciar(None if caminho_modelo is None else (caminho_modelo, assinatura))
+
+    def _iniciar(self, aquecer):
+        if self._tarefas is not None or not self.processos:
+            return
+        if self.limite is None:
+            # Comporta ao menos os gráficos de duas avaliações pedidos de uma vez pela página
+            self.limite = max(4 * self.processos, 2 * len(DYNAMIC_PLOTS))
+        self._aquecer = aquecer
+        self._tarefas = self._contexto.Queue()
+        self._respostas = self._contexto.Queue()
+        self._processos = [self._contexto.Process(target=_trabalhador, name='renderizador-graficos',
+                                                  args=(self._tarefas, self._respostas, aquecer),
+                                                  daemon=True)
+                           for _ in range(self.processos)]
+        for processo in self._processos:
+            processo.start()
+        self._coletor = threading.Thread(target=self._coletar, args=(self._respostas, self._processos),
+                                         name='coletor-graficos', daemon=True)
+        self._coletor.start()
+        atexit.register(self.encerrar)
+
+    def enviar(self, tipo, *args):
+        """Coloca uma tarefa na fila; devolve um Future com os bytes do gráfico
+
+        `args` começa sempre por (caminho do modelo, assinatura). FilaCheia se
+        o limite foi atingido. O Future também serve ao asyncio
+        (`asyncio.wrap_future`).
+        """
+        return self._enviar(tipo, args)[1]
+
+    def _enviar(self, tipo, args):
+        if tipo not in TAREFAS:
+            raise ValueError(f"Tipo de gráfico desconhecido: {tipo}")
+        futuro = Future()
+        with self._trava:
+            if not self.processos:
+                raise RuntimeError("Renderizador sem processos (FUZZY_PROCESSOS_GRAFICOS=0)")
+            # Primeira tarefa: os processos nascem com as figuras do modelo dela
+            self._iniciar(args[:2])
+            if len(self._pendentes) >= self.limite:
+                GRAFICOS_REJEITADOS.incrementar()
+                raise FilaCheia()
+            ident = next(self._ids)
+            self._pendentes[ident] = futuro
+            self._tarefas.put((ident, tipo, args))
+        return ident, futuro
+
+    def renderizar(self, tipo, *args):
+        """Bytes do gráfico, esperando o processo de renderização (para quem roda em threads)"""
+        ident, futuro = self._enviar(tipo, args)
+        try:
+            return futuro.result(TEMPO_LIMITE)
+        except TimeoutError:
+            # Libera a vaga; se o gráfico ainda chegar, a resposta é descartada
+            with self._trava:
+                self._pendentes.pop(ident, None)
+            raise
+
+    def _coletar(self, respostas, processos):
+        """Thread coletora: entrega as respostas e vigia os processos da sua geração"""
+        verificado = time.monotonic()
+        while True:
+            if time.monotonic() - verificado >= 1:
+                verificado = time.monotonic()
+                if not all(processo.is_alive() for processo in processos):
+                    self._reiniciar(respostas)
+                    return
+            try:
+                resposta = respostas.get(timeout=1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError, ValueError):
+                return
+            if resposta is None:
+                return
+            ident, ok, valor = resposta
+            with self._trava:
+                futuro = self._pendentes.pop(ident, None)
+            if futuro is None:
+                continue
+            if ok:
+                futuro.set_result(valor)
+            else:
+                futuro.set_exception(RuntimeError(f"Falha ao renderizar o gráfico: {valor}"))
+
+    def _desmontar(self):
+        """Separa os processos, filas e tarefas pendentes atuais (com a trava)"""
+        anterior = (self._tarefas, self._respostas, self._processos, list(self._pendentes.values()))
+        self._tarefas = self._respostas = self._coletor = None
+        self._processos = []
+        self._pendentes.clear()
+        return anterior
+
+    def _reiniciar(self, respostas):
+        """Um processo morreu: recria o pool e falha as tarefas da geração anterior"""
+        with self._trava:
+            if self._respostas is not respostas:
+                return
+            PROCESSOS_REINICIADOS.incrementar()
+            anterior = self._desmontar()
+            self._iniciar(self._aquecer)
+        self._descartar(*anterior, "O processo de renderização morreu")
+
+    def encerrar(self):
+        """Encerra os processos e a thread coletora; tarefas pendentes falham"""
+        with self._trava:
+            if self._tarefas is None:
+                return
+            coletor = self._coletor
+            tarefas, respostas, processos, pendentes = self._desmontar()
+        for _ in processos:
+            tarefas.put(None)
+        for processo in processos:
+            processo.join(5)
+        respostas.put(None)
+        coletor.join(5)
+        self._descartar(tarefas, respostas, processos, pendentes, "Renderizador encerrado")
+
+    def _descartar(self, tarefas, respostas, processos, pendentes, motivo):
+        for processo in processos:
+            if processo.is_alive():
+                processo.terminate()
+        for fila in (tarefas, respostas):
+            fila.cancel_join_thread()
+            fila.close()
+        for futuro in pendentes:
+            if not futuro.done():
+                futuro.set_exception(RuntimeError(motivo))
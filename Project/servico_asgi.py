@@ -0,0 +1,285 @@
+"""
+Serviço ASGI do sistema de risco
+Ponto de entrada assíncrono ao lado da aplicação Flask. `/avaliar` e os
+gráficos dinâmicos são atendidos direto no laço de eventos: a inferência
+roda no próprio laço (motor nativo ou tabela) ou num executor pequeno
+(scikit-fuzzy, histórico em SQLite), e a renderização do matplotlib vai para
+os processos de `renderizador_graficos`. Com a fila de gráficos cheia a resposta é 503
+com `Retry-After`, e quem só pede o score nunca espera atrás de um gráfico.
+As demais rotas são repassadas à aplicação Flask numa thread.
+
+    uvicorn servico_asgi:app --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from generate_fuzzy_plots import DYNAMIC_PLOTS
+from historico import HistoricoMemoria
+from renderizador_graficos import FilaCheia
+from SistemaRiscoFuzzy_com_graficos import (BYTES_RESPOSTA, REQUISICOES, RESPOSTAS, ModeloSubstituido,
+                                            app as app_flask, sistema)
+
+# Threads para a inferência bloqueante e para as requisições repassadas ao Flask
+THREADS = int(os.environ.get('FUZZY_ASGI_THREADS', 8))
+
+# Corpo das requisições repassadas ao Flask: em memória até 1 MB, depois em disco
+CORPO_EM_MEMORIA = 1024 * 1024
+
+executor = ThreadPoolExecutor(THREADS, thread_name_prefix='asgi')
+
+renderizador = sistema.renderizador
+
+# A inferência roda no laço só quando é rápida e não faz E/S
+INFERENCIA_NO_LACO = (sistema.backend in ('nativo', 'tabela')
+                      and isinstance(sistema.historico_avaliacoes, HistoricoMemoria))
+
+
+async def ler_corpo(receive):
+    """Corpo inteiro de uma requisição pequena (JSON)"""
+    partes = []
+    while True:
+        mensagem = await receive()
+        partes.append(mensagem.get('body', b''))
+        if not mensagem.get('more_body'):
+            return b''.join(partes)
+
+
+async def responder(send, status, corpo, tipo, rota, metodo, inicio, cabecalhos=()):
+    """Envia uma resposta completa e registra as métricas HTTP da rota"""
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', tipo.encode('latin-1')),
+                            (b'content-length', str(len(corpo)).encode('latin-1'))]
+                           + [(nome.encode('latin-1'), valor.encode('latin-1')) for nome, valor in cabecalhos]})
+    await send({'type': 'http.response.body', 'body': corpo})
+    REQUISICOES.observar(time.perf_counter() - inicio, rota=rota, metodo=metodo)
+    RESPOSTAS.incrementar(rota=rota, status=str(status))
+    BYTES_RESPOSTA.incrementar(len(corpo), rota=rota)
+
+
+async def responder_json(send, status, dados, rota, metodo, inicio, cabecalhos=()):
+    # Mesmo JSON do jsonify do Flask (chaves ordenadas, sem espaços)
+    corpo = app_flask.json.dumps(dados, separators=(',', ':')).encode('utf-8')
+    await responder(send, status, corpo, 'application/json', rota, metodo, inicio, cabecalhos)
+
+
+async def avaliar(scope, receive, send, inicio):
+    """POST /avaliar: mesmos parâmetros e resposta do Flask (?plots=0, ?explicar=1)"""
+    consulta = parse_qs(scope['query_string'].decode('latin-1'))
+    try:
+        dados = app_flask.json.loads(await ler_corpo(receive))
+        incluir_graficos = dados.pop('incluir_graficos', consulta.get('plots', ['1'])[0] != '0')
+        explicar = dados.pop('explicar', consulta.get('explicar', ['0'])[0] == '1')
+        if INFERENCIA_NO_LACO:
+            resultado = sistema.avaliar_cliente(dados, incluir_graficos=incluir_graficos, explicar=explicar)
+        else:
+            resultado = await asyncio.get_running_loop().run_in_executor(
+                executor, lambda: sistema.avaliar_cliente(dados, incluir_graficos=incluir_graficos,
+                                                          explicar=explicar))
+    except Exception as e:
+        await responder_json(send, 400, {'erro': str(e)}, 'avaliar', 'POST', inicio)
+        return
+    await responder_json(send, 200, resultado, 'avaliar', 'POST', inicio)
+
+
+async def grafico_avaliacao(send, avaliacao_id, variavel, inicio):
+    """GET /avaliacao/<id>/plots/<variavel>: do cache ou renderizado no pool de processos"""
+    rota = 'grafico_avaliacao'
+    resultado = None
+    if variavel in DYNAMIC_PLOTS:
+        resultado = await asyncio.get_running_loop().run_in_executor(
+            executor, sistema.obter_avaliacao, avaliacao_id)
+    if resultado is None:
+        await responder(send, 404, b'Not Found', 'text/plain', rota, 'GET', inicio)
+        return
+
+    try:
+        estado = sistema.estado_avaliacao(resultado)
+    except ModeloSubstituido as e:
+        await responder_json(send, 410, {'erro': str(e), 'modelo': e.avaliado, 'modelo_atual': e.atual},
+                             rota, 'GET', inicio)
+        return
+    dados = resultado['dados_entrada']
+    chave = sistema.chave_grafico(estado, dados, variavel)
+    png = sistema.cache_graficos.obter(chave)
+    try:
+        if png is None and sistema.usar_renderizador(estado):
+            png = await asyncio.wrap_future(renderizador.enviar(
+                'dinamico', estado.modelo.origem, estado.modelo.assinatura, variavel, dados[variavel]))
+            sistema.cache_graficos.guardar(chave, png)
+        elif png is None:
+            # Modelo sem arquivo de origem: os processos não conseguem lê-lo, desenha numa thread
+            png = await asyncio.get_running_loop().run_in_executor(
+                executor, sistema.grafico_dinamico, dados, variavel, estado)
+    except FilaCheia:
+        await responder(send, 503, 'Fila de gráficos cheia, tente de novo'.encode('utf-8'),
+                        'text/plain; charset=utf-8', rota, 'GET', inicio, [('retry-after', '1')])
+        return
+    except RuntimeError as e:
+        # Processo de renderização morto (o pool é recriado), renderizador encerrado ou falha no desenho
+        print(f"⚠️ Erro ao renderizar o gráfico {variavel}: {e}")
+        await responder(send, 503, 'Gráfico indisponível no momento, tente de novo'.encode('utf-8'),
+                        'text/plain; charset=utf-8', rota, 'GET', inicio, [('retry-after', '1')])
+        return
+    await responder(send, 200, png, 'image/png', rota, 'GET', inicio,
+                    [('cache-control', 'private, max-age=3600')])
+
+
+# === PONTE PARA O FLASK ===
+
+def montar_environ(scope, corpo, tamanho):
+    """Environ WSGI equivalente ao escopo HTTP do ASGI"""
+    servidor = scope.get('server') or ('localhost', 80)
+    cliente = scope.get('client') or ('', 0)
+    caminho = scope.get('raw_path') or scope['path'].encode('utf-8')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': caminho.split(b'?', 1)[0].decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': cliente[0],
+        'REMOTE_PORT': str(cliente[1]),
+        'CONTENT_LENGTH': str(tamanho),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': corpo,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for nome, valor in scope['headers']:
+        nome = nome.decode('latin-1').upper().replace('-', '_')
+        valor = valor.decode('latin-1')
+        if nome == 'CONTENT_LENGTH':
+            # Vale o tamanho efetivamente recebido (também para uploads chunked)
+            continue
+        if nome == 'CONTENT_TYPE':
+            environ[nome] = valor
+            continue
+        chave = f'HTTP_{nome}'
+        environ[chave] = f'{environ[chave]},{valor}' if chave in environ else valor
+    return environ
+
+
+async def repassar_flask(scope, receive, send):
+    """Executa a aplicação Flask numa thread, repassando a resposta pedaço a pedaço
+
+    A requisição inteira (inclusive a geração do corpo em streaming) roda numa
+    só thread, porque o contexto da requisição do Flask não pode trocar de
+    thread. Os pedaços passam por uma fila limitada: se o cliente lê devagar,
+    a geração espera.
+    """
+    loop = asyncio.get_running_loop()
+    corpo = tempfile.SpooledTemporaryFile(CORPO_EM_MEMORIA)
+    tamanho = 0
+    while True:
+        mensagem = await receive()
+        parte = mensagem.get('body', b'')
+        if parte:
+            await loop.run_in_executor(executor, corpo.write, parte)
+            tamanho += len(parte)
+        if not mensagem.get('more_body'):
+            break
+    corpo.seek(0)
+
+    environ = montar_environ(scope, corpo, tamanho)
+    fila = asyncio.Queue(maxsize=8)
+    cancelado = threading.Event()
+    inicio_resposta = {}
+
+    def start_response(status, cabecalhos, exc_info=None):
+        inicio_resposta['status'] = int(status.split(' ', 1)[0])
+        inicio_resposta['cabecalhos'] = [(nome.lower().encode('latin-1'), valor.encode('latin-1'))
+                                         for nome, valor in cabecalhos]
+
+    def produzir():
+        resposta = None
+        try:
+            resposta = app_flask(environ, start_response)
+            for pedaco in resposta:
+                if cancelado.is_set():
+                    break
+                if pedaco:
+                    asyncio.run_coroutine_threadsafe(fila.put(pedaco), loop).result()
+        finally:
+            try:
+                if hasattr(resposta, 'close'):
+                    resposta.close()
+                corpo.close()
+            finally:
+                # Fim do corpo (também em caso de erro)
+                asyncio.run_coroutine_threadsafe(fila.put(None), loop).result()
+
+    producao = loop.run_in_executor(executor, produzir)
+    # Qualquer valor diferente de None: a thread ainda vai pôr pedaços (e o None final) na fila
+    pedaco = b''
+    try:
+        pedaco = await fila.get()
+        if not inicio_resposta:
+            # A aplicação falhou antes de responder
+            await producao
+        await send({'type': 'http.response.start', 'status': inicio_resposta['status'],
+                    'headers': inicio_resposta['cabecalhos']})
+        while pedaco is not None:
+            await send({'type': 'http.response.body', 'body': pedaco, 'more_body': True})
+            pedaco = await fila.get()
+        await send({'type': 'http.response.body', 'body': b''})
+        await producao
+    except BaseException:
+        # Cliente desconectado, tarefa cancelada ou erro (mesmo antes do primeiro pedaço): para a
+        # geração e esvazia a fila até o None da thread, senão ela trava no put com a fila cheia
+        cancelado.set()
+        while pedaco is not None:
+            pedaco = await fila.get()
+        raise
+
+
+# === APLICAÇÃO ASGI ===
+
+async def ciclo_de_vida(receive, send):
+    """Eventos de início e fim do servidor: cria e encerra os processos de renderização"""
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'lifespan.startup':
+            # Aqui os gráficos nunca são desenhados no laço de eventos: sem configuração, um processo por CPU
+            if 'FUZZY_PROCESSOS_GRAFICOS' not in os.environ:
+                renderizador.configurar(processos=os.cpu_count() or 1)
+            # Processos de renderização criados já com as figuras do modelo montadas
+            if sistema.usar_renderizador(sistema.estado):
+                renderizador.iniciar(sistema.estado.modelo.origem, sistema.estado.modelo.assinatura)
+            await send({'type': 'lifespan.startup.complete'})
+        elif mensagem['type'] == 'lifespan.shutdown':
+            renderizador.encerrar()
+            executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """Aplicação ASGI: `/avaliar` e os gráficos dinâmicos aqui, o resto no Flask"""
+    if scope['type'] == 'lifespan':
+        await ciclo_de_vida(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    inicio = time.perf_counter()
+    metodo, caminho = scope['method'], scope['path']
+    partes = caminho.strip('/').split('/')
+
+    if caminho == '/avaliar' and metodo == 'POST':
+        await avaliar(scope, receive, send, inicio)
+    elif len(partes) == 4 and partes[0] == 'avaliacao' and partes[2] == 'plots' and metodo == 'GET':
+        await grafico_avaliacao(send, partes[1], partes[3], inicio)
+    else:
+        await repassar_flask(scope, receive, send)
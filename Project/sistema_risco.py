@@ -0,0 +1,541 @@
+"""
+Núcleo do sistema de risco fuzzy
+Inferência (motor nativo, tabela ou scikit-fuzzy), classificação e
+recomendação, sem Flask nem gráficos. Importa só NumPy e os módulos do
+modelo; o scikit-fuzzy é importado quando o backend skfuzzy (ou a validação)
+precisa dele. A aplicação web, os scripts de lote e os exemplos usam esta
+mesma classe.
+"""
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+import metricas
+from cache_lru import CacheLRU
+from compilador_regras import compilar_regras, descrever_regra, verificar_equivalencia
+from modelo_fuzzy import ModeloFuzzy
+from motor_fuzzy import METODOS_DEFUZZ
+from tabela_risco import TabelaRisco
+
+# Backends de inferência: 'nativo' (motor_fuzzy), 'skfuzzy' (referência)
+# ou 'tabela' (grade pré-calculada em tabela_risco, interpolada)
+BACKENDS = ('nativo', 'skfuzzy', 'tabela')
+
+# Campos recebidos em `dados` -> variáveis fuzzy de entrada
+CAMPOS_ENTRADA = {
+    'renda': 'renda',
+    'historico': 'historico_credito',
+    'idade': 'idade',
+    'tempo_emprego': 'tempo_emprego',
+    'dividas': 'percentual_dividas',
+}
+
+# Scores em que a decisão de crédito muda (gerar_recomendacao)
+LIMITES_DECISAO = (30, 50, 70)
+
+# Erro máximo aceito na tabela de risco: metade da faixa de decisão mais estreita. Abaixo
+# disso a tabela só troca a decisão de clientes a menos de um erro de distância de um
+# limite, e nunca põe um cliente do centro de uma faixa em outra
+TOLERANCIA_TABELA = float(min(np.diff((0,) + LIMITES_DECISAO + (100,)))) / 2
+
+DIRETORIO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+
+# === MÉTRICAS ===
+# Etapas da avaliação: entradas, inferencia, fallback, classificacao (e, na web, graficos e historico)
+ETAPAS = metricas.histograma('risco_etapa_segundos', 'Duração de cada etapa da avaliação de um cliente',
+                             ('etapa', 'backend'))
+FALLBACKS = metricas.contador('risco_fallback_total', 'Avaliações resolvidas pelo fallback, por erro',
+                              ('backend', 'erro'))
+AVALIACOES = metricas.contador('risco_avaliacoes_total', 'Clientes avaliados, por backend',
+                               ('backend',))
+
+
+# Atributos do estado que dependem do scikit-fuzzy (montados juntos, no primeiro acesso)
+ATRIBUTOS_SKFUZZY = ('renda', 'historico', 'idade', 'tempo_emprego', 'dividas', 'risco',
+                     'entradas', 'regras', 'sistema_controle', 'simuladores')
+
+
+class EstadoModelo:
+    """Modelo carregado e tudo o que é montado a partir dele
+
+    Regras compiladas, motor nativo, a tabela (se houver) e, só quando alguém
+    os usa (backend skfuzzy, validação, gráficos), as variáveis, regras e
+    simuladores do scikit-fuzzy. O recarregamento monta um estado novo e o
+    troca de uma vez em `SistemaRiscoFuzzy.estado`; quem já pegou o anterior
+    termina a avaliação com ele.
+    """
+
+    def __init__(self, modelo, defuzz):
+        self.modelo = modelo
+        self.defuzz = defuzz
+        self.pertinencias = modelo.pertinencias
+
+        # === MOTOR NATIVO (fórmulas fechadas, sem o grafo do scikit-fuzzy) ===
+        # Regras duplicadas ou cobertas por regras mais gerais saem antes da inferência
+        self.regras_compiladas = compilar_regras(modelo.regras)
+        self.motor = self.criar_motor(self.regras_compiladas.regras)
+
+        # === TABELA PRÉ-CALCULADA (opcional, preenchida por preparar_tabela) ===
+        self.tabela = None
+        self.erro_tabela = None
+
+        # URLs dos gráficos estáticos deste modelo (montadas pela aplicação web)
+        self.plots = None
+
+        self._trava_skfuzzy = threading.Lock()
+
+    def __getattr__(self, nome):
+        # Só chamado para atributos ainda inexistentes: monta a parte do scikit-fuzzy
+        if nome not in ATRIBUTOS_SKFUZZY:
+            raise AttributeError(nome)
+        self.montar_skfuzzy()
+        return self.__dict__[nome]
+
+    def montar_skfuzzy(self):
+        """Variáveis, regras, sistema de controle e simuladores do scikit-fuzzy"""
+        with self._trava_skfuzzy:
+            if 'simuladores' in self.__dict__:
+                return
+            from skfuzzy import control as ctrl
+            from pool_simuladores import PoolSimuladores
+
+            # === VARIÁVEIS DE ENTRADA E SAÍDA ===
+            variaveis = self.modelo.criar_variaveis_controle()
+            self.renda = variaveis['renda']
+            self.historico = variaveis['historico_credito']
+            self.idade = variaveis['idade']
+            self.tempo_emprego = variaveis['tempo_emprego']
+            self.dividas = variaveis['percentual_dividas']
+            self.risco = variaveis['risco_credito']
+            # O scikit-fuzzy não tem centróide exato: a referência usa o centróide amostrado
+            self.risco.defuzzify_method = 'centroid' if self.defuzz == 'centroide_exato' else self.defuzz
+
+            self.entradas = [self.renda, self.historico, self.idade, self.tempo_emprego, self.dividas]
+
+            # === REGRAS FUZZY ===
+            self.regras = self.modelo.criar_regras_controle(variaveis)
+
+            # === SISTEMA DE CONTROLE ===
+            self.sistema_controle = ctrl.ControlSystem(self.regras)
+            # Um simulador por thread em uso (o ControlSystemSimulation não é thread-safe);
+            # atribuído por último, marca a montagem como concluída
+            self.simuladores = PoolSimuladores(self.sistema_controle)
+
+    def criar_motor(self, regras):
+        """Motor nativo com os universos e termos do modelo e a lista de regras dada"""
+        return self.modelo.criar_motor(self.defuzz, regras)
+
+    def variavel_modelo(self, campo):
+        """Universo e triângulos (VariavelModelo) de um campo de entrada ou, com 'risco', da saída
+
+        Lido direto do modelo: não monta o scikit-fuzzy.
+        """
+        return self.modelo.saida if campo == 'risco' else self.modelo.entradas[CAMPOS_ENTRADA[campo]]
+
+
+class SistemaRiscoFuzzy:
+    def __init__(self, backend=None, defuzz=None, modelo=None):
+        """Inicializa o sistema fuzzy (`modelo`: arquivo do modelo, padrão FUZZY_MODELO)"""
+        self.backend = backend or os.environ.get('FUZZY_BACKEND', 'nativo')
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Backend desconhecido: {self.backend} (use {', '.join(BACKENDS)})")
+        # Defuzzificação: métodos do scikit-fuzzy ou 'centroide_exato' (só no motor nativo/tabela)
+        self.defuzz = defuzz or os.environ.get('FUZZY_DEFUZZ', 'centroid')
+        if self.defuzz not in METODOS_DEFUZZ:
+            raise ValueError(f"Defuzzificação desconhecida: {self.defuzz} (use {', '.join(METODOS_DEFUZZ)})")
+        self._trava_recarga = threading.Lock()
+        # Avaliações já calculadas (FUZZY_CACHE_TAMANHO=0 desliga; TTL em segundos, 0 = sem expiração)
+        self.cache = CacheLRU('avaliacoes', int(os.environ.get('FUZZY_CACHE_TAMANHO', 4096)),
+                              float(os.environ.get('FUZZY_CACHE_TTL', 3600)))
+        self.setup_fuzzy_system(modelo)
+
+    def setup_fuzzy_system(self, caminho=None):
+        """Configura o sistema fuzzy a partir do arquivo do modelo"""
+        self.estado = self.construir_estado(ModeloFuzzy.carregar(caminho, CAMPOS_ENTRADA.values()))
+
+    def construir_estado(self, modelo):
+        """Monta um estado completo (motor, tabela e, no backend skfuzzy, o scikit-fuzzy)"""
+        print("🔧 Configurando Sistema Fuzzy...")
+        estado = EstadoModelo(modelo, self.defuzz)
+        if self.backend == 'skfuzzy':
+            estado.montar_skfuzzy()
+        if self.backend == 'tabela':
+            self.preparar_tabela(estado=estado)
+
+        print(f"📄 Modelo: {modelo.nome} v{modelo.versao} ({modelo.assinatura})")
+        print(f"📋 Regras: {len(modelo.regras)} definidas, {len(estado.motor.regras)} após a compilação")
+        print("✅ Sistema Fuzzy configurado com sucesso!")
+        return estado
+
+    def recarregar_modelo(self, caminho=None, forcar=False):
+        """Relê o arquivo do modelo e troca o estado sem interromper as avaliações
+
+        O estado novo é montado por inteiro antes da troca (uma atribuição);
+        se o arquivo for inválido, a exceção sobe e o modelo atual continua.
+        Sem `forcar`, um arquivo com a mesma assinatura não é remontado.
+        """
+        with self._trava_recarga:
+            anterior = self.estado
+            modelo = ModeloFuzzy.carregar(caminho or anterior.modelo.origem, CAMPOS_ENTRADA.values())
+            recarregado = forcar or modelo.assinatura != anterior.modelo.assinatura
+            if recarregado:
+                self.estado = self.construir_estado(modelo)
+                # As chaves já incluem a assinatura; limpar só libera a memória do modelo anterior
+                self.cache.limpar()
+        return {'anterior': anterior.modelo.assinatura, 'atual': self.estado.modelo.assinatura,
+                'recarregado': recarregado}
+
+    def verificar_regras_compiladas(self, subdivisoes=0):
+        """Prova na grade de vértices que as regras compiladas dão a mesma saída das originais"""
+        estado = self.estado
+        original = estado.criar_motor(estado.regras_compiladas.originais)
+        return verificar_equivalencia(original, estado.motor, subdivisoes)
+
+    def limitar_entradas(self, dados, estado=None):
+        """Valores de entrada por variável fuzzy, presos aos limites de cada universo
+
+        Renda acima de 15.000 (ou qualquer valor fora do universo) é avaliada
+        como o extremo do universo, igual em todos os backends.
+        """
+        motor = (estado or self.estado).motor
+        valores = {}
+        for campo, variavel in CAMPOS_ENTRADA.items():
+            minimo, maximo, _ = motor.entradas[variavel]
+            valores[variavel] = min(max(float(dados[campo]), minimo), maximo)
+        return valores
+
+    def calcular_score(self, dados, backend=None, disparos=None, estado=None):
+        """Executa a inferência fuzzy no backend configurado
+
+        Se `disparos` for uma lista, recebe (índice da regra compilada, força)
+        de cada regra disparada; no motor nativo isso sai da própria inferência.
+        `estado` fixa o modelo usado (padrão: o atual).
+        """
+        estado = estado or self.estado
+        backend = backend or self.backend
+        inicio = time.perf_counter()
+        valores = self.limitar_entradas(dados, estado)
+        duracao_entradas = time.perf_counter() - inicio
+        if disparos is not None and backend != 'nativo':
+            estado.motor.calcular_um(valores, disparos)
+
+        if backend == 'skfuzzy':
+            with estado.simuladores.simulador() as simulador:
+                # Configurar inputs (a espera pelo simulador não entra na etapa)
+                inicio = time.perf_counter()
+                for variavel, valor in valores.items():
+                    simulador.input[variavel] = valor
+                ETAPAS.observar(duracao_entradas + time.perf_counter() - inicio,
+                                etapa='entradas', backend=backend)
+
+                # Executar inferência fuzzy
+                with ETAPAS.medir(etapa='inferencia', backend=backend):
+                    simulador.compute()
+
+                # Obter resultado
+                return simulador.output['risco_credito']
+
+        if backend == 'tabela' and estado.tabela is None:
+            # Sem tabela válida (ver preparar_tabela) a inferência é a do motor nativo
+            backend = 'nativo'
+        ETAPAS.observar(duracao_entradas, etapa='entradas', backend=backend)
+        if backend == 'tabela':
+            with ETAPAS.medir(etapa='inferencia', backend=backend):
+                return estado.tabela.interpolar_um(valores)
+
+        with ETAPAS.medir(etapa='inferencia', backend=backend):
+            risco_score = estado.motor.calcular_um(valores, disparos)
+        if np.isnan(risco_score):
+            raise ValueError("Nenhuma regra ativada para estas entradas")
+        return risco_score
+
+    def preparar_tabela(self, subdivisoes=None, caminho=None, estado=None, construir=False, tolerancia=None):
+        """Carrega a tabela de risco e confere o erro medido contra a tolerância
+
+        Construir a grade e medir o erro (no centro de todas as células)
+        leva cerca de dois minutos, então só acontece com `construir=True`
+        (o `python tabela_risco.py` do build); o servidor usa o erro gravado
+        com a tabela. Tabela ausente, de outro modelo ou com erro máximo
+        acima de `tolerancia` (FUZZY_TABELA_TOLERANCIA, em pontos de score,
+        padrão TOLERANCIA_TABELA) não é usada: o estado fica sem tabela e o
+        backend tabela responde pelo motor nativo. Retorna o relatório de
+        erro (com 'ok'), ou None sem tabela.
+        """
+        estado = estado or self.estado
+        if subdivisoes is None:
+            subdivisoes = int(os.environ.get('FUZZY_TABELA_SUBDIVISOES', 1))
+        if tolerancia is None:
+            tolerancia = float(os.environ.get('FUZZY_TABELA_TOLERANCIA', TOLERANCIA_TABELA))
+        caminho = caminho or os.environ.get('FUZZY_TABELA',
+                                            os.path.join(DIRETORIO_CACHE, 'tabela_risco.npy'))
+        estado.tabela = estado.erro_tabela = None
+
+        print(f"📦 Preparando tabela de risco ({subdivisoes} subdivisões por intervalo)...")
+        if construir:
+            tabela = TabelaRisco.obter(estado.motor, caminho, subdivisoes, preencher=self._fallback_por_variavel,
+                                       limites=LIMITES_DECISAO)
+        else:
+            tabela = TabelaRisco.carregar_valida(estado.motor, caminho, subdivisoes)
+            if tabela is None:
+                print("⚠️ Tabela de risco ausente ou de outro modelo; usando o motor nativo "
+                      "(gere com: python tabela_risco.py)")
+                return None
+
+        erro = dict(tabela.erro)
+        erro['tolerancia'] = tolerancia
+        erro['ok'] = erro['erro_maximo'] <= tolerancia
+        estado.erro_tabela = erro
+        print(f"{'✅' if erro['ok'] else '❌'} Tabela com {erro['pontos_grade']} pontos - "
+              f"erro máximo {erro['erro_maximo']:.3f} (tolerância {tolerancia:.3f}), "
+              f"p99 {erro['erro_p99']:.3f}, médio {erro['erro_medio']:.3f}, "
+              f"decisões trocadas {erro.get('decisoes_trocadas', 0):.2%}")
+        if erro['ok']:
+            estado.tabela = tabela
+        else:
+            print("⚠️ Tabela de risco fora da tolerância; usando o motor nativo")
+        return erro
+
+    def _fallback_por_variavel(self, valores):
+        """Fallback para entradas indexadas pelo nome das variáveis fuzzy"""
+        return self.calcular_risco_fallback(
+            {campo: valores[variavel] for campo, variavel in CAMPOS_ENTRADA.items()})
+
+    def validar_motor(self, amostras=1000, tolerancia=1e-6, semente=0):
+        """Compara o motor nativo com o scikit-fuzzy em entradas aleatórias
+
+        Com `centroide_exato` o erro medido é o de discretização do scikit-fuzzy.
+        """
+        estado = self.estado
+        rng = np.random.default_rng(semente)
+        dados = {
+            campo: rng.uniform(*estado.motor.entradas[variavel][:2], amostras)
+            for campo, variavel in CAMPOS_ENTRADA.items()
+        }
+        nativo = self.avaliar_lote(dados, estado=estado, backend='nativo')
+        referencia = self.avaliar_lote(dados, estado=estado, backend='skfuzzy')
+
+        erro_maximo = float(np.abs(nativo - referencia).max())
+        return {'amostras': amostras, 'erro_maximo': erro_maximo, 'ok': erro_maximo <= tolerancia}
+
+    def avaliar_cliente(self, dados, explicar=False):
+        """Avalia um cliente usando lógica fuzzy
+
+        Retorna score, classificação e recomendação, com um id e a assinatura
+        do modelo usado. Com `explicar`, o resultado traz a força de cada
+        regra disparada. Um cliente já avaliado com o mesmo modelo vem do
+        cache (`self.cache`), com resultado idêntico; só id e horário mudam.
+        """
+        # Um único estado do início ao fim, mesmo se o modelo for recarregado no meio
+        estado = self.estado
+        chave = self.chave_cache(dados, explicar, estado) if self.cache.tamanho else None
+        avaliacao = self.cache.obter(chave) if chave is not None else None
+
+        if avaliacao is None:
+            avaliacao = self._avaliar(dados, explicar, estado)
+            if chave is not None and not avaliacao['fallback']:
+                self.cache.guardar(chave, avaliacao)
+        AVALIACOES.incrementar(backend=self.backend)
+
+        # Resultado completo (dicts copiados: quem recebe pode alterá-los sem afetar o cache)
+        resultado = {
+            'id': uuid.uuid4().hex,
+            'nome': dados['nome'],
+            'risco_score': avaliacao['risco_score'],
+            'classificacao': dict(avaliacao['classificacao']),
+            'recomendacao': dict(avaliacao['recomendacao']),
+            'timestamp': datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+            'dados_entrada': dados,
+            'modelo': estado.modelo.assinatura,
+        }
+        if explicar:
+            resultado['explicacao'] = [dict(regra) for regra in avaliacao['explicacao']]
+
+        return resultado
+
+    def chave_cache(self, dados, explicar, estado):
+        """Chave do cache de avaliações, ou None se as entradas não forem numéricas
+
+        As entradas entram já convertidas e presas aos universos (o que a
+        inferência de fato usa), então "5000", 5000.0 e 5000 têm o mesmo score.
+        A renda entra também como veio, com o tipo: ela define o limite da
+        recomendação (5000 * 8 e 5000.0 * 8 saem diferentes no JSON).
+        """
+        try:
+            valores = tuple(self.limitar_entradas(dados, estado).values())
+            renda = dados['renda']
+            return (estado.modelo.assinatura, explicar, valores, type(renda), renda)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _avaliar(self, dados, explicar, estado):
+        """Score, classificação, recomendação e explicação de um cliente (sem o cache)"""
+        disparos = [] if explicar else None
+        fallback = False
+        try:
+            risco_score = self.calcular_score(dados, disparos=disparos, estado=estado)
+
+        except Exception as fuzzy_error:
+            # Se der erro no fuzzy, usar fallback baseado em lógica simples
+            print(f"⚠️ Erro fuzzy: {fuzzy_error}")
+            print("🔄 Usando sistema de fallback...")
+            FALLBACKS.incrementar(backend=self.backend, erro=type(fuzzy_error).__name__)
+            fallback = True
+
+            with ETAPAS.medir(etapa='fallback', backend=self.backend):
+                risco_score = self.calcular_risco_fallback(dados)
+
+        with ETAPAS.medir(etapa='classificacao', backend=self.backend):
+            # Classificar risco
+            classificacao = self.classificar_risco(risco_score)
+
+            # Gerar recomendação
+            recomendacao = self.gerar_recomendacao(risco_score, dados)
+
+        return {
+            'risco_score': round(risco_score, 1),
+            'classificacao': classificacao,
+            'recomendacao': recomendacao,
+            'explicacao': self.explicar_disparos(disparos, estado) if explicar else None,
+            'fallback': fallback,
+        }
+
+    def explicar_disparos(self, disparos, estado=None):
+        """Regras disparadas em texto, da maior para a menor força"""
+        regras = (estado or self.estado).motor.regras
+        return [{'regra': descrever_regra(*regras[i]), 'forca': round(forca, 4)}
+                for i, forca in sorted(disparos, key=lambda disparo: -disparo[1])]
+
+    def avaliar_lote(self, dados, tamanho_bloco=4096, estado=None, backend=None):
+        """Avalia N clientes de uma vez (arrays NumPy ou DataFrame)
+
+        `dados` usa as mesmas chaves de `avaliar_cliente` (renda, historico,
+        idade, tempo_emprego, dividas), cada uma com N valores. Retorna um
+        array com os N scores de risco sem arredondamento, iguais aos de
+        `calcular_score` no mesmo backend (padrão: o configurado). Motor
+        nativo e tabela avaliam cada bloco vetorizado; o scikit-fuzzy não
+        tem inferência vetorizada e avalia linha a linha.
+        """
+        estado = estado or self.estado
+        backend = backend or self.backend
+        if backend == 'tabela' and estado.tabela is None:
+            # Sem tabela válida (ver preparar_tabela) a inferência é a do motor nativo
+            backend = 'nativo'
+        colunas = {campo: np.asarray(dados[campo], dtype=float) for campo in CAMPOS_ENTRADA}
+        scores = np.empty(len(colunas['renda']))
+
+        if backend == 'skfuzzy':
+            for i in range(len(scores)):
+                try:
+                    scores[i] = self.calcular_score({campo: valores[i] for campo, valores in colunas.items()},
+                                                    backend='skfuzzy', estado=estado)
+                except Exception:
+                    scores[i] = np.nan
+        else:
+            calcular = estado.tabela.interpolar if backend == 'tabela' else estado.motor.calcular
+            # Processar em blocos para limitar a memória das matrizes intermediárias
+            for inicio in range(0, len(scores), tamanho_bloco):
+                scores[inicio:inicio + tamanho_bloco] = calcular({
+                    variavel: colunas[campo][inicio:inicio + tamanho_bloco]
+                    for campo, variavel in CAMPOS_ENTRADA.items()
+                })
+
+        # Linhas sem nenhuma regra ativada seguem o mesmo fallback do avaliar_cliente
+        falhas = np.isnan(scores)
+        if falhas.any():
+            scores[falhas] = self.calcular_risco_fallback(
+                {chave: valores[falhas] for chave, valores in colunas.items()})
+
+        return scores
+
+    def calcular_risco_fallback(self, dados):
+        """Sistema de fallback quando o fuzzy falha (aceita escalares ou arrays)"""
+        # Normalizar valores
+        renda_norm = np.minimum(dados['renda'] / 10000, 1.0)
+        historico_norm = dados['historico'] / 10
+        idade_factor = np.where((dados['idade'] >= 25) & (dados['idade'] <= 55), 1.0, 0.7)
+        emprego_factor = np.minimum(dados['tempo_emprego'] / 15, 1.0)
+        divida_penalty = dados['dividas'] / 100
+
+        # Cálculo híbrido fuzzy-like
+        score_positivo = (renda_norm * 0.35 + historico_norm * 0.30 +
+                         idade_factor * 0.15 + emprego_factor * 0.20)
+
+        risco_score = np.clip((1 - score_positivo + divida_penalty * 0.8) * 100, 0, 100)
+
+        return risco_score[()] if np.ndim(risco_score) == 0 else risco_score
+
+    def classificar_risco(self, score):
+        """Classifica o score de risco"""
+        if score <= 20:
+            return {"nivel": "MUITO BAIXO", "emoji": "🟢", "cor": "#28a745"}
+        elif score <= 40:
+            return {"nivel": "BAIXO", "emoji": "🔵", "cor": "#17a2b8"}
+        elif score <= 60:
+            return {"nivel": "MÉDIO", "emoji": "🟡", "cor": "#ffc107"}
+        elif score <= 80:
+            return {"nivel": "ALTO", "emoji": "🟠", "cor": "#fd7e14"}
+        else:
+            return {"nivel": "MUITO ALTO", "emoji": "🔴", "cor": "#dc3545"}
+
+    def gerar_recomendacao(self, risco_score, dados):
+        """Gera recomendação baseada no risco"""
+        aprovado, restricoes, manual = LIMITES_DECISAO
+        if risco_score <= aprovado:
+            return {
+                "decisao": "✅ APROVADO",
+                "limite": min(dados['renda'] * 8, 50000),
+                "taxa": "Taxa preferencial (1.2% a.m.)",
+                "observacoes": "Cliente com excelente perfil. Baixo risco de inadimplência."
+            }
+        elif risco_score <= restricoes:
+            return {
+                "decisao": "⚠️ APROVADO COM RESTRIÇÕES",
+                "limite": min(dados['renda'] * 4, 25000),
+                "taxa": "Taxa intermediária (2.5% a.m.)",
+                "observacoes": "Bom perfil, mas requer acompanhamento."
+            }
+        elif risco_score <= manual:
+            return {
+                "decisao": "🔍 ANÁLISE MANUAL",
+                "limite": min(dados['renda'] * 2, 10000),
+                "taxa": "Taxa elevada (4.0% a.m.)",
+                "observacoes": "Requer análise detalhada e garantias adicionais."
+            }
+        else:
+            return {
+                "decisao": "❌ REPROVADO",
+                "limite": 0,
+                "taxa": "N/A",
+                "observacoes": "Alto risco de inadimplência. Crédito não recomendado."
+            }
+
+
+def observar_modelo(sistema, intervalo):
+    """Thread que recarrega o modelo quando o arquivo muda (verificado a cada `intervalo` s)"""
+
+    def assinatura_arquivo():
+        info = os.stat(sistema.estado.modelo.origem)
+        return info.st_mtime_ns, info.st_size
+
+    def observar():
+        ultima = assinatura_arquivo()
+        while True:
+            time.sleep(intervalo)
+            try:
+                atual = assinatura_arquivo()
+                if atual != ultima:
+                    ultima = atual
+                    resultado = sistema.recarregar_modelo()
+                    if resultado['recarregado']:
+                        print(f"🔄 Modelo recarregado: {resultado['anterior']} -> {resultado['atual']}")
+            except Exception as e:
+                print(f"⚠️ Modelo não recarregado, mantendo o atual: {e}")
+
+    thread = threading.Thread(target=observar, name='observador-modelo', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,256 @@
+"""
+Tabela de risco pré-calculada
+Avalia o motor fuzzy uma única vez sobre uma grade dos cinco universos de
+entrada, grava o resultado em um .npy mapeado em memória e responde às
+consultas por interpolação multilinear.
+
+No disco, `tabela_risco.eixos.json` (eixos, assinatura do modelo, forma da
+grade e nome do .npy) aponta para `tabela_risco.<id>.npy`, gravado com um
+nome novo a cada construção. O único passo que publica uma tabela é a troca
+do .json (um os.replace), então quem lê nunca vê eixos de uma construção
+com valores de outra. O .json guarda também o erro medido na construção
+(`verificar_erro`, caro demais para repetir a cada carga do servidor).
+"""
+
+import json
+import os
+import threading
+import uuid
+from bisect import bisect_right
+from itertools import product
+
+import numpy as np
+
+# Ordem dos eixos da tabela (mesmos nomes das variáveis fuzzy)
+EIXOS = ('renda', 'historico_credito', 'idade', 'tempo_emprego', 'percentual_dividas')
+
+
+class TabelaRisco:
+    """Grade 5-D de risco_credito servida por interpolação multilinear"""
+
+    def __init__(self, eixos, valores, assinatura=None, erro=None):
+        self.eixos = [np.asarray(eixo, dtype=float) for eixo in eixos]
+        self.valores = valores
+        self.assinatura = assinatura
+        # Relatório de verificar_erro medido na construção (None se não medido)
+        self.erro = erro
+
+        # Deslocamentos (em elementos) de cada eixo no array achatado e os 32 cantos do hipercubo
+        self._passos = np.array(self.valores.strides) // self.valores.itemsize
+        self._cantos = np.array(list(product((0, 1), repeat=len(self.eixos))))
+        self._plano = self.valores.reshape(-1)
+        self._eixos_lista = [eixo.tolist() for eixo in self.eixos]
+
+    @staticmethod
+    def montar_eixos(motor, subdivisoes=1):
+        """Pontos da grade: vértices dos triângulos e subdivisões uniformes entre eles
+
+        As pertinências são lineares entre vértices consecutivos, então os
+        vértices precisam estar na grade; `subdivisoes` (inteiro ou dict por
+        variável) define quantos pontos extras entram em cada intervalo.
+        """
+        eixos = []
+        for variavel in EIXOS:
+            minimo, maximo, termos = motor.entradas[variavel]
+            extras = subdivisoes[variavel] if isinstance(subdivisoes, dict) else subdivisoes
+            vertices = np.unique([minimo, maximo] + [v for triangulo in termos.values() for v in triangulo])
+            vertices = vertices[(vertices >= minimo) & (vertices <= maximo)]
+            intervalos = [np.linspace(a, b, extras + 2)[:-1] for a, b in zip(vertices[:-1], vertices[1:])]
+            eixos.append(np.concatenate(intervalos + [vertices[-1:]]))
+        return eixos
+
+    @classmethod
+    def construir(cls, motor, subdivisoes=1, caminho=None, preencher=None, tamanho_bloco=65536, limites=()):
+        """Calcula o risco em todos os pontos da grade, mede o erro e grava em disco se `caminho`
+
+        `preencher` recebe as entradas dos pontos sem regra ativada e devolve
+        o score substituto (ex.: o fallback do sistema). `limites` vai para
+        `verificar_erro`.
+        """
+        eixos = cls.montar_eixos(motor, subdivisoes)
+        forma = tuple(len(eixo) for eixo in eixos)
+        total = int(np.prod(forma))
+
+        if caminho:
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+            # Cada construção grava um .npy novo: tabelas já abertas (mmap) continuam válidas
+            arquivo_valores = f'{os.path.splitext(caminho)[0]}.{uuid.uuid4().hex[:12]}.npy'
+            valores = np.lib.format.open_memmap(arquivo_valores, mode='w+', dtype=np.float32, shape=forma)
+        else:
+            valores = np.empty(forma, dtype=np.float32)
+        plano = valores.reshape(-1)
+
+        for inicio in range(0, total, tamanho_bloco):
+            indices = np.unravel_index(np.arange(inicio, min(inicio + tamanho_bloco, total)), forma)
+            entradas = {variavel: eixo[indice] for variavel, eixo, indice in zip(EIXOS, eixos, indices)}
+            scores = motor.calcular(entradas)
+
+            falhas = np.isnan(scores)
+            if preencher is not None and falhas.any():
+                scores[falhas] = preencher({variavel: valores_eixo[falhas]
+                                            for variavel, valores_eixo in entradas.items()})
+            plano[inicio:inicio + len(scores)] = scores
+
+        tabela = cls(eixos, valores, motor.assinatura())
+        tabela.erro = tabela.verificar_erro(motor, preencher=preencher, limites=limites)
+        if caminho:
+            valores.flush()
+            anterior = cls._ler_metadados(caminho)
+            metadados = cls._caminho_eixos(caminho)
+            temporario = f'{metadados}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump({'eixos': [eixo.tolist() for eixo in eixos], 'assinatura': tabela.assinatura,
+                           'forma': list(forma), 'valores': os.path.basename(arquivo_valores),
+                           'erro': tabela.erro}, arquivo)
+            # Publica a tabela nova de uma vez e apaga a grade que deixou de ser apontada
+            os.replace(temporario, metadados)
+            if anterior is not None and anterior.get('valores') not in (None, os.path.basename(arquivo_valores)):
+                try:
+                    os.remove(os.path.join(os.path.dirname(os.path.abspath(caminho)), anterior['valores']))
+                except OSError:
+                    pass
+        return tabela
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Abre uma tabela gravada por `construir` sem ler a grade para a memória
+
+        ValueError se não houver tabela ou se a grade não tiver a forma
+        registrada nos metadados.
+        """
+        metadados = cls._ler_metadados(caminho)
+        if metadados is None or 'valores' not in metadados:
+            raise ValueError(f"Tabela de risco inexistente ou em formato antigo: {caminho}")
+        try:
+            valores = np.load(os.path.join(os.path.dirname(os.path.abspath(caminho)), metadados['valores']),
+                              mmap_mode='r')
+        except OSError as e:
+            raise ValueError(f"Grade da tabela de risco ilegível: {e}") from e
+        forma = tuple(len(eixo) for eixo in metadados['eixos'])
+        if valores.shape != forma or list(forma) != metadados['forma']:
+            raise ValueError(f"Grade da tabela de risco com forma {valores.shape}, esperada {forma}")
+        return cls(metadados['eixos'], valores, metadados['assinatura'], metadados.get('erro'))
+
+    @classmethod
+    def obter(cls, motor, caminho, subdivisoes=1, preencher=None, limites=()):
+        """Carrega a tabela do disco se for do mesmo modelo e grade, senão reconstrói"""
+        tabela = cls.carregar_valida(motor, caminho, subdivisoes)
+        return tabela or cls.construir(motor, subdivisoes, caminho, preencher, limites=limites)
+
+    @classmethod
+    def carregar_valida(cls, motor, caminho, subdivisoes=1):
+        """Tabela do disco se existir, for do mesmo modelo e grade e tiver o erro medido, senão None"""
+        try:
+            tabela = cls.carregar(caminho)
+        except ValueError:
+            return None
+        eixos = cls.montar_eixos(motor, subdivisoes)
+        mesma_grade = len(tabela.eixos) == len(eixos) and all(
+            len(a) == len(b) and np.allclose(a, b) for a, b in zip(tabela.eixos, eixos))
+        medida = tabela.erro is not None
+        return tabela if tabela.assinatura == motor.assinatura() and mesma_grade and medida else None
+
+    @classmethod
+    def _ler_metadados(cls, caminho):
+        try:
+            with open(cls._caminho_eixos(caminho), encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _caminho_eixos(caminho):
+        return os.path.splitext(caminho)[0] + '.eixos.json'
+
+    def interpolar(self, valores):
+        """Interpolação multilinear para N pontos (dict com arrays por variável)"""
+        indices, pesos = [], []
+        for variavel, eixo in zip(EIXOS, self.eixos):
+            x = np.clip(np.asarray(valores[variavel], dtype=float), eixo[0], eixo[-1])
+            i = np.clip(np.searchsorted(eixo, x, side='right') - 1, 0, len(eixo) - 2)
+            indices.append(i)
+            pesos.append((x - eixo[i]) / (eixo[i + 1] - eixo[i]))
+        indices = np.stack(np.broadcast_arrays(*indices), axis=-1)
+        pesos = np.stack(np.broadcast_arrays(*pesos), axis=-1)
+
+        # Soma ponderada dos 32 cantos da célula que contém cada ponto
+        base = indices @ self._passos
+        deslocamentos = self._cantos @ self._passos
+        fatores = np.where(self._cantos, pesos[..., None, :], 1 - pesos[..., None, :]).prod(axis=-1)
+        return (self._plano[base[..., None] + deslocamentos] * fatores).sum(axis=-1)
+
+    def interpolar_um(self, valores):
+        """Mesma interpolação para um único ponto, em Python puro (sem custo de arrays)"""
+        cantos = [(0, 1.0)]
+        for variavel, eixo, passo in zip(EIXOS, self._eixos_lista, self._passos.tolist()):
+            x = min(max(float(valores[variavel]), eixo[0]), eixo[-1])
+            i = min(bisect_right(eixo, x) - 1, len(eixo) - 2)
+            t = (x - eixo[i]) / (eixo[i + 1] - eixo[i])
+
+            # Cantos com peso zero não precisam ser lidos da tabela
+            lados = [(i * passo, 1 - t), ((i + 1) * passo, t)]
+            cantos = [(indice + deslocamento, peso * fator)
+                      for indice, peso in cantos
+                      for deslocamento, fator in lados if fator > 0]
+
+        return sum(float(self._plano[indice]) * peso for indice, peso in cantos)
+
+    def verificar_erro(self, motor, amostras=200000, semente=0, preencher=None, limites=(), tamanho_bloco=65536):
+        """Erro da tabela contra a inferência ao vivo onde ele se concentra
+
+        A interpolação é exata nos pontos da grade e o erro cresce para dentro
+        das células, então a medição cobre o centro de todas as células mais
+        `amostras` pontos aleatórios. Com `limites` (ex.: os da decisão de
+        crédito), conta também a fração dos pontos que a tabela põe do outro
+        lado de algum limite.
+        """
+        centros = [(eixo[:-1] + eixo[1:]) / 2 for eixo in self.eixos]
+        forma = tuple(len(centro) for centro in centros)
+        total_centros = int(np.prod(forma))
+        rng = np.random.default_rng(semente)
+
+        def blocos():
+            for inicio in range(0, total_centros, tamanho_bloco):
+                indices = np.unravel_index(np.arange(inicio, min(inicio + tamanho_bloco, total_centros)), forma)
+                yield {variavel: centro[indice] for variavel, centro, indice in zip(EIXOS, centros, indices)}
+            for inicio in range(0, amostras, tamanho_bloco):
+                quantidade = min(tamanho_bloco, amostras - inicio)
+                yield {variavel: rng.uniform(eixo[0], eixo[-1], quantidade)
+                       for variavel, eixo in zip(EIXOS, self.eixos)}
+
+        erros, trocadas = [], 0
+        pior, pior_ponto = -1.0, None
+        for entradas in blocos():
+            referencia = motor.calcular(entradas)
+            falhas = np.isnan(referencia)
+            if preencher is not None and falhas.any():
+                referencia[falhas] = preencher({variavel: valores[falhas]
+                                                for variavel, valores in entradas.items()})
+            interpolado = self.interpolar(entradas)
+            erro = np.abs(interpolado - referencia)
+            erros.append(erro.astype(np.float32))
+            if limites:
+                trocadas += int(np.count_nonzero(np.searchsorted(limites, interpolado)
+                                                 != np.searchsorted(limites, referencia)))
+            i = int(np.nanargmax(erro))
+            if erro[i] > pior:
+                pior, pior_ponto = float(erro[i]), {variavel: float(valores[i]) for variavel, valores in entradas.items()}
+
+        erros = np.concatenate(erros)
+        relatorio = {'amostras': int(erros.size), 'erro_maximo': float(np.nanmax(erros)),
+                     'erro_p99': float(np.nanpercentile(erros, 99)), 'erro_medio': float(np.nanmean(erros)),
+                     'pior_ponto': pior_ponto, 'pontos_grade': int(self.valores.size)}
+        if limites:
+            relatorio['decisoes_trocadas'] = trocadas / erros.size
+        return relatorio
+
+if __name__ == "__main__":
+    # Pré-calcula a tabela em tempo de build: python tabela_risco.py [subdivisoes] [caminho]
+    import sys
+    from sistema_risco import SistemaRiscoFuzzy
+
+    # Sai com código 1 se o erro máximo passar de FUZZY_TABELA_TOLERANCIA (o deploy deve falhar)
+    sistema = SistemaRiscoFuzzy(backend='nativo')
+    relatorio = sistema.preparar_tabela(int(sys.argv[1]) if len(sys.argv) > 1 else None,
+                                        sys.argv[2] if len(sys.argv) > 2 else None, construir=True)
+    sys.exit(0 if relatorio['ok'] else 1)